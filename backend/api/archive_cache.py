@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ArchiveCache
+from .om_client import OPEN_METEO_ARCHIVE_BASE, om_get
+
+DAILY = "daily"
+HOURLY = "hourly"
+
+# toạ độ làm khoá cache: 4 chữ số thập phân ~ 11m, đủ để centroid của cùng 1 tỉnh luôn trùng khoá
+COORD_DECIMALS = 4
+
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def archive_lag_days() -> int:
+    """
+    Archive API (ERA5 / ERA5T) trễ vài ngày so với hôm nay: ngày cũ hơn mốc này mới coi là đã chốt.
+    """
+    return int(getattr(settings, "OPEN_METEO_ARCHIVE_LAG_DAYS", 5))
+
+
+def settled_until() -> date:
+    """
+    Ngày cuối cùng được coi là đã chốt (không còn đổi) => được ghi vào archive_cache.
+    """
+    return timezone.localdate() - timedelta(days=archive_lag_days())
+
+
+def _days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _missing_runs(days: List[date], have: set) -> List[Tuple[date, date]]:
+    """
+    Các khoảng ngày liên tiếp chưa có trong cache => mỗi khoảng 1 request upstream.
+    """
+    runs: List[Tuple[date, date]] = []
+    for d in days:
+        if d in have:
+            continue
+        if runs and runs[-1][1] == d - timedelta(days=1):
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+def _split_days(payload: Dict[str, Any], resolution: str, variables: List[str]) -> Dict[date, Dict[str, Any]]:
+    """
+    Payload Archive API => {ngày địa phương: {biến: giá trị}}. Hourly: giá trị là list các giờ của ngày.
+    """
+    block = payload.get(resolution) or {}
+    times = block.get("time") or []
+
+    def _at(var: str, i: int) -> Any:
+        arr = block.get(var) or []
+        return arr[i] if i < len(arr) else None
+
+    if resolution == DAILY:
+        return {date.fromisoformat(t): {var: _at(var, i) for var in variables} for i, t in enumerate(times)}
+
+    offset = int(payload.get("utc_offset_seconds") or 0)
+    days: Dict[date, List[int]] = {}
+    for i, t in enumerate(times):
+        days.setdefault(_EPOCH_DATE + timedelta(days=(int(t) + offset) // 86400), []).append(i)
+    return {d: {var: [_at(var, i) for i in ix] for var in variables} for d, ix in days.items()}
+
+
+def _has_data(value: Any) -> bool:
+    if isinstance(value, list):
+        return any(v is not None for v in value)
+    return value is not None
+
+
+def _archive(lat: float, lon: float, resolution: str, start: date, end: date, variables: List[str]) -> Dict[str, Any]:
+    """
+    Đọc [start, end] từ archive_cache, chỉ gọi Archive API cho các khoảng ngày còn thiếu (hoặc chưa chốt),
+    ghi lại ngày đã chốt có dữ liệu. Trả payload cùng shape Open-Meteo (block daily / hourly).
+    """
+    lat, lon = round(float(lat), COORD_DECIMALS), round(float(lon), COORD_DECIMALS)
+    days = _days(start, end)
+    settled = settled_until()
+
+    values: Dict[Tuple[str, date], Any] = {}
+    tz_name, offset = None, None
+    for row in ArchiveCache.objects.filter(
+        lat=lat, lon=lon, resolution=resolution, variable__in=variables, day__gte=start, day__lte=end
+    ).only("variable", "day", "value", "timezone", "utc_offset_seconds"):
+        values[(row.variable, row.day)] = row.value
+        tz_name, offset = row.timezone, row.utc_offset_seconds
+
+    have = {d for d in days if d <= settled and all((var, d) in values for var in variables)}
+    for run_start, run_end in _missing_runs(days, have):
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "timezone": "auto",
+            "start_date": run_start.isoformat(),
+            "end_date": run_end.isoformat(),
+            resolution: ",".join(variables),
+        }
+        if resolution == HOURLY:
+            params["timeformat"] = "unixtime"
+        payload = om_get(OPEN_METEO_ARCHIVE_BASE, params)
+        tz_name, offset = payload.get("timezone"), int(payload.get("utc_offset_seconds") or 0)
+
+        rows = []
+        for d, per_var in _split_days(payload, resolution, variables).items():
+            for var, value in per_var.items():
+                values[(var, d)] = value
+            # ngày chưa chốt / archive chưa có số liệu => không ghi, lần sau hỏi lại
+            if d <= settled and any(_has_data(v) for v in per_var.values()):
+                rows.extend(
+                    ArchiveCache(
+                        lat=lat,
+                        lon=lon,
+                        resolution=resolution,
+                        variable=var,
+                        day=d,
+                        value=value,
+                        timezone=tz_name,
+                        utc_offset_seconds=offset,
+                    )
+                    for var, value in per_var.items()
+                )
+        ArchiveCache.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+
+    offset = offset or 0
+    out: Dict[str, Any] = {"latitude": lat, "longitude": lon, "timezone": tz_name, "utc_offset_seconds": offset}
+    if resolution == DAILY:
+        block: Dict[str, Any] = {"time": [d.isoformat() for d in days]}
+        for var in variables:
+            block[var] = [values.get((var, d)) for d in days]
+    else:
+        block = {"time": []}
+        for var in variables:
+            block[var] = []
+        for d in days:
+            per_var = [values.get((var, d)) or [] for var in variables]
+            hours = max((len(v) for v in per_var), default=0)
+            midnight = (d - _EPOCH_DATE).days * 86400 - offset
+            block["time"].extend(midnight + h * 3600 for h in range(hours))
+            for var, v in zip(variables, per_var):
+                block[var].extend(list(v) + [None] * (hours - len(v)))
+    out[resolution] = block
+    return out
+
+
+def archive_daily(lat: float, lon: float, start: date, end: date, variables: List[str]) -> Dict[str, Any]:
+    """
+    Daily của Archive API cho [start, end] (time dạng "YYYY-MM-DD") qua archive_cache.
+    """
+    return _archive(lat, lon, DAILY, start, end, variables)
+
+
+def archive_hourly(lat: float, lon: float, start: date, end: date, variables: List[str]) -> Dict[str, Any]:
+    """
+    Hourly (timeformat=unixtime) của Archive API cho các ngày địa phương [start, end] qua archive_cache.
+    """
+    return _archive(lat, lon, HOURLY, start, end, variables)
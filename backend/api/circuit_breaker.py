@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Breaker đang mở => không gọi upstream, fail ngay.
+    Kế thừa RequestException để các chỗ đang bắt lỗi requests vẫn chạy như cũ.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Upstream {name} circuit open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Breaker theo cửa sổ trượt N lời gọi gần nhất:
+    - closed: cho gọi; khi đủ min_calls và tỉ lệ lỗi (lỗi + gọi chậm) >= error_rate => open
+    - open: fail ngay trong open_seconds
+    - half_open: cho đúng 1 lời gọi thử; thành công => closed, thất bại => open lại
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 8.0,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.window = max(1, window)
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, float]] = deque(maxlen=self.window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_error: Optional[str] = None
+        self._open_count = 0
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._trial_in_flight = True
+
+    def record(self, ok: bool, latency: float, error: Optional[str] = None) -> None:
+        failed = (not ok) or latency >= self.slow_call_seconds
+        with self._lock:
+            self._calls.append((not failed, latency))
+            if failed:
+                self._last_error = error or f"slow call {latency:.1f}s"
+
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = False
+                if failed:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                errors = sum(1 for good, _ in self._calls if not good)
+                if errors / len(self._calls) >= self.error_rate:
+                    self._trip()
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._open_count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._calls)
+            errors = sum(1 for good, _ in self._calls if not good)
+            latencies = sorted(lat for _, lat in self._calls)
+            retry_after = None
+            if self._state == OPEN:
+                retry_after = max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls": n,
+                "error_rate": (errors / n) if n else 0.0,
+                "latency_p50_ms": round(latencies[n // 2] * 1000, 1) if n else None,
+                "latency_max_ms": round(latencies[-1] * 1000, 1) if n else None,
+                "open_count": self._open_count,
+                "retry_after_seconds": retry_after,
+                "last_error": self._last_error,
+            }
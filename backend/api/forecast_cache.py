@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ForecastCache
+
+
+class CacheEntry(NamedTuple):
+    payload: Dict[str, Any]
+    fetched_at: datetime
+    expires_at: datetime
+
+    @property
+    def is_stale(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+    def stale_payload(self, reason: str = "revalidating") -> Dict[str, Any]:
+        """
+        Bản copy payload với meta đánh dấu stale (để client biết đang xem dữ liệu cũ).
+        reason: "revalidating" (đang refresh nền) | "upstream_unavailable" (upstream lỗi / breaker mở)
+        """
+        payload = dict(self.payload)
+        meta = dict(payload.get("meta") or {})
+        meta["stale"] = True
+        meta["stale_reason"] = reason
+        meta["fetched_at"] = self.fetched_at.isoformat()
+        meta["expires_at"] = self.expires_at.isoformat()
+        payload["meta"] = meta
+        return payload
+
+
+class LRUCache:
+    """
+    LRU trong process, giới hạn theo số entry (entry cũ nhất bị đẩy ra khi đầy).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_lru = LRUCache(int(getattr(settings, "FORECAST_LRU_MAXSIZE", 256)))
+
+
+def cache_ttl() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "FORECAST_CACHE_TTL_SEC", 600)))
+
+
+def max_stale() -> timedelta:
+    """
+    Entry quá hạn bao lâu thì vẫn được phục vụ kiểu stale-while-revalidate. 0 => tắt SWR.
+    """
+    return timedelta(seconds=int(getattr(settings, "FORECAST_MAX_STALE_SEC", 3600)))
+
+
+def last_good_horizon() -> timedelta:
+    """
+    Row quá hạn được giữ lại bao lâu để làm fallback khi upstream sập (luôn >= max_stale).
+    """
+    keep = timedelta(seconds=int(getattr(settings, "FORECAST_LAST_GOOD_SEC", 86400)))
+    return max(keep, max_stale())
+
+
+def cache_get(cache_key: str, allow_stale: bool = False) -> Optional[CacheEntry]:
+    """
+    Đọc entry: LRU trước, miss thì đọc bảng forecast_cache rồi nạp lại vào LRU.
+    - allow_stale=False: chỉ trả entry còn hạn (expires_at > now).
+    - allow_stale=True: trả cả entry đã hết hạn nhưng chưa quá FORECAST_MAX_STALE_SEC (xem entry.is_stale).
+    """
+    now = timezone.now()
+    oldest = now - max_stale() if allow_stale else now
+
+    entry = _lru.get(cache_key)
+    if entry is not None:
+        if entry.expires_at > oldest:
+            return entry
+        # hết hạn trong LRU: worker khác có thể đã refresh vào bảng => vẫn đọc DB
+
+    return cache_get_db(cache_key, oldest)
+
+
+def cache_get_db(cache_key: str, oldest: datetime | None = None) -> Optional[CacheEntry]:
+    """
+    Đọc thẳng bảng forecast_cache (bỏ qua LRU của process này), entry còn hạn tới sau `oldest` (mặc định: now).
+    Có row => nạp vào LRU. Dùng khi cần biết bản mới nhất giữa các worker (vd kiểm tra trước khi refresh).
+    """
+    oldest = oldest or timezone.now()
+    try:
+        row = (
+            ForecastCache.objects.filter(cache_key=cache_key, expires_at__gt=oldest)
+            .only("payload", "fetched_at", "expires_at")
+            .first()
+        )
+    except Exception:
+        return None
+    if row is None or not row.payload:
+        return None
+
+    entry = CacheEntry(row.payload, row.fetched_at, row.expires_at)
+    _lru.set(cache_key, entry)
+    return entry
+
+
+def cache_last_good(cache_key: str) -> Optional[CacheEntry]:
+    """
+    Bản gần nhất còn giữ được, bất kể hạn — dùng làm fallback khi upstream sập.
+    """
+    entry = _lru.get(cache_key)
+    if entry is not None:
+        return entry
+    try:
+        row = ForecastCache.objects.filter(cache_key=cache_key).only("payload", "fetched_at", "expires_at").first()
+    except Exception:
+        return None
+    if row is None or not row.payload:
+        return None
+    return CacheEntry(row.payload, row.fetched_at, row.expires_at)
+
+
+def cache_set(
+    cache_key: str,
+    payload: Dict[str, Any],
+    *,
+    lat: float,
+    lon: float,
+    forecast_days: int,
+    tz: str | None,
+    ttl: timedelta | None = None,
+) -> CacheEntry:
+    """
+    Ghi cả 2 tầng. Lỗi DB chỉ bỏ qua tầng DB, LRU vẫn được ghi.
+    """
+    now = timezone.now()
+    entry = CacheEntry(payload, now, now + (ttl or cache_ttl()))
+    _lru.set(cache_key, entry)
+
+    try:
+        with transaction.atomic():
+            ForecastCache.objects.update_or_create(
+                cache_key=cache_key,
+                defaults={
+                    "lat": lat,
+                    "lon": lon,
+                    "forecast_days": forecast_days,
+                    "timezone": tz,
+                    "payload": payload,
+                    "fetched_at": entry.fetched_at,
+                    "expires_at": entry.expires_at,
+                },
+            )
+    except Exception:
+        pass
+    return entry
+
+
+_refresh_pool = ThreadPoolExecutor(
+    max_workers=int(getattr(settings, "FORECAST_REFRESH_WORKERS", 2)),
+    thread_name_prefix="forecast-refresh",
+)
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_in_background(cache_key: str, fn: Callable[[], Any]) -> bool:
+    """
+    Chạy fn (fetch + cache_set) trong thread pool, mỗi cache_key tối đa 1 lần refresh cùng lúc.
+    Trả False nếu key đang được refresh rồi.
+    """
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return False
+        _refreshing.add(cache_key)
+
+    def run():
+        close_old_connections()
+        try:
+            fn()
+        except Exception:
+            # giữ nguyên bản stale, request sau sẽ thử refresh lại
+            pass
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
+            close_old_connections()
+
+    _refresh_pool.submit(run)
+    return True
+
+
+def purge_expired(older_than: datetime | None = None, batch_size: int = 1000) -> int:
+    """
+    Xoá các row forecast_cache có expires_at < older_than theo từng batch.
+    Mặc định older_than = now - last_good_horizon() để không xoá mất bản stale / last-good còn dùng được.
+    Trả số row đã xoá.
+    """
+    cutoff = older_than or (timezone.now() - last_good_horizon())
+    deleted = 0
+    while True:
+        ids = list(
+            ForecastCache.objects.filter(expires_at__lt=cutoff).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        n, _ = ForecastCache.objects.filter(id__in=ids).delete()
+        deleted += n
+    return deleted
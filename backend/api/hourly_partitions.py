@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .hourly_store import TABLE
+
+DEFAULT_PARTITION = f"{TABLE}_default"
+_NAME_RE = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_floor(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned() -> bool:
+    """
+    weather_forecast_hourly đã là bảng partition (migration 0006) chưa. Không phải PostgreSQL / chưa có bảng => False.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cur.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def monthly_partitions() -> dict[date, str]:
+    """
+    {tháng: tên partition} của các partition theo tháng đang gắn vào bảng (không gồm partition default).
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = [name for (name,) in cur.fetchall()]
+
+    out = {}
+    for name in names:
+        m = _NAME_RE.match(name)
+        if m:
+            out[date(int(m.group(1)), int(m.group(2)), 1)] = name
+    return dict(sorted(out.items()))
+
+
+def _month_bounds(month: date) -> tuple[str, str]:
+    return f"{month.isoformat()} 00:00+00", f"{add_months(month, 1).isoformat()} 00:00+00"
+
+
+def create_partition(month: date) -> str:
+    """
+    Partition [month, tháng sau) theo UTC. Row của khoảng này đang nằm trong partition default
+    (ghi khi chưa có partition) được chuyển sang trước khi ATTACH — ATTACH sẽ lỗi nếu default còn row thuộc khoảng.
+    """
+    name = partition_name(month)
+    start, end = _month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cur.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE forecast_time >= %s AND forecast_time < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cur.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    return name
+
+
+def missing_partitions(months_ahead: int | None = None, today: date | None = None) -> list[date]:
+    """
+    Các tháng từ tháng hiện tại tới months_ahead tháng sau (mặc định HOURLY_PARTITION_MONTHS_AHEAD) chưa có partition.
+    """
+    if months_ahead is None:
+        months_ahead = int(getattr(settings, "HOURLY_PARTITION_MONTHS_AHEAD", 3))
+    current = month_floor(today or timezone.now().date())
+    existing = monthly_partitions()
+    months = (add_months(current, n) for n in range(months_ahead + 1))
+    return [month for month in months if month not in existing]
+
+
+def default_rows(month: date) -> int:
+    """
+    Số row của tháng đang nằm trong partition default => sẽ được chuyển sang khi tạo partition của tháng đó.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE forecast_time >= %s AND forecast_time < %s",
+            _month_bounds(month),
+        )
+        return cur.fetchone()[0]
+
+
+def ensure_partitions(months_ahead: int | None = None, today: date | None = None) -> list[str]:
+    """
+    Tạo partition còn thiếu (missing_partitions). Trả tên các partition vừa tạo.
+    """
+    return [create_partition(month) for month in missing_partitions(months_ahead, today)]
+
+
+def expired_partitions(retention_months: int | None = None, today: date | None = None) -> list[str]:
+    """
+    Partition có toàn bộ dữ liệu cũ hơn retention_months tháng (mặc định HOURLY_RETENTION_MONTHS), tính theo tháng.
+    """
+    if retention_months is None:
+        retention_months = int(getattr(settings, "HOURLY_RETENTION_MONTHS", 12))
+    # giữ tối thiểu tháng trước: store đọc lùi 7 ngày (HOURLY_STORE_PAST_DAYS)
+    cutoff = add_months(month_floor(today or timezone.now().date()), -max(retention_months, 1))
+    return [name for month, name in monthly_partitions().items() if month < cutoff]
+
+
+def drop_partition(name: str) -> None:
+    """
+    Detach + drop: xoá nguyên 1 tháng không cần DELETE từng row (không bloat, không VACUUM).
+    """
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cur.execute(f"DROP TABLE {name}")
+
+
+def archive_partition(name: str, schema: str | None = None) -> str:
+    """
+    Detach rồi chuyển partition sang schema lưu trữ (mặc định HOURLY_ARCHIVE_SCHEMA) thay vì xoá:
+    dữ liệu cũ vẫn query được qua <schema>.<name>, không còn nằm trong bảng chính. Trả tên đầy đủ.
+    """
+    schema = schema or str(getattr(settings, "HOURLY_ARCHIVE_SCHEMA", "archive"))
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        cur.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cur.execute(f"ALTER TABLE {name} SET SCHEMA {schema}")
+    return f"{schema}.{name}"
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import math
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, NamedTuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import HourlyStoreSync, Place
+from .om_client import OPEN_METEO_FORECAST_BASE, om_get_grid
+from .singleflight import advisory_lock
+
+TABLE = "weather_forecast_hourly"
+
+# cột của bảng => biến hourly Open-Meteo (fetch theo đơn vị chung của API: km/h, mm)
+STORE_COLUMNS = {
+    "temp_c": "temperature_2m",
+    "feels_like_c": "apparent_temperature",
+    "humidity_percent": "relative_humidity_2m",
+    "pressure_hpa": "pressure_msl",
+    "wind_speed_ms": "wind_speed_10m",
+    "wind_dir_deg": "wind_direction_10m",
+    "cloud_cover_percent": "cloud_cover",
+    "precip_mm": "precipitation",
+    "precip_prob_percent": "precipitation_probability",
+}
+
+# đổi đơn vị Open-Meteo => đơn vị cột (cột không có ở đây giữ nguyên)
+CONVERSIONS = {
+    "wind_speed_ms": lambda kmh: round(kmh / 3.6, 2),
+}
+# chiều ngược lại khi đọc store ra payload dạng Open-Meteo (làm tròn 2 chữ số ở trên => khôi phục đúng 1 chữ số km/h)
+REVERSE_CONVERSIONS = {
+    "wind_speed_ms": lambda ms: round(ms * 3.6, 1),
+}
+
+
+class StoreTarget(NamedTuple):
+    owner: str  # cột khoá của row: "province_id" | "place_id"
+    id: int
+    lat: float
+    lon: float
+
+
+def chunk_rows() -> int:
+    return max(1, int(getattr(settings, "HOURLY_STORE_CHUNK_ROWS", 5000)))
+
+
+def read_enabled() -> bool:
+    """
+    HOURLY_STORE_READ bật => các endpoint /provinces/<code>/* đọc từ weather_forecast_hourly thay vì gọi Open-Meteo.
+    """
+    return bool(getattr(settings, "HOURLY_STORE_READ", False))
+
+
+def store_days() -> tuple[int, int]:
+    """
+    (past_days, forecast_days) mỗi lần ghi 1 target: đủ phủ các layer (7 ngày trước/sau) và bundle (tối đa 16 ngày).
+    """
+    return (
+        int(getattr(settings, "HOURLY_STORE_PAST_DAYS", 7)),
+        int(getattr(settings, "HOURLY_STORE_FORECAST_DAYS", 16)),
+    )
+
+
+def store_targets(place_kinds: Iterable[str] | None = None, provinces: bool = True, places: bool = True) -> list[StoreTarget]:
+    """
+    Mọi tỉnh có centroid trong bảng provinces + Place (lọc theo place_kinds nếu có).
+    """
+    targets: list[StoreTarget] = []
+    if provinces:
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, centroid_lat, centroid_lon
+                FROM provinces
+                WHERE centroid_lat IS NOT NULL AND centroid_lon IS NOT NULL
+                ORDER BY id ASC
+                """
+            )
+            targets.extend(StoreTarget("province_id", int(pk), float(lat), float(lon)) for pk, lat, lon in cur.fetchall())
+
+    if places:
+        qs = Place.objects.order_by("id")
+        if place_kinds:
+            qs = qs.filter(kind__in=list(place_kinds))
+        targets.extend(StoreTarget("place_id", pk, float(lat), float(lon)) for pk, lat, lon in qs.values_list("id", "lat", "lon"))
+    return targets
+
+
+def region_target(region: dict, lat: float, lon: float) -> StoreTarget:
+    """
+    region dict của regions.get_region_coord (có id + kind) => StoreTarget.
+    """
+    owner = "province_id" if region.get("kind") == "province" else "place_id"
+    return StoreTarget(owner, int(region["id"]), lat, lon)
+
+
+def hourly_params(forecast_days: int = 7, past_days: int = 0) -> dict:
+    return {
+        "timezone": "auto",
+        "timeformat": "unixtime",
+        "wind_speed_unit": "kmh",
+        "precipitation_unit": "mm",
+        "forecast_days": forecast_days,
+        "past_days": past_days,
+        "hourly": ",".join(STORE_COLUMNS.values()),
+    }
+
+
+def fetch_hourly(targets: list[StoreTarget], forecast_days: int = 16, past_days: int = 7) -> list[tuple[StoreTarget, dict]]:
+    """
+    Hourly của mọi target bằng request multi-location (OPEN_METEO_BATCH_SIZE điểm / request);
+    target chung ô lưới (OPEN_METEO_GRID_SNAP_DEG) chỉ gửi 1 toạ độ.
+    """
+    coords = [(t.lat, t.lon) for t in targets]
+    return list(zip(targets, om_get_grid(OPEN_METEO_FORECAST_BASE, coords, hourly_params(forecast_days, past_days))))
+
+
+def hourly_rows(om: dict) -> list[tuple]:
+    """
+    hourly (unixtime) của 1 payload Open-Meteo => [(forecast_time UTC, *STORE_COLUMNS)] đã đổi đơn vị.
+    Payload phải có đủ các biến trong STORE_COLUMNS (thiếu biến => cột đó None).
+    """
+    hourly = om.get("hourly") or {}
+    times = hourly.get("time") or []
+    columns = []
+    for col, var in STORE_COLUMNS.items():
+        values = list(hourly.get(var) or [])
+        values += [None] * (len(times) - len(values))
+        conv = CONVERSIONS.get(col)
+        if conv is not None:
+            values = [conv(v) if v is not None else None for v in values]
+        columns.append(values)
+
+    return [
+        (datetime.fromtimestamp(int(t), tz=dt_timezone.utc), *row)
+        for t, *row in zip(times, *columns)
+    ]
+
+
+def _upsert_sql(owner: str) -> str:
+    cols = ", ".join(STORE_COLUMNS)
+    assigned = ", ".join(f"{c} = EXCLUDED.{c}" for c in STORE_COLUMNS)
+    current = ", ".join(f"t.{c}" for c in STORE_COLUMNS)
+    incoming = ", ".join(f"EXCLUDED.{c}" for c in STORE_COLUMNS)
+    arrays = ", ".join(["%s::float8[]"] * len(STORE_COLUMNS))
+    # mỗi cột 1 mảng => unnest thành các row: 1 câu / chunk, số tham số không phụ thuộc số row
+    # ON CONFLICT theo unique index từng phần (migration 0004); giờ không đổi giá trị => không ghi lại row.
+    # created_at chỉ set khi insert => RETURNING so với mốc của lần ghi này để tách insert / update
+    # (xmax = 0 không dùng được trên bảng partition)
+    return f"""
+        INSERT INTO {TABLE} AS t ({owner}, forecast_time, {cols}, created_at)
+        SELECT u.*, %s FROM unnest(%s::bigint[], %s::timestamptz[], {arrays}) AS u
+        ON CONFLICT ({owner}, forecast_time) WHERE {owner} IS NOT NULL
+        DO UPDATE SET {assigned}
+        WHERE ({current}) IS DISTINCT FROM ({incoming})
+        RETURNING (t.created_at IS NOT DISTINCT FROM %s)
+    """
+
+
+def upsert_hourly(batch: list[tuple[StoreTarget, list[tuple]]], chunk_size: int | None = None) -> dict:
+    """
+    Ghi hourly_rows của nhiều target vào weather_forecast_hourly bằng INSERT ... SELECT FROM unnest(...)
+    ON CONFLICT, mỗi chunk_size row 1 câu / 1 transaction. Chỉ ghi giờ mới hoặc giờ có giá trị đổi.
+    Trả {"inserted", "updated", "unchanged"}.
+    """
+    chunk_size = chunk_size or chunk_rows()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    now = timezone.now()
+
+    by_owner: dict[str, list[tuple]] = {}
+    for target, rows in batch:
+        by_owner.setdefault(target.owner, []).extend((target.id, *row) for row in rows)
+
+    for owner, rows in by_owner.items():
+        sql = _upsert_sql(owner)
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i : i + chunk_size]
+            with transaction.atomic(), connection.cursor() as cur:
+                cur.execute(sql, [now, *(list(col) for col in zip(*chunk)), now])
+                written = [inserted for (inserted,) in cur.fetchall()]
+            stats["inserted"] += sum(written)
+            stats["updated"] += len(written) - sum(written)
+            stats["unchanged"] += len(chunk) - len(written)
+    return stats
+
+
+def mark_synced(fetched: list[tuple[StoreTarget, dict]], synced_at: datetime | None = None) -> None:
+    """
+    Ghi lại khoảng giờ + timezone vừa ghi của từng target vào hourly_store_sync (1 row / target).
+    """
+    synced_at = synced_at or timezone.now()
+    objs = []
+    for target, om in fetched:
+        times = (om.get("hourly") or {}).get("time") or []
+        if not times:
+            continue
+        objs.append(
+            HourlyStoreSync(
+                owner=target.owner,
+                owner_id=target.id,
+                synced_at=synced_at,
+                first_time=datetime.fromtimestamp(int(times[0]), tz=dt_timezone.utc),
+                last_time=datetime.fromtimestamp(int(times[-1]), tz=dt_timezone.utc),
+                timezone=om.get("timezone"),
+                utc_offset_seconds=int(om.get("utc_offset_seconds") or 0),
+            )
+        )
+    HourlyStoreSync.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["owner", "owner_id"],
+        update_fields=["synced_at", "first_time", "last_time", "timezone", "utc_offset_seconds"],
+        batch_size=500,
+    )
+
+
+def ingest(
+    targets: list[StoreTarget], forecast_days: int | None = None, past_days: int | None = None, chunk_size: int | None = None
+) -> dict:
+    """
+    Fetch + upsert hourly của targets (mặc định theo store_days()). Trả stats của upsert_hourly kèm số target / row
+    và số ngày / tuần rollup được cập nhật (ROLLUP_ON_INGEST, api/rollups.py).
+    """
+    from . import rollups
+
+    default_past, default_forecast = store_days()
+    fetched = fetch_hourly(
+        targets,
+        default_forecast if forecast_days is None else forecast_days,
+        default_past if past_days is None else past_days,
+    )
+    batch = [(target, hourly_rows(om)) for target, om in fetched]
+    stats = upsert_hourly(batch, chunk_size)
+    mark_synced(fetched)
+    if rollups.on_ingest():
+        rolled = rollups.rollup_payloads(fetched)
+        stats["rollup_days"], stats["rollup_weeks"] = rolled["days"], rolled["weeks"]
+    stats["targets"] = len(targets)
+    stats["rows"] = sum(len(rows) for _, rows in batch)
+    return stats
+
+
+def _window(utc_offset_seconds: int, past_days: int, forecast_days: int) -> tuple[int, int]:
+    """
+    (start, end) unixtime, đóng 2 đầu: từ 00:00 địa phương của (hôm nay - past_days)
+    tới giờ cuối của (hôm nay + forecast_days - 1) — cùng khoảng Open-Meteo trả với past_days/forecast_days.
+    """
+    today = (int(timezone.now().timestamp()) + utc_offset_seconds) // 86400
+    start = (today - past_days) * 86400 - utc_offset_seconds
+    end = (today + forecast_days) * 86400 - utc_offset_seconds - 3600
+    return start, end
+
+
+def _read_rows(target: StoreTarget, start: int, end: int) -> list[tuple]:
+    cols = ", ".join(STORE_COLUMNS)
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT forecast_time, {cols}
+            FROM {TABLE}
+            WHERE {target.owner} = %s AND forecast_time >= %s AND forecast_time <= %s
+            ORDER BY forecast_time ASC
+            """,
+            [
+                target.id,
+                datetime.fromtimestamp(start, tz=dt_timezone.utc),
+                datetime.fromtimestamp(end, tz=dt_timezone.utc),
+            ],
+        )
+        return cur.fetchall()
+
+
+def _daily_from_hourly(hourly: dict, utc_offset_seconds: int) -> dict:
+    """
+    Daily tmax/tmin/tổng mưa/xác suất mưa max gom từ hourly theo ngày địa phương (time = 00:00 địa phương).
+    Các daily còn lại (độ ẩm / mây trung bình, gió max / hướng chủ đạo) views._normalize_bundle_columnar tự tính từ hourly.
+    """
+    days: dict[int, list[int]] = {}
+    for i, t in enumerate(hourly["time"]):
+        days.setdefault((t + utc_offset_seconds) // 86400, []).append(i)
+
+    def _vals(var: str, ix: list[int]) -> list:
+        col = hourly[var]
+        return [col[i] for i in ix if col[i] is not None]
+
+    daily = {
+        "time": [],
+        "temperature_2m_max": [],
+        "temperature_2m_min": [],
+        "precipitation_sum": [],
+        "precipitation_probability_max": [],
+    }
+    for day, ix in days.items():
+        temp = _vals("temperature_2m", ix)
+        rain = _vals("precipitation", ix)
+        prob = _vals("precipitation_probability", ix)
+        daily["time"].append(day * 86400 - utc_offset_seconds)
+        daily["temperature_2m_max"].append(max(temp) if temp else None)
+        daily["temperature_2m_min"].append(min(temp) if temp else None)
+        daily["precipitation_sum"].append(round(math.fsum(rain), 2) if rain else None)
+        daily["precipitation_probability_max"].append(max(prob) if prob else None)
+    return daily
+
+
+def _om_payload(target: StoreTarget, rows: list[tuple], tz_name: str | None, utc_offset_seconds: int) -> dict:
+    """
+    Row của store => payload cùng shape Open-Meteo (timeformat=unixtime, km/h) để các builder của views dùng lại:
+    hourly đủ biến của STORE_COLUMNS, current = giờ gần nhất <= now, daily gom từ hourly.
+    """
+    hourly = {"time": [int(r[0].timestamp()) for r in rows]}
+    for k, (col, var) in enumerate(STORE_COLUMNS.items(), start=1):
+        conv = REVERSE_CONVERSIONS.get(col)
+        values = [r[k] for r in rows]
+        hourly[var] = [conv(v) if v is not None else None for v in values] if conv else values
+
+    current = {}
+    if rows:
+        i = max(bisect_right(hourly["time"], timezone.now().timestamp()) - 1, 0)
+        current = {var: col[i] for var, col in hourly.items()}
+
+    return {
+        "latitude": target.lat,
+        "longitude": target.lon,
+        "timezone": tz_name,
+        "utc_offset_seconds": utc_offset_seconds,
+        "current": current,
+        "hourly": hourly,
+        "daily": _daily_from_hourly(hourly, utc_offset_seconds),
+    }
+
+
+def _read_fresh(target: StoreTarget, past_days: int, forecast_days: int) -> dict | None:
+    """
+    Payload từ store nếu lần ghi gần nhất của target chưa quá HOURLY_STORE_MAX_AGE_SEC và phủ đủ khoảng giờ; không thì None.
+    """
+    max_age = timedelta(seconds=int(getattr(settings, "HOURLY_STORE_MAX_AGE_SEC", 3600)))
+    sync = HourlyStoreSync.objects.filter(owner=target.owner, owner_id=target.id).first()
+    if sync is None or sync.synced_at < timezone.now() - max_age:
+        return None
+
+    start, end = _window(sync.utc_offset_seconds, past_days, forecast_days)
+    if sync.first_time.timestamp() > start or sync.last_time.timestamp() < end:
+        return None
+
+    rows = _read_rows(target, start, end)
+    if len(rows) != (end - start) // 3600 + 1:
+        return None
+    return _om_payload(target, rows, sync.timezone, sync.utc_offset_seconds)
+
+
+def read_through(target: StoreTarget, past_days: int = 0, forecast_days: int = 7) -> dict:
+    """
+    Payload dạng Open-Meteo của target cho khoảng past_days / forecast_days (tính theo ngày địa phương).
+    Store đủ mới + đủ giờ => 1 lần quét index (owner, forecast_time). Không thì fetch Open-Meteo toàn bộ
+    store_days() của target (ngoài lock / transaction) rồi ghi vào store (write-through) và trả phần cần.
+    Advisory lock theo target chỉ giữ quanh phần ghi; không lấy được lock (worker khác đang ghi quá lâu)
+    => đọc lại store, store vẫn chưa đủ mới thì trả bản vừa fetch mà không ghi.
+    """
+    om = _read_fresh(target, past_days, forecast_days)
+    if om is not None:
+        return om
+
+    store_past, store_forecast = store_days()
+    fetched = fetch_hourly([target], max(store_forecast, forecast_days), max(store_past, past_days))
+    _, raw = fetched[0]
+    rows = hourly_rows(raw)
+
+    wait = float(getattr(settings, "FORECAST_LOCK_WAIT_SEC", 20))
+    with advisory_lock(f"hourly_store:{target.owner}:{target.id}", wait_seconds=wait) as acquired:
+        if acquired:
+            upsert_hourly([(target, rows)])
+            mark_synced(fetched)
+
+    if not acquired:
+        om = _read_fresh(target, past_days, forecast_days)
+        if om is not None:
+            return om
+
+    offset = int(raw.get("utc_offset_seconds") or 0)
+    start, end = _window(offset, past_days, forecast_days)
+    rows = [r for r in rows if start <= r[0].timestamp() <= end]
+    return _om_payload(target, rows, raw.get("timezone"), offset)
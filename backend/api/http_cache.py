@@ -0,0 +1,120 @@
+"""
+Helper HTTP cache dùng chung cho các view: ETag / 304 / Cache-Control, stale-while-revalidate
+trên cache 2 tầng (forecast_cache) và map lỗi upstream => 502 / 503.
+"""
+from __future__ import annotations
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.circuit_breaker import CircuitOpenError
+from .forecast_cache import CacheEntry, cache_get, cache_get_db, cache_last_good, cache_set, refresh_in_background
+from .singleflight import SingleFlight, advisory_lock
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag từ "thế hệ" của payload (thời điểm fetch upstream + params), không cần serialize body.
+    """
+    raw = "|".join(str(p) for p in parts)
+    return quote_etag(hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest())
+
+
+def etag_matches(request, etag: str) -> bool:
+    """
+    If-None-Match (danh sách tag, có thể W/ hoặc "*") khớp etag theo so sánh yếu.
+    """
+    header = request.headers.get("If-None-Match")
+    tags = parse_etags(header) if header else []
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def conditional_response(request, etag: str, max_age: float, build) -> Response:
+    """
+    If-None-Match khớp etag => 304 (không gọi build, không serialize). Không thì Response(build()).
+    Cache-Control max-age = thời gian payload còn hạn trong cache server.
+    """
+    if etag_matches(request, etag):
+        resp = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        resp = Response(build())
+    resp["ETag"] = etag
+    resp["Cache-Control"] = f"public, max-age={max(0, int(max_age))}"
+    return resp
+
+
+def entry_etag(entry: CacheEntry, *parts) -> str:
+    meta = entry.payload.get("meta") or {}
+    return make_etag(entry.fetched_at.isoformat(), meta.get("stale_reason") or "fresh", *parts)
+
+
+def entry_max_age(entry: CacheEntry) -> float:
+    if (entry.payload.get("meta") or {}).get("stale"):
+        return 0
+    return (entry.expires_at - timezone.now()).total_seconds()
+
+
+def upstream_error(e: Exception, response_class=Response):
+    """
+    Lỗi khi lấy dữ liệu upstream (không còn bản cache nào để trả): breaker mở => 503 + Retry-After (fail fast,
+    client biết lúc thử lại), còn lại (HTTP lỗi / timeout / payload lạ) => 502.
+    response_class: Response (view DRF) | JsonResponse (view Django thường, vd tile).
+    """
+    if isinstance(e, CircuitOpenError):
+        resp = response_class({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        resp["Retry-After"] = str(int(e.retry_after) + 1)
+        return resp
+    return response_class({"detail": f"Open-Meteo error: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+
+_fill_flight = SingleFlight()
+
+
+def fill_locked(
+    cache_key: str, fetch, *, lat: float, lon: float, forecast_days: int, tz: str | None, ttl=None
+) -> CacheEntry:
+    """
+    Cache miss / refresh: fetch upstream ngoài lock (trong process đã gộp single-flight theo cache_key),
+    rồi giữ advisory lock (transaction ngắn) chỉ quanh phần đọc lại bảng + ghi: worker khác vừa ghi bản
+    còn hạn trong lúc mình fetch => dùng bản đó. Không lấy được lock => vẫn ghi (upsert theo cache_key).
+    """
+    entry = cache_get(cache_key)
+    if entry is not None:
+        return entry
+
+    payload = fetch()
+    wait = float(getattr(settings, "FORECAST_LOCK_WAIT_SEC", 20))
+    with advisory_lock(f"forecast_cache:{cache_key}", wait_seconds=wait):
+        entry = cache_get_db(cache_key)
+        if entry is not None:
+            return entry
+        return cache_set(cache_key, payload, lat=lat, lon=lon, forecast_days=forecast_days, tz=tz, ttl=ttl)
+
+
+def swr_entry(cache_key: str, fill) -> CacheEntry:
+    """
+    Stale-while-revalidate:
+    - entry còn hạn => trả luôn
+    - entry hết hạn nhưng chưa quá FORECAST_MAX_STALE_SEC => trả bản stale (meta.stale=True) + refresh nền
+    - không có entry => chờ fill (gộp single-flight theo cache_key)
+    - fill lỗi (upstream 5xx / timeout / breaker mở) => trả bản last-good nếu còn, không thì raise
+    Entry trả về giữ fetched_at/expires_at gốc (dùng cho ETag / max-age).
+    """
+    entry = cache_get(cache_key, allow_stale=True)
+    if entry is not None:
+        if not entry.is_stale:
+            return entry
+        refresh_in_background(cache_key, fill)
+        return entry._replace(payload=entry.stale_payload())
+
+    try:
+        return _fill_flight.do(cache_key, fill)
+    except Exception:
+        last = cache_last_good(cache_key)
+        if last is None:
+            raise
+        return last._replace(payload=last.stale_payload("upstream_unavailable"))
@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api import regions, renderers, views
+from api.management.commands.bench_normalize_bundle import synthetic_raw
+
+
+class Command(BaseCommand):
+    help = "Benchmark DRF JSONRenderer vs ORJSONRenderer on bundle responses (rows + columnar) and compare their bytes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=16)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--code", help="Dùng payload thật từ Open-Meteo của region code này thay cho payload giả lập")
+
+    def _time(self, renderer, data, iterations: int) -> float:
+        renderer.render(data)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(data)
+        return (time.perf_counter() - started) / iterations * 1000
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stderr.write("orjson is not installed, nothing to compare")
+            return
+
+        days = max(1, min(options["days"], 16))
+        iterations = max(1, options["iterations"])
+
+        if options.get("code"):
+            region, lat, lon = regions.get_region_coord(options["code"])
+            raw = views._open_meteo_fetch(lat, lon, forecast_days=days)
+        else:
+            region = {"code": "bench", "name": "bench"}
+            raw = synthetic_raw(days)
+
+        columnar = views._normalize_bundle_columnar(raw)
+        std, fast = JSONRenderer(), renderers.ORJSONRenderer()
+
+        identical = True
+        for layout in ("rows", "columnar"):
+            data = views._bundle_layout(columnar, layout)
+            data["region"] = {"code": region["code"], "name": region["name"]}
+
+            a, b = std.render(data), fast.render(data)
+            if a != b:
+                # khác byte nhưng cùng dữ liệu = khác cách viết số mũ của float (1e+16 / 1e16), xem ORJSONRenderer
+                if json.loads(a) != json.loads(b):
+                    self.stderr.write(self.style.ERROR(f"{layout}: output mismatch between renderers"))
+                    return
+                at = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+                self.stdout.write(
+                    self.style.WARNING(f"{layout}: same data, bytes differ from offset {at}: {a[at:at + 20]!r} vs {b[at:at + 20]!r}")
+                )
+                identical = False
+
+            std_ms = self._time(std, data, iterations)
+            fast_ms = self._time(fast, data, iterations)
+            self.stdout.write(
+                f"{layout:<9} {len(b):>7} bytes | json: {std_ms:.3f} ms | orjson: {fast_ms:.3f} ms | x{std_ms / fast_ms:.1f}"
+            )
+        if identical:
+            self.stdout.write(self.style.SUCCESS("byte-identical output"))
+        else:
+            self.stdout.write(self.style.SUCCESS("identical data (bytes differ only in float formatting)"))
@@ -0,0 +1,104 @@
+import json
+import math
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from api import regions, views
+
+
+def synthetic_raw(days: int) -> dict:
+    """
+    Payload giả lập đúng shape Open-Meteo của _open_meteo_fetch (timeformat=unixtime, UTC+7; daily mean/dominant
+    để trống để _normalize_bundle phải tính bù từ hourly — trường hợp nặng nhất).
+    """
+    offset = 7 * 3600
+    start = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()) - offset  # 00:00 giờ địa phương
+    n = days * 24
+    hourly = {"time": [start + i * 3600 for i in range(n)]}
+    hourly["temperature_2m"] = [round(27 + 5 * math.sin(i / 4), 1) for i in range(n)]
+    hourly["apparent_temperature"] = [round(30 + 5 * math.sin(i / 4), 1) for i in range(n)]
+    hourly["relative_humidity_2m"] = [int(75 + 20 * math.cos(i / 5)) for i in range(n)]
+    hourly["precipitation"] = [round(max(0.0, 2 * math.sin(i / 3)), 1) for i in range(n)]
+    hourly["precipitation_probability"] = [int(50 + 50 * math.sin(i / 7)) for i in range(n)]
+    hourly["cloud_cover"] = [int(50 + 50 * math.cos(i / 6)) for i in range(n)]
+    hourly["wind_speed_10m"] = [round(10 + 8 * abs(math.sin(i / 9)), 1) for i in range(n)]
+    hourly["wind_direction_10m"] = [int((i * 37) % 360) for i in range(n)]
+
+    daily = {"time": [start + d * 86400 for d in range(days)]}
+    daily["temperature_2m_max"] = [33.1] * days
+    daily["temperature_2m_min"] = [24.2] * days
+    daily["precipitation_sum"] = [3.4] * days
+    daily["precipitation_probability_max"] = [80] * days
+    for f in ("wind_speed_10m_max", "wind_direction_10m_dominant", "relative_humidity_2m_mean", "cloud_cover_mean"):
+        daily[f] = [None] * days
+
+    return {
+        "latitude": 10.75,
+        "longitude": 106.625,
+        "timezone": "Asia/Bangkok",
+        "utc_offset_seconds": offset,
+        "current": {"time": hourly["time"][12], "temperature_2m": 30.2},
+        "hourly": hourly,
+        "daily": daily,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the numpy paths of _normalize_bundle (daily stats, compass labels) against pure Python and check identical output"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=16)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--code", help="Dùng payload thật từ Open-Meteo của region code này thay cho payload giả lập")
+
+    def _time(self, fn, iterations: int) -> float:
+        fn()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - started) / iterations * 1000
+
+    def handle(self, *args, **options):
+        days = max(1, min(options["days"], 16))
+        iterations = max(1, options["iterations"])
+
+        if options.get("code"):
+            _, lat, lon = regions.get_region_coord(options["code"])
+            raw = views._open_meteo_fetch(lat, lon, forecast_days=days)
+        else:
+            raw = synthetic_raw(days)
+
+        hourly = raw.get("hourly") or {}
+        offset = int(raw.get("utc_offset_seconds") or 0)
+        h_days = [views._local_day(t, offset) for t in hourly.get("time") or []]
+        cols = [hourly.get(f) or [None] * len(h_days) for f in ("relative_humidity_2m", "cloud_cover", "wind_speed_10m", "wind_direction_10m")]
+        degs = cols[3]
+
+        stats_np = lambda: views._hourly_day_stats(h_days, *cols)  # noqa: E731
+        stats_py = lambda: views._hourly_day_stats_py(h_days, *cols)  # noqa: E731
+        if json.dumps(stats_np()) != json.dumps(stats_py()):
+            self.stderr.write(self.style.ERROR("_hourly_day_stats differs from _hourly_day_stats_py"))
+            return
+        scalar = lambda: [views._deg_to_compass(d) if d is not None else None for d in degs]  # noqa: E731
+        if views._compass_labels(degs) != scalar():
+            self.stderr.write(self.style.ERROR("_compass_labels differs from _deg_to_compass"))
+            return
+
+        bundle_ms = self._time(lambda: views._normalize_bundle(raw), iterations)
+        stats_ms = self._time(stats_np, iterations)
+        stats_py_ms = self._time(stats_py, iterations)
+        labels_ms = self._time(lambda: views._compass_labels(degs), iterations)
+        scalar_ms = self._time(scalar, iterations)
+
+        has_np = views.np is not None
+        self.stdout.write(
+            f"hourly points: {len(h_days)}, iterations: {iterations}, numpy path: "
+            f"daily stats {has_np and len(h_days) >= views._NUMPY_MIN_DAY_STATS_HOURS}, "
+            f"compass labels {has_np and len(h_days) >= views._NUMPY_MIN_HOURS}"
+        )
+        self.stdout.write(f"_normalize_bundle: {bundle_ms:.3f} ms/call")
+        self.stdout.write(f"daily stats:       {stats_ms:.3f} ms/call (pure python {stats_py_ms:.3f} ms/call, x{stats_py_ms / stats_ms:.2f})")
+        self.stdout.write(f"compass labels:    {labels_ms:.3f} ms/call (scalar {scalar_ms:.3f} ms/call, x{scalar_ms / labels_ms:.2f})")
+        self.stdout.write(self.style.SUCCESS("identical output"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.hourly_store import ingest, store_targets
+
+
+class Command(BaseCommand):
+    help = "Fetch hourly forecasts for every province and Place and upsert changed hours into weather_forecast_hourly"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="forecast_days (1-16, mặc định HOURLY_STORE_FORECAST_DAYS)")
+        parser.add_argument("--past-days", type=int, default=None, help="past_days (0-92, mặc định HOURLY_STORE_PAST_DAYS)")
+        parser.add_argument("--kind", action="append", help="Chỉ lấy Place thuộc kind này (lặp lại được). Mặc định: mọi Place")
+        parser.add_argument("--no-provinces", action="store_true")
+        parser.add_argument("--no-places", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Số row / câu INSERT (mặc định HOURLY_STORE_CHUNK_ROWS)")
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is not None:
+            days = max(1, min(days, 16))
+        past_days = options["past_days"]
+        if past_days is not None:
+            past_days = max(0, min(past_days, 92))
+
+        started = time.perf_counter()
+        targets = store_targets(
+            place_kinds=options.get("kind"),
+            provinces=not options["no_provinces"],
+            places=not options["no_places"],
+        )
+        stats = ingest(targets, forecast_days=days, past_days=past_days, chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"DONE. targets={stats['targets']} rows={stats['rows']} inserted={stats['inserted']} "
+                f"updated={stats['updated']} unchanged={stats['unchanged']} "
+                f"rollup_days={stats.get('rollup_days', 0)} rollup_weeks={stats.get('rollup_weeks', 0)} in {elapsed:.2f}s"
+            )
+        )
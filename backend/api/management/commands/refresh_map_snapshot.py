@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.map_snapshot import refresh_seconds, refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Refresh the national map snapshot every MAP_SNAPSHOT_REFRESH_SEC seconds (run once per deployment, not per web worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kinds",
+            action="append",
+            default=[],
+            help="Bộ Place kind đi kèm tỉnh, cách nhau dấu phẩy như ?kind= (lặp lại được). Bộ chỉ có tỉnh luôn được refresh",
+        )
+        parser.add_argument("--once", action="store_true", help="Refresh 1 lần rồi thoát (dùng với cron)")
+
+    def handle(self, *args, **options):
+        sets = [()]
+        for raw in options["kinds"]:
+            kinds = tuple(sorted({k.strip() for k in raw.split(",") if k.strip()}))
+            if kinds not in sets:
+                sets.append(kinds)
+
+        interval = refresh_seconds()
+        if interval <= 0 and not options["once"]:
+            raise CommandError("MAP_SNAPSHOT_REFRESH_SEC <= 0: use --once")
+
+        while True:
+            started = time.perf_counter()
+            for place_kinds in sets:
+                close_old_connections()
+                try:
+                    entry = refresh_snapshot(place_kinds)
+                except Exception as e:
+                    self.stderr.write(f"kinds={','.join(place_kinds)}: {type(e).__name__}: {e}")
+                    continue
+                self.stdout.write(f"kinds={','.join(place_kinds)} fetched_at={entry.fetched_at.isoformat()}")
+            if options["once"]:
+                break
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
@@ -0,0 +1,53 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.hourly_store import store_days, store_targets
+from api.rollups import SOURCE_ARCHIVE, SOURCE_STORE, rollup_from_archive, rollup_from_store
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily + ISO-week rollups per province / Place from weather_forecast_hourly or the Open-Meteo archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", choices=[SOURCE_STORE, SOURCE_ARCHIVE], default=SOURCE_STORE)
+        parser.add_argument("--start", type=date.fromisoformat, default=None, help="YYYY-MM-DD (mặc định: đầu khoảng store / bắt buộc với archive)")
+        parser.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD (mặc định: cuối khoảng store / ngày archive đã chốt)")
+        parser.add_argument("--kind", action="append", help="Chỉ lấy Place thuộc kind này (lặp lại được). Mặc định: mọi Place")
+        parser.add_argument("--no-provinces", action="store_true")
+        parser.add_argument("--no-places", action="store_true")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start, end = options["start"], options["end"]
+        if options["source"] == SOURCE_ARCHIVE:
+            if start is None:
+                raise CommandError("--start is required with --source archive")
+            end = end or today
+        else:
+            past_days, forecast_days = store_days()
+            start = start or today - timedelta(days=past_days)
+            end = end or today + timedelta(days=forecast_days - 1)
+        if end < start:
+            raise CommandError("--end must not be before --start")
+
+        started = time.perf_counter()
+        targets = store_targets(
+            place_kinds=options.get("kind"),
+            provinces=not options["no_provinces"],
+            places=not options["no_places"],
+        )
+        if options["source"] == SOURCE_ARCHIVE:
+            stats = rollup_from_archive(targets, start, end)
+        else:
+            stats = rollup_from_store(targets, start, end)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"DONE. source={options['source']} targets={len(targets)} {start}..{end} "
+                f"days={stats['days']} weeks={stats['weeks']} in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hourly_partitions import (
+    archive_partition,
+    default_rows,
+    drop_partition,
+    ensure_partitions,
+    expired_partitions,
+    is_partitioned,
+    missing_partitions,
+    partition_name,
+)
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions of weather_forecast_hourly and drop (or archive) expired ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=None, help="Số tháng tạo trước (mặc định HOURLY_PARTITION_MONTHS_AHEAD)")
+        parser.add_argument("--retention-months", type=int, default=None, help="Giữ bao nhiêu tháng (mặc định HOURLY_RETENTION_MONTHS)")
+        parser.add_argument("--archive", action="store_true", help="Chuyển partition hết hạn sang schema HOURLY_ARCHIVE_SCHEMA thay vì xoá")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError("weather_forecast_hourly is not partitioned (PostgreSQL + migration 0006 required)")
+
+        expired = expired_partitions(options["retention_months"])
+        if options["dry_run"]:
+            missing = missing_partitions(options["ahead"])
+            for month in missing:
+                self.stdout.write(f"would create {partition_name(month)} (move {default_rows(month)} rows from DEFAULT)")
+            for name in expired:
+                self.stdout.write(f"would {'archive' if options['archive'] else 'drop'} {name}")
+            self.stdout.write(self.style.SUCCESS(f"DRY RUN. missing={len(missing)} expired={len(expired)}"))
+            return
+
+        created = ensure_partitions(options["ahead"])
+        for name in created:
+            self.stdout.write(f"created {name}")
+
+        for name in expired:
+            if options["archive"]:
+                self.stdout.write(f"archived {name} -> {archive_partition(name)}")
+            else:
+                drop_partition(name)
+                self.stdout.write(f"dropped {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"DONE. created={len(created)} removed={len(expired)}"))
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from api.models import Place
+from .forecast_cache import CacheEntry, cache_get_db, cache_set
+from .om_client import OPEN_METEO_FORECAST_BASE, local_iso, om_get_grid
+from .singleflight import advisory_lock
+
+# layer của bản đồ => field trong "current" của Open-Meteo
+SNAPSHOT_LAYERS = {
+    "temp": {"field": "temperature_2m", "unit": "°C"},
+    "rain": {"field": "precipitation", "unit": "mm"},
+    "humidity": {"field": "relative_humidity_2m", "unit": "%"},
+    "cloud": {"field": "cloud_cover", "unit": "%"},
+    "wind": {"field": "wind_speed_10m", "unit": "km/h", "direction": "wind_direction_10m"},
+}
+
+CURRENT_FIELDS = (
+    "temperature_2m",
+    "relative_humidity_2m",
+    "precipitation",
+    "cloud_cover",
+    "wind_speed_10m",
+    "wind_direction_10m",
+)
+
+
+def refresh_seconds() -> int:
+    """
+    Chu kỳ refresh nền của snapshot. 0 => không chạy scheduler, chỉ refresh khi có request thấy bản cũ.
+    """
+    return int(getattr(settings, "MAP_SNAPSHOT_REFRESH_SEC", 600))
+
+
+def snapshot_key(place_kinds: tuple = ()) -> str:
+    return "map_snapshot:v1:kinds=" + ",".join(place_kinds)
+
+
+def snapshot_regions(place_kinds: tuple = ()) -> list[tuple[str, str, float, float]]:
+    """
+    [(code, kind, lat, lon)] của mọi row trong provinces có centroid + Place thuộc place_kinds.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT code, centroid_lat, centroid_lon
+            FROM provinces
+            WHERE code IS NOT NULL AND centroid_lat IS NOT NULL AND centroid_lon IS NOT NULL
+            ORDER BY code ASC
+            """
+        )
+        regions = [(str(code), "province", float(lat), float(lon)) for code, lat, lon in cur.fetchall()]
+
+    if place_kinds:
+        qs = Place.objects.filter(kind__in=place_kinds).order_by("kind", "code").values_list("code", "kind", "lat", "lon")
+        regions.extend((str(code), str(kind), float(lat), float(lon)) for code, kind, lat, lon in qs)
+    return regions
+
+
+def build_snapshot(place_kinds: tuple = ()) -> dict:
+    """
+    Current conditions của toàn bộ region bằng vài request multi-location (OPEN_METEO_BATCH_SIZE điểm / request).
+    Payload dạng cột, mỗi mảng cùng thứ tự với "codes":
+    {"codes", "kinds", "lat", "lon", "time" (unixtime), "utc_offset_seconds", "current": {field: [...]}, "generated_at"}
+    """
+
+    regions = snapshot_regions(place_kinds)
+    params = {
+        "timezone": "auto",
+        "timeformat": "unixtime",
+        "wind_speed_unit": "kmh",
+        "precipitation_unit": "mm",
+        "current": ",".join(CURRENT_FIELDS),
+    }
+    oms = om_get_grid(OPEN_METEO_FORECAST_BASE, [(lat, lon) for _, _, lat, lon in regions], params)
+
+    times, offsets = [], []
+    current = {f: [] for f in CURRENT_FIELDS}
+    for om in oms:
+        cur = om.get("current") or {}
+        times.append(cur.get("time"))
+        offsets.append(int(om.get("utc_offset_seconds") or 0))
+        for f in CURRENT_FIELDS:
+            current[f].append(cur.get(f))
+
+    return {
+        "codes": [r[0] for r in regions],
+        "kinds": [r[1] for r in regions],
+        "lat": [r[2] for r in regions],
+        "lon": [r[3] for r in regions],
+        "time": times,
+        "utc_offset_seconds": offsets,
+        "current": current,
+        "generated_at": timezone.now().isoformat(),
+    }
+
+
+def refresh_snapshot(place_kinds: tuple = (), force: bool = False) -> CacheEntry:
+    """
+    Build + ghi snapshot vào cache 2 tầng (LRU + bảng forecast_cache, dùng chung giữa các worker).
+    Row trong bảng mới hơn nửa chu kỳ (worker khác vừa refresh) => nạp row đó vào LRU, không build lại.
+    Đọc thẳng bảng chứ không qua LRU: LRU của mỗi worker chỉ có bản do chính nó ghi.
+    Build (nhiều request Open-Meteo) chạy ngoài lock; advisory lock chỉ giữ quanh bước kiểm tra lại + ghi row.
+    """
+    key = snapshot_key(place_kinds)
+    cadence = max(refresh_seconds(), 60)
+
+    def _recent():
+        entry = None if force else cache_get_db(key)
+        if entry is not None and entry.fetched_at > timezone.now() - timedelta(seconds=cadence / 2):
+            return entry
+        return None
+
+    entry = _recent()
+    if entry is not None:
+        return entry
+
+    payload = build_snapshot(place_kinds)
+    wait = float(getattr(settings, "FORECAST_LOCK_WAIT_SEC", 20))
+    with advisory_lock(f"forecast_cache:{key}", wait_seconds=wait):
+        entry = _recent()
+        if entry is not None:
+            return entry
+        # hạn = 2 chu kỳ: scheduler lỡ 1 nhịp thì request vẫn nhận bản còn hạn
+        return cache_set(key, payload, lat=0.0, lon=0.0, forecast_days=0, tz="auto", ttl=timedelta(seconds=2 * cadence))
+
+
+def snapshot_layer(payload: dict, layer: str) -> dict:
+    """
+    Response gọn cho 1 layer: codes + values song song (+ direction_deg với wind).
+    """
+    spec = SNAPSHOT_LAYERS[layer]
+    current = payload.get("current") or {}
+    out = {
+        "layer": layer,
+        "unit": spec["unit"],
+        "time": None,
+        "codes": payload.get("codes") or [],
+        "values": current.get(spec["field"]) or [],
+    }
+    if "direction" in spec:
+        out["direction_deg"] = current.get(spec["direction"]) or []
+
+    # giờ quan trắc mới nhất, theo giờ địa phương của region đó
+    pairs = [(t, off) for t, off in zip(payload.get("time") or [], payload.get("utc_offset_seconds") or []) if t is not None]
+    if pairs:
+        out["time"] = local_iso(*max(pairs))
+
+    meta = {"source": "open-meteo", "generated_at": payload.get("generated_at")}
+    meta.update(payload.get("meta") or {})
+    out["meta"] = meta
+    return out
+
+
+_tracked: set = {()}
+_scheduler_lock = threading.Lock()
+_scheduler: threading.Thread | None = None
+
+
+def _scheduler_loop(interval: int) -> None:
+    stop = threading.Event()
+    while not stop.wait(interval):
+        close_old_connections()
+        for place_kinds in list(_tracked):
+            try:
+                refresh_snapshot(place_kinds)
+            except Exception:
+                # upstream lỗi => giữ bản cũ, nhịp sau thử lại
+                pass
+        close_old_connections()
+
+
+def scheduler_enabled() -> bool:
+    """
+    Thread refresh nền trong process web chỉ chạy khi bật MAP_SNAPSHOT_SCHEDULER (1 process / dev).
+    Nhiều worker: tắt, chạy `manage.py refresh_map_snapshot` (1 tiến trình riêng / cron) thay vì N vòng lặp.
+    """
+    return bool(getattr(settings, "MAP_SNAPSHOT_SCHEDULER", False)) and refresh_seconds() > 0
+
+
+def ensure_scheduler(place_kinds: tuple = ()) -> None:
+    """
+    Ghi nhận bộ place_kinds vừa được hỏi; MAP_SNAPSHOT_SCHEDULER bật => khởi động thread nền (1 / process,
+    ở request snapshot đầu tiên) refresh mọi bộ đã được hỏi mỗi MAP_SNAPSHOT_REFRESH_SEC giây.
+    Tắt => snapshot vẫn được refresh khi request thấy bản cũ (stale-while-revalidate).
+    """
+    _tracked.add(place_kinds)
+
+    global _scheduler
+    if _scheduler is not None or not scheduler_enabled():
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(
+                target=_scheduler_loop, args=(refresh_seconds(),), name="map-snapshot-refresh", daemon=True
+            )
+            _scheduler.start()
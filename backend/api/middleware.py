@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli không có => chỉ nén gzip
+    brotli = None
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_max_age, patch_vary_headers
+from django.utils.http import parse_etags
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 11 (mặc định của brotli) quá chậm cho response động
+
+_Q_RE = re.compile(r"q\s*=\s*([0-9.]+)")
+
+
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """
+    "gzip, br;q=0.9, *;q=0" => {"gzip": 1.0, "br": 0.9, "*": 0.0}
+    """
+    out: dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        m = _Q_RE.search(params)
+        if m:
+            try:
+                q = float(m.group(1))
+            except ValueError:
+                q = 0.0
+        out[token] = q
+    return out
+
+
+def choose_encoding(header: str) -> str | None:
+    """
+    Encoding dùng cho response: ưu tiên br (nếu có brotli), rồi gzip; client không nhận cái nào => None.
+    """
+    accepted = _accepted_encodings(header or "")
+    for enc in ("br", "gzip") if brotli is not None else ("gzip",):
+        if accepted.get(enc, accepted.get("*", 0.0)) > 0:
+            return enc
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    # mtime=0 => cùng input ra cùng bytes
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Nén gzip/brotli (theo Accept-Encoding) cho response JSON của API forecast lớn hơn COMPRESS_MIN_BYTES.
+    - Chỉ áp dụng cho path trong COMPRESS_PATH_PREFIXES (dữ liệu thời tiết công khai, không chứa token/secret
+      => không dính BREACH như khi nén response của auth).
+    - Response có ETag (payload cache, xem http_cache.conditional_response) => bytes đã nén được cache theo
+      (encoding, url, ETag) trong thời gian max-age, bundle đang nóng chỉ nén 1 lần.
+    - Giống GZipMiddleware của Django: thêm Vary: Accept-Encoding, ETag chuyển thành weak.
+      304 của view mang ETag strong => nếu client đang giữ bản weak (từ 200 đã nén) thì trả lại đúng bản weak,
+      để 1 representation chỉ có 1 validator.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = int(getattr(settings, "COMPRESS_MIN_BYTES", 1024))
+        self.prefixes = tuple(getattr(settings, "COMPRESS_PATH_PREFIXES", ("/api/",)))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.status_code == 304 and request.path.startswith(self.prefixes):
+            return self._weaken_not_modified(request, response)
+
+        if (
+            response.streaming
+            or response.status_code != 200
+            or response.has_header("Content-Encoding")
+            or not request.path.startswith(self.prefixes)
+            or not response.get("Content-Type", "").startswith("application/json")
+            or len(response.content) < self.min_bytes
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        etag = response.get("ETag")
+        max_age = get_max_age(response) or 0
+        cache_key = None
+        body = None
+        if etag and max_age > 0:
+            raw = f"{encoding}|{request.get_full_path()}|{etag}"
+            cache_key = "meteo:compressed:" + hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+            body = cache.get(cache_key)
+
+        if body is None:
+            body = compress(response.content, encoding)
+            if cache_key is not None:
+                cache.set(cache_key, body, max_age)
+
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = encoding
+        if etag:
+            response["ETag"] = re.sub(r'^"', 'W/"', etag)
+        return response
+
+    def _weaken_not_modified(self, request, response):
+        etag = response.get("ETag")
+        if etag and not etag.startswith("W/"):
+            weak = "W/" + etag
+            if weak in parse_etags(request.headers.get("If-None-Match") or ""):
+                response["ETag"] = weak
+        return response
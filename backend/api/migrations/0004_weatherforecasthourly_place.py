@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# weather_forecast_hourly là bảng managed=False (tạo sẵn trên Supabase) => đổi schema bằng SQL tay,
+# chỉ chạy trên PostgreSQL và khi bảng đã tồn tại (DB dev / sqlite bỏ qua).
+FORWARD_SQL = [
+    "ALTER TABLE weather_forecast_hourly ALTER COLUMN province_id DROP NOT NULL",
+    "ALTER TABLE weather_forecast_hourly ADD COLUMN IF NOT EXISTS place_id bigint NULL REFERENCES places (id) ON DELETE CASCADE",
+    # bản trùng (province_id, forecast_time) cũ => giữ row mới nhất trước khi tạo unique index
+    """
+    DELETE FROM weather_forecast_hourly a
+    USING weather_forecast_hourly b
+    WHERE a.province_id = b.province_id AND a.forecast_time = b.forecast_time AND a.id < b.id
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS wfh_province_time_uniq
+    ON weather_forecast_hourly (province_id, forecast_time) WHERE province_id IS NOT NULL
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS wfh_place_time_uniq
+    ON weather_forecast_hourly (place_id, forecast_time) WHERE place_id IS NOT NULL
+    """,
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS wfh_place_time_uniq",
+    "DROP INDEX IF EXISTS wfh_province_time_uniq",
+    "DELETE FROM weather_forecast_hourly WHERE province_id IS NULL",
+    "ALTER TABLE weather_forecast_hourly DROP COLUMN IF EXISTS place_id",
+    "ALTER TABLE weather_forecast_hourly ALTER COLUMN province_id SET NOT NULL",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != "postgresql":
+            return
+        if "weather_forecast_hourly" not in connection.introspection.table_names():
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_place'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(BACKWARD_SQL)),
+    ]
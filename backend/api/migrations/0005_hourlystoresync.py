@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+# weather_forecast_hourly managed=False => thêm cột bằng SQL tay (PostgreSQL, bảng đã tồn tại), như 0004
+FORWARD_SQL = [
+    "ALTER TABLE weather_forecast_hourly ADD COLUMN IF NOT EXISTS feels_like_c double precision NULL",
+    "ALTER TABLE weather_forecast_hourly ADD COLUMN IF NOT EXISTS precip_prob_percent double precision NULL",
+]
+
+BACKWARD_SQL = [
+    "ALTER TABLE weather_forecast_hourly DROP COLUMN IF EXISTS precip_prob_percent",
+    "ALTER TABLE weather_forecast_hourly DROP COLUMN IF EXISTS feels_like_c",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != "postgresql":
+            return
+        if "weather_forecast_hourly" not in connection.introspection.table_names():
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_weatherforecasthourly_place'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(BACKWARD_SQL)),
+        migrations.CreateModel(
+            name='HourlyStoreSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=16)),
+                ('owner_id', models.BigIntegerField()),
+                ('synced_at', models.DateTimeField()),
+                ('first_time', models.DateTimeField()),
+                ('last_time', models.DateTimeField()),
+                ('timezone', models.TextField(blank=True, null=True)),
+                ('utc_offset_seconds', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'hourly_store_sync',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'owner_id'), name='hourly_store_sync_owner_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+from datetime import date
+
+from django.db import migrations
+
+# Đổi weather_forecast_hourly (heap, managed=False) sang bảng partition theo tháng trên forecast_time.
+# PK phải chứa khoá partition => (id, forecast_time). Index: unique từng phần (khoá upsert, như 0004)
+# + BRIN trên forecast_time (bảng ghi theo thời gian tăng dần => BRIN rất nhỏ mà vẫn lọc khoảng nhanh).
+# Partition default giữ row rơi ngoài các tháng đã tạo; manage.py rollover_hourly_partitions tạo tháng mới / xoá tháng cũ.
+TABLE = "weather_forecast_hourly"
+COLUMNS = (
+    "id, province_id, place_id, forecast_time, temp_c, feels_like_c, humidity_percent, pressure_hpa, "
+    "wind_speed_ms, wind_dir_deg, cloud_cover_percent, precip_mm, precip_prob_percent, created_at"
+)
+MONTHS_AHEAD = 3
+
+
+def _column_defs(identity: str) -> str:
+    return f"""
+        id bigint {identity},
+        province_id bigint NULL REFERENCES provinces (id),
+        place_id bigint NULL REFERENCES places (id) ON DELETE CASCADE,
+        forecast_time timestamptz NOT NULL,
+        temp_c double precision NULL,
+        feels_like_c double precision NULL,
+        humidity_percent double precision NULL,
+        pressure_hpa double precision NULL,
+        wind_speed_ms double precision NULL,
+        wind_dir_deg double precision NULL,
+        cloud_cover_percent double precision NULL,
+        precip_mm double precision NULL,
+        precip_prob_percent double precision NULL,
+        created_at timestamptz NULL
+    """
+
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def _relkind(cur, name: str):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [name])
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _unique_indexes(cur) -> None:
+    cur.execute(
+        f"CREATE UNIQUE INDEX wfh_province_time_uniq ON {TABLE} (province_id, forecast_time) WHERE province_id IS NOT NULL"
+    )
+    cur.execute(f"CREATE UNIQUE INDEX wfh_place_time_uniq ON {TABLE} (place_id, forecast_time) WHERE place_id IS NOT NULL")
+
+
+def to_partitioned(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cur:
+        if _relkind(cur, TABLE) != "r":
+            return  # chưa có bảng / đã partition
+
+        # chặn ghi (ingest / read-through) tới khi migration commit: row ghi sau lúc copy sẽ mất khi DROP bảng cũ.
+        # EXCLUSIVE vẫn cho SELECT chạy tiếp trong lúc copy.
+        cur.execute(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE")
+
+        new = f"{TABLE}_new"
+        cur.execute(
+            f"CREATE TABLE {new} ({_column_defs('GENERATED BY DEFAULT AS IDENTITY')}, "
+            f"PRIMARY KEY (id, forecast_time)) PARTITION BY RANGE (forecast_time)"
+        )
+        cur.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {new} DEFAULT")
+
+        # 1 partition / tháng từ tháng cũ nhất đang có dữ liệu tới MONTHS_AHEAD tháng sau
+        cur.execute(f"SELECT min(forecast_time), now() FROM {TABLE}")
+        oldest, now = cur.fetchone()
+        month = date((oldest or now).year, (oldest or now).month, 1)
+        last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            nxt = _add_months(month, 1)
+            cur.execute(
+                f"CREATE TABLE {TABLE}_p{month.year:04d}_{month.month:02d} PARTITION OF {new} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{nxt.isoformat()} 00:00+00')"
+            )
+            month = nxt
+
+        cur.execute(f"INSERT INTO {new} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}")
+        cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {new}", [new])
+        cur.execute(f"DROP TABLE {TABLE}")
+        cur.execute(f"ALTER TABLE {new} RENAME TO {TABLE}")
+        cur.execute(f"ALTER TABLE {TABLE} RENAME CONSTRAINT {new}_pkey TO {TABLE}_pkey")
+
+        # index tạo sau khi nạp dữ liệu (nhanh hơn cập nhật index từng row)
+        _unique_indexes(cur)
+        cur.execute(f"CREATE INDEX wfh_forecast_time_brin ON {TABLE} USING brin (forecast_time)")
+
+
+def to_heap(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cur:
+        if _relkind(cur, TABLE) != "p":
+            return
+
+        cur.execute(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE")
+
+        heap = f"{TABLE}_heap"
+        cur.execute(f"CREATE TABLE {heap} ({_column_defs('GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY')})")
+        cur.execute(f"INSERT INTO {heap} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}")
+        cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {heap}", [heap])
+        cur.execute(f"DROP TABLE {TABLE} CASCADE")
+        cur.execute(f"ALTER TABLE {heap} RENAME TO {TABLE}")
+        cur.execute(f"ALTER TABLE {TABLE} RENAME CONSTRAINT {heap}_pkey TO {TABLE}_pkey")
+        _unique_indexes(cur)
+        cur.execute(f"CREATE INDEX weather_forecast_hourly_province_id_forecast_time_idx ON {TABLE} (province_id, forecast_time)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hourlystoresync'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_partitioned, to_heap),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_weatherforecasthourly_partitioned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=16)),
+                ('owner_id', models.BigIntegerField()),
+                ('day', models.DateField()),
+                ('tmax_c', models.FloatField(blank=True, null=True)),
+                ('tmin_c', models.FloatField(blank=True, null=True)),
+                ('tmean_c', models.FloatField(blank=True, null=True)),
+                ('rain_sum_mm', models.FloatField(blank=True, null=True)),
+                ('wind_max_kmh', models.FloatField(blank=True, null=True)),
+                ('cloud_mean_percent', models.FloatField(blank=True, null=True)),
+                ('humidity_mean_percent', models.FloatField(blank=True, null=True)),
+                ('source', models.CharField(max_length=16)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'region_daily_rollup',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'owner_id', 'day'), name='region_daily_rollup_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegionWeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=16)),
+                ('owner_id', models.BigIntegerField()),
+                ('iso_year', models.IntegerField()),
+                ('iso_week', models.IntegerField()),
+                ('week_start', models.DateField()),
+                ('days', models.IntegerField(default=0)),
+                ('tmax_avg_c', models.FloatField(blank=True, null=True)),
+                ('tmin_avg_c', models.FloatField(blank=True, null=True)),
+                ('tmean_avg_c', models.FloatField(blank=True, null=True)),
+                ('rain_sum_mm', models.FloatField(blank=True, null=True)),
+                ('wind_max_avg_kmh', models.FloatField(blank=True, null=True)),
+                ('wind_max_kmh', models.FloatField(blank=True, null=True)),
+                ('cloud_mean_percent', models.FloatField(blank=True, null=True)),
+                ('humidity_mean_percent', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'region_weekly_rollup',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'owner_id', 'iso_year', 'iso_week'), name='region_weekly_rollup_uniq')],
+            },
+        ),
+    ]
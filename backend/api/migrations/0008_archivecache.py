@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_region_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('resolution', models.CharField(max_length=8)),
+                ('variable', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('value', models.JSONField(null=True)),
+                ('timezone', models.TextField(blank=True, null=True)),
+                ('utc_offset_seconds', models.IntegerField(default=0)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archive_cache',
+                'constraints': [models.UniqueConstraint(fields=('lat', 'lon', 'resolution', 'variable', 'day'), name='archive_cache_uniq')],
+            },
+        ),
+    ]
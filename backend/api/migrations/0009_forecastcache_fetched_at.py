@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_archivecache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forecastcache',
+            name='fetched_at',
+            field=models.DateTimeField(),
+        ),
+    ]
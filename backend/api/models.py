@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -17,8 +18,8 @@ class Province(models.Model):
 
 class WeatherForecastHourly(models.Model):
     """
-    Bảng lưu thời tiết theo giờ cho từng tỉnh.
-    Được đổ dữ liệu bởi fetch_open_meteo.py.
+    Bảng lưu thời tiết theo giờ cho từng tỉnh / Place (mỗi row có đúng 1 trong province_id, place_id).
+    Được đổ dữ liệu bởi management command ingest_hourly_forecast (api/hourly_store.py).
     """
 
     id = models.BigAutoField(primary_key=True)
@@ -27,30 +28,145 @@ class WeatherForecastHourly(models.Model):
         on_delete=models.DO_NOTHING,
         db_column="province_id",
         related_name="hourly_forecasts",
+        null=True,
+        blank=True,
+    )
+    place = models.ForeignKey(
+        "Place",
+        on_delete=models.DO_NOTHING,
+        db_column="place_id",
+        related_name="hourly_forecasts",
+        null=True,
+        blank=True,
     )
     forecast_time = models.DateTimeField()
 
     temp_c = models.FloatField(null=True, blank=True)
+    feels_like_c = models.FloatField(null=True, blank=True)
     humidity_percent = models.FloatField(null=True, blank=True)
     pressure_hpa = models.FloatField(null=True, blank=True)
     wind_speed_ms = models.FloatField(null=True, blank=True)
     wind_dir_deg = models.FloatField(null=True, blank=True)
     cloud_cover_percent = models.FloatField(null=True, blank=True)
     precip_mm = models.FloatField(null=True, blank=True)
+    precip_prob_percent = models.FloatField(null=True, blank=True)
 
     created_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "weather_forecast_hourly"
         managed = False
+        # bảng partition theo tháng trên forecast_time (migration 0006, manage.py rollover_hourly_partitions)
         indexes = [
-            models.Index(fields=["province", "forecast_time"]),
+            BrinIndex(fields=["forecast_time"], name="wfh_forecast_time_brin"),
+        ]
+        # unique từng phần: khoá upsert (ON CONFLICT) của ingest, xem migration 0004
+        constraints = [
+            models.UniqueConstraint(
+                fields=["province", "forecast_time"],
+                condition=models.Q(province__isnull=False),
+                name="wfh_province_time_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["place", "forecast_time"],
+                condition=models.Q(place__isnull=False),
+                name="wfh_place_time_uniq",
+            ),
         ]
 
     def __str__(self):
         return f"{self.province_id} @ {self.forecast_time}"
 
 
+class HourlyStoreSync(models.Model):
+    """
+    Lần ghi gần nhất của 1 tỉnh / Place vào weather_forecast_hourly (ingest hoặc write-through):
+    đọc từ store dựa vào đây để biết dữ liệu còn đủ mới và phủ đủ khoảng giờ cần không.
+    """
+
+    owner = models.CharField(max_length=16)  # "province_id" | "place_id"
+    owner_id = models.BigIntegerField()
+    synced_at = models.DateTimeField()
+    first_time = models.DateTimeField()
+    last_time = models.DateTimeField()
+    timezone = models.TextField(null=True, blank=True)
+    utc_offset_seconds = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "hourly_store_sync"
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "owner_id"], name="hourly_store_sync_owner_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}={self.owner_id} @ {self.synced_at}"
+
+
+class RegionDailyRollup(models.Model):
+    """
+    Tổng hợp theo ngày địa phương của 1 tỉnh / Place (api/rollups.py): gom từ weather_forecast_hourly
+    (source="hourly_store", gồm cả ngày dự báo) hoặc lấy daily của Archive API (source="archive", ngày đã chốt).
+    """
+
+    owner = models.CharField(max_length=16)  # "province_id" | "place_id"
+    owner_id = models.BigIntegerField()
+    day = models.DateField()
+
+    tmax_c = models.FloatField(null=True, blank=True)
+    tmin_c = models.FloatField(null=True, blank=True)
+    tmean_c = models.FloatField(null=True, blank=True)
+    rain_sum_mm = models.FloatField(null=True, blank=True)
+    wind_max_kmh = models.FloatField(null=True, blank=True)
+    cloud_mean_percent = models.FloatField(null=True, blank=True)
+    humidity_mean_percent = models.FloatField(null=True, blank=True)
+
+    source = models.CharField(max_length=16)  # "hourly_store" | "archive"
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "region_daily_rollup"
+        # unique index (owner, owner_id, day) cũng là index cho truy vấn khoảng ngày (tuần / tháng / mùa)
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "owner_id", "day"], name="region_daily_rollup_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}={self.owner_id} @ {self.day}"
+
+
+class RegionWeeklyRollup(models.Model):
+    """
+    Tổng hợp theo tuần ISO (thứ 2 - chủ nhật) tính lại từ RegionDailyRollup mỗi khi ngày trong tuần đổi.
+    """
+
+    owner = models.CharField(max_length=16)
+    owner_id = models.BigIntegerField()
+    iso_year = models.IntegerField()
+    iso_week = models.IntegerField()
+    week_start = models.DateField()
+    days = models.IntegerField(default=0)  # số ngày có rollup (7 = đủ tuần)
+
+    tmax_avg_c = models.FloatField(null=True, blank=True)
+    tmin_avg_c = models.FloatField(null=True, blank=True)
+    tmean_avg_c = models.FloatField(null=True, blank=True)
+    rain_sum_mm = models.FloatField(null=True, blank=True)
+    wind_max_avg_kmh = models.FloatField(null=True, blank=True)
+    wind_max_kmh = models.FloatField(null=True, blank=True)
+    cloud_mean_percent = models.FloatField(null=True, blank=True)
+    humidity_mean_percent = models.FloatField(null=True, blank=True)
+
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "region_weekly_rollup"
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "owner_id", "iso_year", "iso_week"], name="region_weekly_rollup_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}={self.owner_id} @ {self.iso_year}-W{self.iso_week:02d}"
+
+
 class ForecastCache(models.Model):
     cache_key = models.TextField(unique=True)
     lat = models.FloatField()
@@ -58,12 +174,41 @@ class ForecastCache(models.Model):
     forecast_days = models.IntegerField(default=10)
     timezone = models.TextField(null=True, blank=True)
     payload = models.JSONField()
-    fetched_at = models.DateTimeField(auto_now_add=True)
+    # cache_set luôn truyền fetched_at (cùng giá trị với CacheEntry trong LRU => ETag / generation khớp giữa các worker)
+    fetched_at = models.DateTimeField()
     expires_at = models.DateTimeField()
 
     class Meta:
         db_table = "forecast_cache"
 
+
+class ArchiveCache(models.Model):
+    """
+    Số liệu Archive API (quá khứ) theo (toạ độ, ngày, biến) — api/archive_cache.py. Chỉ ghi ngày đã chốt
+    (cũ hơn OPEN_METEO_ARCHIVE_LAG_DAYS) nên không bao giờ hết hạn; khoảng ngày chồng nhau dùng lại row đã có.
+    value: số (resolution="daily") hoặc list giá trị từng giờ của ngày địa phương (resolution="hourly").
+    """
+
+    lat = models.FloatField()  # làm tròn archive_cache.COORD_DECIMALS
+    lon = models.FloatField()
+    resolution = models.CharField(max_length=8)  # "daily" | "hourly"
+    variable = models.CharField(max_length=64)
+    day = models.DateField()
+    value = models.JSONField(null=True)
+    timezone = models.TextField(null=True, blank=True)
+    utc_offset_seconds = models.IntegerField(default=0)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "archive_cache"
+        # day đứng cuối: đọc 1 khoảng ngày của (toạ độ, biến) là 1 lần quét index
+        constraints = [
+            models.UniqueConstraint(fields=["lat", "lon", "resolution", "variable", "day"], name="archive_cache_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.lat},{self.lon} {self.resolution}:{self.variable} @ {self.day}"
+
     
 class UserRole(models.Model):
     ROLE_CHOICES = [
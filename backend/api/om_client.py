@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import numpy as np
+except ImportError:  # numpy không có => local_iso_many đổi từng phần tử
+    np = None
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .circuit_breaker import CircuitBreaker
+from .regions import snap_to_grid
+from .singleflight import SingleFlight, upstream_key
+
+OPEN_METEO_FORECAST_BASE = "https://api.open-meteo.com/v1/forecast"
+OPEN_METEO_ARCHIVE_BASE = "https://archive-api.open-meteo.com/v1/archive"
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+_EPOCH = datetime(1970, 1, 1)
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_flight = SingleFlight()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def http_timeout() -> Tuple[float, float]:
+    """
+    Timeout (connect, read) dùng chung cho mọi lời gọi Open-Meteo.
+    """
+    return (
+        float(getattr(settings, "OPEN_METEO_CONNECT_TIMEOUT", 5)),
+        float(getattr(settings, "OPEN_METEO_READ_TIMEOUT", 15)),
+    )
+
+
+def _build_session() -> requests.Session:
+    """
+    Retry chỉ cho lỗi nhanh, không retry read timeout (1 lần chờ đã tốn cả read timeout):
+    - lỗi kết nối: tối đa 1 + OPEN_METEO_RETRIES lần, mỗi lần <= connect timeout (mặc định ~3×5s + backoff ~ 16s)
+    - read timeout: không retry => <= connect + read (mặc định 5 + 15 = 20s, như trước khi có retry)
+    - 429 / 5xx: thử lại đúng 1 lần, bỏ qua Retry-After (breaker lo việc nghỉ dài)
+      => trần lý thuyết 2 × (connect + read) khi upstream trả 5xx rất chậm, thực tế < 1s
+    """
+    retries = int(getattr(settings, "OPEN_METEO_RETRIES", 2))
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=min(retries, 1),
+        backoff_factor=float(getattr(settings, "OPEN_METEO_BACKOFF", 0.3)),
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=int(getattr(settings, "OPEN_METEO_POOL_MAXSIZE", 10)),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Mỗi host (api.open-meteo.com, archive-api.open-meteo.com, ...) có 1 Session riêng
+    => giữ kết nối keep-alive, không phải bắt tay TCP+TLS lại mỗi request.
+    """
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _build_session()
+            _sessions[host] = session
+    return session
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """
+    Mỗi host 1 breaker riêng (forecast và archive không kéo nhau xuống).
+    """
+    host = urlsplit(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is not None:
+        return breaker
+
+    with _sessions_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                window=int(getattr(settings, "OPEN_METEO_BREAKER_WINDOW", 20)),
+                min_calls=int(getattr(settings, "OPEN_METEO_BREAKER_MIN_CALLS", 5)),
+                error_rate=float(getattr(settings, "OPEN_METEO_BREAKER_ERROR_RATE", 0.5)),
+                slow_call_seconds=float(getattr(settings, "OPEN_METEO_BREAKER_SLOW_SEC", 8)),
+                open_seconds=float(getattr(settings, "OPEN_METEO_BREAKER_OPEN_SEC", 30)),
+            )
+            _breakers[host] = breaker
+    return breaker
+
+
+def breaker_states() -> list:
+    """
+    Trạng thái breaker của process hiện tại (mỗi gunicorn worker có bộ đếm riêng).
+    """
+    return [b.snapshot() for b in list(_breakers.values())]
+
+
+def _fetch(url: str, params: Dict[str, Any]) -> Any:
+    breaker = get_breaker(url)
+    breaker.before_call()
+
+    started = time.monotonic()
+    try:
+        resp = get_session(url).get(url, params=params, timeout=http_timeout())
+    except BaseException as e:
+        # mọi exception đều phải record: half-open mà bỏ sót thì lời gọi thử kẹt mãi, breaker không đóng lại
+        breaker.record(False, time.monotonic() - started, f"{type(e).__name__}: {e}")
+        raise
+
+    # latency của lần thử cuối (resp.elapsed), không tính các lần retry + backoff của urllib3 trước đó
+    # => lời gọi retry rồi thành công nhanh không bị tính là gọi chậm
+    # 4xx (sai params) không phải lỗi của host => không tính vào breaker
+    host_error = resp.status_code >= 500 or resp.status_code == 429
+    breaker.record(not host_error, resp.elapsed.total_seconds(), f"HTTP {resp.status_code}" if host_error else None)
+
+    resp.raise_for_status()
+    return resp.json()
+
+
+def om_get(url: str, params: Dict[str, Any]) -> Any:
+    """
+    GET tới Open-Meteo qua pool dùng chung và trả JSON.
+    Các request đồng thời có cùng url + params được gộp thành 1 lời gọi upstream (single-flight).
+    Lỗi HTTP (sau khi đã retry) được raise dưới dạng requests.HTTPError như requests.get cũ.
+    """
+    return _flight.do(upstream_key(url, params), lambda: _fetch(url, params))
+
+
+def batch_size() -> int:
+    return max(1, int(getattr(settings, "OPEN_METEO_BATCH_SIZE", 50)))
+
+
+def om_get_many(url: str, coords: List[Tuple[float, float]], params: Dict[str, Any]) -> List[Any]:
+    """
+    Gọi Open-Meteo cho nhiều toạ độ cùng lúc (latitude/longitude dạng "a,b,c").
+    Chia coords thành từng chunk OPEN_METEO_BATCH_SIZE điểm, trả list JSON theo đúng thứ tự coords.
+    """
+    out: List[Any] = []
+    size = batch_size()
+    for i in range(0, len(coords), size):
+        chunk = coords[i : i + size]
+        q = dict(params)
+        q["latitude"] = ",".join(f"{lat:.6f}" for lat, _ in chunk)
+        q["longitude"] = ",".join(f"{lon:.6f}" for _, lon in chunk)
+        data = om_get(url, q)
+        # 1 toạ độ => Open-Meteo trả object, nhiều toạ độ => trả list
+        if isinstance(data, dict):
+            data = [data]
+        if len(data) != len(chunk):
+            raise ValueError(f"Open-Meteo returned {len(data)} locations for {len(chunk)} coordinates")
+        out.extend(data)
+    return out
+
+
+def om_get_grid(url: str, coords: List[Tuple[float, float]], params: Dict[str, Any]) -> List[Any]:
+    """
+    om_get_many cho toạ độ của nhiều region: snap về lưới (OPEN_METEO_GRID_SNAP_DEG), các toạ độ chung ô
+    chỉ gửi 1 lần. Trả list JSON theo đúng thứ tự coords (toạ độ chung ô dùng chung 1 object).
+    """
+    snapped = [snap_to_grid(lat, lon) for lat, lon in coords]
+    cells = list(dict.fromkeys(snapped))
+    by_cell = dict(zip(cells, om_get_many(url, cells, params)))
+    return [by_cell[c] for c in snapped]
+
+
+def local_iso(ts: Optional[int], utc_offset_seconds: int = 0, daily: bool = False) -> Optional[str]:
+    """
+    Unix time (UTC, từ timeformat=unixtime) => chuỗi giờ địa phương giống timeformat=iso8601 của Open-Meteo:
+    "YYYY-MM-DDTHH:MM" (hourly/current) hoặc "YYYY-MM-DD" (daily).
+    """
+    if ts is None:
+        return None
+    dt = _EPOCH + timedelta(seconds=int(ts) + int(utc_offset_seconds or 0))
+    return dt.date().isoformat() if daily else dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def local_iso_many(ts_list: List[Optional[int]], utc_offset_seconds: int = 0, daily: bool = False) -> List[Optional[str]]:
+    """
+    local_iso cho cả mảng (dùng numpy datetime64 khi có).
+    """
+    if np is not None and ts_list:
+        try:
+            arr = np.asarray(ts_list, dtype=np.int64) + int(utc_offset_seconds or 0)
+        except (TypeError, ValueError):
+            arr = None
+        if arr is not None:
+            return np.datetime_as_string(arr.astype("datetime64[s]"), unit="D" if daily else "m").tolist()
+    return [local_iso(t, utc_offset_seconds, daily) for t in ts_list]
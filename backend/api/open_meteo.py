@@ -1,15 +1,14 @@
 from __future__ import annotations
 
-from datetime import date, datetime
+from datetime import date
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
 from django.db import connection
 
-OPEN_METEO_FORECAST_BASE = "https://api.open-meteo.com/v1/forecast"
-OPEN_METEO_ARCHIVE_BASE = "https://archive-api.open-meteo.com/v1/archive"
+from .archive_cache import archive_daily, archive_hourly
+from .om_client import OPEN_METEO_FORECAST_BASE, local_iso, om_get
+
 PROVINCES_TABLE = "public.provinces"
-HTTP_TIMEOUT_SEC = 20
 DAILY_CLOUD_CANONICAL = "cloud_cover_mean"
 DAILY_CLOUD_ALIASES = {"cloud_cover": DAILY_CLOUD_CANONICAL}
 
@@ -67,9 +66,7 @@ def _om_get(url: str, lat: float, lon: float, params: Dict[str, Any]) -> Dict[st
     }
     base.update(params)
 
-    resp = requests.get(url, params=base, timeout=HTTP_TIMEOUT_SEC)
-    resp.raise_for_status()
-    return resp.json()
+    return om_get(url, base)
 
 
 def _safe_float(x: Any) -> Optional[float]:
@@ -81,20 +78,20 @@ def _safe_float(x: Any) -> Optional[float]:
         return None
 
 
-def _pick_hour_index(times: List[str], target: datetime) -> int:
+def _pick_hour_index(times: List[int], target_ts: int) -> int:
     """
-    Chọn index giờ gần target nhất trong mảng time dạng ISO.
-    Nếu parse fail -> trả 0.
+    Chọn index giờ gần target_ts nhất trong mảng time dạng unixtime.
+    Phần tử không phải số => bỏ qua; không có phần tử hợp lệ -> trả 0.
     """
     best_i = 0
-    best_dt = None
+    best_diff = None
     for i, t in enumerate(times):
         try:
-            dt = datetime.fromisoformat(t)
-        except Exception:
+            diff = abs(int(t) - target_ts)
+        except (TypeError, ValueError):
             continue
-        if best_dt is None or abs((dt - target).total_seconds()) < abs((best_dt - target).total_seconds()):
-            best_dt = dt
+        if best_diff is None or diff < best_diff:
+            best_diff = diff
             best_i = i
     return best_i
 
@@ -162,21 +159,13 @@ def om_archive_daily(
     """
     Lấy daily từ Archive API cho khoảng ngày [start, end] (quá khứ).
     Normalize cloud field tương tự forecast daily.
+    Đi qua archive_cache: ngày đã chốt đọc từ DB, chỉ gọi API cho ngày còn thiếu.
     """
     lat, lon = _get_latlon_by_province_code(province_code)
 
     normalized = _normalize_daily_fields(daily_fields)
 
-    payload = _om_get(
-        OPEN_METEO_ARCHIVE_BASE,
-        lat,
-        lon,
-        {
-            "start_date": start.isoformat(),
-            "end_date": end.isoformat(),
-            "daily": ",".join(normalized),
-        },
-    )
+    payload = archive_daily(lat, lon, start, end, normalized)
     return _alias_daily_cloud(payload)
 
 
@@ -187,7 +176,7 @@ def get_weather_snapshot(
     """
     Dùng cho export PDF từ popup (temp/humidity/wind/cloud/rain).
     - Nếu day=None hoặc day=today: dùng Forecast 'current=' để lấy số liệu hiện tại.
-    - Nếu day là ngày quá khứ: dùng Archive 'hourly=' (start=end=day) và lấy giá trị gần 12:00 trưa (giảm lệch).
+    - Nếu day là ngày quá khứ: dùng Archive 'hourly=' (start=end=day, qua archive_cache) và lấy giá trị gần 12:00 trưa (giảm lệch).
 
     Trả về dict chuẩn:
       {
@@ -230,6 +219,7 @@ def get_weather_snapshot(
                         "wind_direction_10m",
                     ]
                 ),
+                "timeformat": "unixtime",
             },
         )
         cur = payload.get("current") or {}
@@ -237,7 +227,7 @@ def get_weather_snapshot(
         return {
             "province_code": code,
             "province_name": province_name,
-            "time": cur.get("time"),
+            "time": local_iso(cur.get("time"), payload.get("utc_offset_seconds") or 0),
             "temperature_c": _safe_float(cur.get("temperature_2m")),
             "humidity_percent": _safe_float(cur.get("relative_humidity_2m")),
             "wind_kmh": _safe_float(cur.get("wind_speed_10m")),
@@ -246,7 +236,6 @@ def get_weather_snapshot(
             "precip_mm": _safe_float(cur.get("precipitation")),
         }
 
-    target_dt = datetime.fromisoformat(day.isoformat() + "T12:00")
     hourly_vars = [
         "temperature_2m",
         "relative_humidity_2m",
@@ -256,19 +245,11 @@ def get_weather_snapshot(
         "wind_direction_10m",
     ]
 
-    payload = _om_get(
-        OPEN_METEO_ARCHIVE_BASE,
-        lat,
-        lon,
-        {
-            "start_date": day.isoformat(),
-            "end_date": day.isoformat(),
-            "hourly": ",".join(hourly_vars),
-        },
-    )
+    payload = archive_hourly(lat, lon, day, day, hourly_vars)
 
     hourly = payload.get("hourly") or {}
-    times: List[str] = hourly.get("time") or []
+    times: List[int] = hourly.get("time") or []
+    offset = int(payload.get("utc_offset_seconds") or 0)
     if not times:
         return {
             "province_code": code,
@@ -282,7 +263,9 @@ def get_weather_snapshot(
             "precip_mm": None,
         }
 
-    i = _pick_hour_index(times, target_dt)
+    # 12:00 trưa theo giờ địa phương của toạ độ (utc_offset_seconds do Open-Meteo trả về)
+    target_ts = (day - date(1970, 1, 1)).days * 86400 + 12 * 3600 - offset
+    i = _pick_hour_index(times, target_ts)
 
     def at(var: str) -> Optional[float]:
         arr = hourly.get(var)
@@ -293,7 +276,7 @@ def get_weather_snapshot(
     return {
         "province_code": code,
         "province_name": province_name,
-        "time": times[i] if i < len(times) else None,
+        "time": local_iso(times[i], offset) if i < len(times) else None,
         "temperature_c": at("temperature_2m"),
         "humidity_percent": at("relative_humidity_2m"),
         "wind_kmh": at("wind_speed_10m"),
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connection
+from django.http import Http404
+
+from .models import Place
+
+
+def snap_to_grid(lat: float, lon: float) -> tuple[float, float]:
+    """
+    OPEN_METEO_GRID_SNAP_DEG > 0: làm tròn toạ độ về nút lưới gần nhất (bội số của step, vd 0.1° ~ 11km)
+    để các quận/huyện gần cùng 1 nút dùng chung cache + 1 lần gọi upstream.
+    0 (mặc định) => giữ nguyên toạ độ.
+    """
+    step = float(getattr(settings, "OPEN_METEO_GRID_SNAP_DEG", 0) or 0)
+    if step <= 0:
+        return lat, lon
+    return round(round(lat / step) * step, 6), round(round(lon / step) * step, 6)
+
+
+def get_region_coord(code: str):
+    """
+    Resolve (region_dict, lat, lon) theo code:
+    - ưu tiên bảng provinces (Supabase) qua raw SQL
+    - fallback sang bảng places (Django model Place)
+    Trả về dict cùng shape "province" hiện tại để frontend khỏi đổi.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id, code, name, centroid_lat, centroid_lon
+            FROM provinces
+            WHERE code = %s
+            LIMIT 1
+            """,
+            [code],
+        )
+        row = cur.fetchone()
+
+    if row:
+        id_, code_db, name, lat, lon = row
+        region = {"id": int(id_), "code": str(code_db), "name": str(name), "kind": "province"}
+        if lat is None or lon is None:
+            return region, None, None
+        return region, float(lat), float(lon)
+
+    place = Place.objects.filter(code=code).only("id", "code", "name", "kind", "lat", "lon").first()
+    if place:
+        region = {"id": int(place.id), "code": str(place.code), "name": str(place.name), "kind": str(place.kind)}
+        if place.lat is None or place.lon is None:
+            return region, None, None
+        return region, float(place.lat), float(place.lon)
+
+    raise Http404(f"Region with code={code} not found")
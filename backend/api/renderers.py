@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import codecs
+
+try:
+    import orjson
+except ImportError:  # orjson không có => dùng JSONRenderer / JSONParser mặc định của DRF
+    orjson = None
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_encoder = JSONEncoder()
+
+if orjson is not None:
+    # - datetime/date/time đi qua encoder của DRF để format y hệt ("...Z" cho UTC, microsecond như isoformat)
+    # - key không phải str (int, date, ...) được đổi sang str như json.dumps
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer dùng orjson (nhanh hơn json stdlib nhiều lần với bundle vài trăm điểm).
+    Cùng dữ liệu với JSONRenderer của DRF (Decimal -> float, datetime -> ISO, UUID/lazy str/QuerySet/numpy ...);
+    separator gọn + UTF-8 không escape giống COMPACT_JSON / UNICODE_JSON mặc định. Khác ở chỗ:
+    - float dạng số mũ: 1e16 / 1e-7 (json stdlib: 1e+16 / 1e-07) — parse ra cùng giá trị, khác byte
+    - NaN / Infinity => null (JSONRenderer strict thì raise ValueError)
+    - ?indent / "application/json; indent=N" => luôn thụt 2 space
+    Không có orjson hoặc orjson không encode được (vd int > 64 bit) => fallback JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        option = _OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=_drf_encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # giống JSONRenderer: escape U+2028 / U+2029 để output là tập con hợp lệ của javascript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser dùng orjson. NaN / Infinity trong body bị từ chối như JSONParser strict.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            body = stream.read()
+            if codecs.lookup(encoding).name != "utf-8":
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Iterable
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.utils import timezone
+
+from .archive_cache import settled_until
+from .hourly_store import StoreTarget, _om_payload, _read_rows
+from .models import HourlyStoreSync, RegionDailyRollup, RegionWeeklyRollup
+from .om_client import OPEN_METEO_ARCHIVE_BASE, om_get_grid
+
+# cột của RegionDailyRollup => biến daily của Archive API (cùng tên FE đang dùng cho series)
+DAILY_COLUMNS = {
+    "tmax_c": "temperature_2m_max",
+    "tmin_c": "temperature_2m_min",
+    "tmean_c": "temperature_2m_mean",
+    "rain_sum_mm": "precipitation_sum",
+    "wind_max_kmh": "wind_speed_10m_max",
+    "cloud_mean_percent": "cloud_cover_mean",
+    "humidity_mean_percent": "relative_humidity_2m_mean",
+}
+WEEKLY_COLUMNS = (
+    "tmax_avg_c",
+    "tmin_avg_c",
+    "tmean_avg_c",
+    "rain_sum_mm",
+    "wind_max_avg_kmh",
+    "wind_max_kmh",
+    "cloud_mean_percent",
+    "humidity_mean_percent",
+)
+
+SOURCE_STORE = "hourly_store"
+SOURCE_ARCHIVE = "archive"
+
+
+def on_ingest() -> bool:
+    """
+    ROLLUP_ON_INGEST bật => ingest_hourly_forecast cập nhật luôn rollup ngày / tuần từ payload vừa fetch.
+    """
+    return bool(getattr(settings, "ROLLUP_ON_INGEST", True))
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def _mean(xs: list) -> float | None:
+    return round(math.fsum(xs) / len(xs), 2) if xs else None
+
+
+def daily_from_hourly(om: dict) -> dict[date, dict]:
+    """
+    Payload hourly (unixtime, km/h) dạng Open-Meteo => {ngày địa phương: {cột RegionDailyRollup: giá trị}}.
+    Chỉ lấy ngày đủ 24 giờ: ngày cắt ngang đầu / cuối khoảng fetch cho tổng mưa, max / min sai.
+    """
+    hourly = om.get("hourly") or {}
+    times = hourly.get("time") or []
+    offset = int(om.get("utc_offset_seconds") or 0)
+
+    days: dict[int, list[int]] = {}
+    for i, t in enumerate(times):
+        days.setdefault((int(t) + offset) // 86400, []).append(i)
+
+    def _vals(var: str, ix: list[int]) -> list:
+        col = hourly.get(var) or []
+        return [col[i] for i in ix if i < len(col) and col[i] is not None]
+
+    out = {}
+    for day, ix in days.items():
+        if len(ix) < 24:
+            continue
+        temp = _vals("temperature_2m", ix)
+        rain = _vals("precipitation", ix)
+        wind = _vals("wind_speed_10m", ix)
+        out[date.fromordinal(date(1970, 1, 1).toordinal() + day)] = {
+            "tmax_c": max(temp) if temp else None,
+            "tmin_c": min(temp) if temp else None,
+            "tmean_c": _mean(temp),
+            "rain_sum_mm": round(math.fsum(rain), 2) if rain else None,
+            "wind_max_kmh": max(wind) if wind else None,
+            "cloud_mean_percent": _mean(_vals("cloud_cover", ix)),
+            "humidity_mean_percent": _mean(_vals("relative_humidity_2m", ix)),
+        }
+    return out
+
+
+def daily_from_archive(om: dict) -> dict[date, dict]:
+    """
+    Payload daily của Archive API (time dạng "YYYY-MM-DD") => {ngày: {cột: giá trị}}. Ngày chưa có dữ liệu
+    (toàn bộ biến None — archive chưa cập nhật tới) bị bỏ để lần sau lấy lại.
+    """
+    daily = om.get("daily") or {}
+    out = {}
+    for i, t in enumerate(daily.get("time") or []):
+        values = {}
+        for col, var in DAILY_COLUMNS.items():
+            arr = daily.get(var) or []
+            values[col] = arr[i] if i < len(arr) else None
+        if any(v is not None for v in values.values()):
+            out[date.fromisoformat(t)] = values
+    return out
+
+
+def upsert_daily(batch: list[tuple[StoreTarget, dict[date, dict]]], source: str, now: datetime | None = None) -> dict:
+    """
+    Ghi rollup ngày của nhiều target, chỉ ghi ngày mới hoặc ngày có giá trị đổi; rồi tính lại các tuần ISO
+    chứa những ngày đó. Rollup từ store không đè ngày đã lấy từ archive (archive là số liệu đã chốt).
+    Trả {"days": số ngày ghi, "weeks": số tuần tính lại}.
+    """
+    now = now or timezone.now()
+    by_owner: dict[str, dict[int, dict[date, dict]]] = {}
+    for target, days in batch:
+        if days:
+            by_owner.setdefault(target.owner, {}).setdefault(target.id, {}).update(days)
+
+    objs = []
+    touched: dict[tuple[str, int], set[date]] = {}
+    for owner, per_id in by_owner.items():
+        all_days = [d for days in per_id.values() for d in days]
+        existing = {
+            (row[0], row[1]): row[2:]
+            for row in RegionDailyRollup.objects.filter(
+                owner=owner, owner_id__in=list(per_id), day__gte=min(all_days), day__lte=max(all_days)
+            ).values_list("owner_id", "day", "source", *DAILY_COLUMNS)
+        }
+        for owner_id, days in per_id.items():
+            for day, values in days.items():
+                old = existing.get((owner_id, day))
+                if old is not None:
+                    if source == SOURCE_STORE and old[0] == SOURCE_ARCHIVE:
+                        continue
+                    if old[0] == source and tuple(old[1:]) == tuple(values[c] for c in DAILY_COLUMNS):
+                        continue
+                objs.append(
+                    RegionDailyRollup(owner=owner, owner_id=owner_id, day=day, source=source, updated_at=now, **values)
+                )
+                touched.setdefault((owner, owner_id), set()).add(week_start(day))
+
+    RegionDailyRollup.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["owner", "owner_id", "day"],
+        update_fields=[*DAILY_COLUMNS, "source", "updated_at"],
+        batch_size=500,
+    )
+    return {"days": len(objs), "weeks": refresh_weeks(touched, now)}
+
+
+def _week_values(rows: list[dict]) -> dict:
+    def _vals(col: str) -> list:
+        return [r[col] for r in rows if r[col] is not None]
+
+    wind = _vals("wind_max_kmh")
+    rain = _vals("rain_sum_mm")
+    return {
+        "days": len(rows),
+        "tmax_avg_c": _mean(_vals("tmax_c")),
+        "tmin_avg_c": _mean(_vals("tmin_c")),
+        "tmean_avg_c": _mean(_vals("tmean_c")),
+        "rain_sum_mm": round(math.fsum(rain), 2) if rain else None,
+        "wind_max_avg_kmh": _mean(wind),
+        "wind_max_kmh": max(wind) if wind else None,
+        "cloud_mean_percent": _mean(_vals("cloud_mean_percent")),
+        "humidity_mean_percent": _mean(_vals("humidity_mean_percent")),
+    }
+
+
+def refresh_weeks(touched: dict[tuple[str, int], set[date]], now: datetime | None = None) -> int:
+    """
+    Tính lại RegionWeeklyRollup của các tuần (week_start = thứ 2) từ rollup ngày, mỗi loại owner 1 câu đọc.
+    Trả số tuần đã ghi.
+    """
+    now = now or timezone.now()
+    by_owner: dict[str, dict[int, set[date]]] = {}
+    for (owner, owner_id), weeks in touched.items():
+        by_owner.setdefault(owner, {})[owner_id] = weeks
+
+    objs = []
+    for owner, per_id in by_owner.items():
+        starts = [w for weeks in per_id.values() for w in weeks]
+        grouped: dict[tuple[int, date], list[dict]] = {}
+        for row in RegionDailyRollup.objects.filter(
+            owner=owner, owner_id__in=list(per_id), day__gte=min(starts), day__lte=max(starts) + timedelta(days=6)
+        ).values("owner_id", "day", *DAILY_COLUMNS):
+            grouped.setdefault((row["owner_id"], week_start(row["day"])), []).append(row)
+
+        for owner_id, weeks in per_id.items():
+            for start in weeks:
+                rows = grouped.get((owner_id, start))
+                if not rows:
+                    continue
+                iso_year, iso_week, _ = start.isocalendar()
+                objs.append(
+                    RegionWeeklyRollup(
+                        owner=owner,
+                        owner_id=owner_id,
+                        iso_year=iso_year,
+                        iso_week=iso_week,
+                        week_start=start,
+                        updated_at=now,
+                        **_week_values(rows),
+                    )
+                )
+
+    RegionWeeklyRollup.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["owner", "owner_id", "iso_year", "iso_week"],
+        update_fields=["week_start", "days", *WEEKLY_COLUMNS, "updated_at"],
+        batch_size=500,
+    )
+    return len(objs)
+
+
+def rollup_payloads(fetched: list[tuple[StoreTarget, dict]]) -> dict:
+    """
+    Rollup từ payload hourly vừa fetch của ingest (không đọc lại bảng store).
+    """
+    return upsert_daily([(target, daily_from_hourly(om)) for target, om in fetched], SOURCE_STORE)
+
+
+def rollup_from_store(targets: list[StoreTarget], start: date, end: date) -> dict:
+    """
+    Rollup các ngày địa phương [start, end] đọc lại từ weather_forecast_hourly (dựng lại / bù rollup cho dữ liệu đã có).
+    Target chưa từng được ghi vào store (không có hourly_store_sync) bị bỏ qua.
+    """
+    syncs = {
+        (s.owner, s.owner_id): s
+        for s in HourlyStoreSync.objects.filter(owner_id__in=[t.id for t in targets])
+    }
+    batch = []
+    for target in targets:
+        sync = syncs.get((target.owner, target.id))
+        if sync is None:
+            continue
+        offset = sync.utc_offset_seconds
+        lo = datetime(start.year, start.month, start.day, tzinfo=dt_timezone.utc).timestamp() - offset
+        hi = datetime(end.year, end.month, end.day, tzinfo=dt_timezone.utc).timestamp() - offset + 86400 - 3600
+        rows = _read_rows(target, int(lo), int(hi))
+        batch.append((target, daily_from_hourly(_om_payload(target, rows, sync.timezone, offset))))
+    return upsert_daily(batch, SOURCE_STORE)
+
+
+def fetch_archive_daily(targets: list[StoreTarget], start: date, end: date) -> list[tuple[StoreTarget, dict]]:
+    """
+    Daily của Archive API cho [start, end], request multi-location; target chung ô lưới chỉ gửi 1 toạ độ.
+    """
+    params = {
+        "timezone": "auto",
+        "wind_speed_unit": "kmh",
+        "precipitation_unit": "mm",
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "daily": ",".join(DAILY_COLUMNS.values()),
+    }
+    return list(zip(targets, om_get_grid(OPEN_METEO_ARCHIVE_BASE, [(t.lat, t.lon) for t in targets], params)))
+
+
+def rollup_from_archive(targets: list[StoreTarget], start: date, end: date) -> dict:
+    """
+    Rollup [start, end] từ Archive API (backfill lịch sử / thay số liệu dự báo bằng số đã chốt).
+    end bị cắt về hôm nay - OPEN_METEO_ARCHIVE_LAG_DAYS.
+    """
+    end = min(end, settled_until())
+    if end < start:
+        return {"days": 0, "weeks": 0}
+    fetched = fetch_archive_daily(targets, start, end)
+    return upsert_daily([(target, daily_from_archive(om)) for target, om in fetched], SOURCE_ARCHIVE)
+
+
+def weekly_rollups(owner: str, owner_id: int, starts: Iterable[date]) -> dict[date, RegionWeeklyRollup]:
+    """
+    {week_start: RegionWeeklyRollup} của các tuần cần — 1 lần quét unique index.
+    """
+    keys = [s.isocalendar()[:2] for s in starts]
+    qs = RegionWeeklyRollup.objects.filter(
+        owner=owner,
+        owner_id=owner_id,
+        iso_year__in={y for y, _ in keys},
+        iso_week__in={w for _, w in keys},
+    )
+    return {w.week_start: w for w in qs if (w.iso_year, w.iso_week) in keys}
+
+
+def daily_rollups(owner: str, owner_id: int, start: date, end: date) -> list[RegionDailyRollup]:
+    return list(
+        RegionDailyRollup.objects.filter(owner=owner, owner_id=owner_id, day__gte=start, day__lte=end).order_by("day")
+    )
+
+
+def period_summary(owner: str, owner_id: int, start: date, end: date) -> dict:
+    """
+    Tổng hợp 1 khoảng ngày bất kỳ (tháng, mùa, ...) bằng 1 câu aggregate trên index (owner, owner_id, day).
+    Cùng khoá với RegionWeeklyRollup; days < số ngày của khoảng => thiếu rollup.
+    """
+    agg = RegionDailyRollup.objects.filter(owner=owner, owner_id=owner_id, day__gte=start, day__lte=end).aggregate(
+        days=Count("id"),
+        tmax_avg_c=Avg("tmax_c"),
+        tmin_avg_c=Avg("tmin_c"),
+        tmean_avg_c=Avg("tmean_c"),
+        rain_sum_mm=Sum("rain_sum_mm"),
+        wind_max_avg_kmh=Avg("wind_max_kmh"),
+        wind_max_kmh=Max("wind_max_kmh"),
+        cloud_mean_percent=Avg("cloud_mean_percent"),
+        humidity_mean_percent=Avg("humidity_mean_percent"),
+        tmin_c=Min("tmin_c"),
+        tmax_c=Max("tmax_c"),
+    )
+    return {k: (round(v, 2) if isinstance(v, float) else v) for k, v in agg.items()}
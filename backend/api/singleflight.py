@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from urllib.parse import urlencode
+
+from django.db import connection, transaction
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi đồng thời cùng key trong 1 process:
+    thread đầu tiên chạy fn, các thread đến sau chờ và nhận chung kết quả (hoặc chung exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # follower nhận bản copy để không ai sửa chung dict của leader
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+def upstream_key(url: str, params: Dict[str, Any]) -> str:
+    """
+    Key chuẩn hoá cho 1 request upstream: url + query đã sort theo tên param.
+    """
+    return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+
+def _lock_id(key: str) -> int:
+    # pg advisory lock nhận bigint => lấy 8 byte đầu của hash, signed
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+@contextmanager
+def advisory_lock(key: str, wait_seconds: float = 20.0, poll_seconds: float = 0.05) -> Iterator[bool]:
+    """
+    Khoá chéo giữa các worker bằng Postgres transaction-level advisory lock (pg_try_advisory_xact_lock).
+    - yield True nếu giữ được lock, False nếu hết wait_seconds mà chưa lấy được (caller tự quyết có ghi hay không).
+    - Thân `with` chạy trong transaction.atomic(); lock tự nhả khi transaction commit / rollback
+      => an toàn qua pooler transaction mode (Supabase 6543), không có câu unlock nào rơi nhầm backend.
+    - Giữ lock = giữ transaction mở: chỉ bọc phần đọc lại + ghi ngắn, không gọi upstream bên trong.
+    - DB không phải Postgres (sqlite dev) => không khoá, luôn yield True.
+    """
+    if connection.vendor != "postgresql":
+        yield True
+        return
+
+    lock_id = _lock_id(key)
+    deadline = time.monotonic() + wait_seconds
+
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            while True:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", [lock_id])
+                acquired = bool(cur.fetchone()[0])
+                if acquired or time.monotonic() >= deadline:
+                    break
+                time.sleep(poll_seconds)
+
+        yield acquired
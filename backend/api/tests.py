@@ -1,3 +1,214 @@
-from django.test import TestCase
+import json
+import random
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import views, views_compare
+from api.middleware import CompressionMiddleware
+
+
+@override_settings(COMPRESS_MIN_BYTES=16, COMPRESS_PATH_PREFIXES=("/api/",))
+class CompressionMiddlewareETagTests(SimpleTestCase):
+    """
+    Revalidate qua CompressionMiddleware: 200 đã nén mang ETag weak, 304 sau đó phải trả lại đúng validator đó.
+    """
+
+    etag = '"layer-abc"'
+
+    def _view(self, request):
+        # so khớp weak như http_cache.conditional_response
+        tags = parse_etags(request.headers.get("If-None-Match") or "")
+        if any(t.removeprefix("W/") == self.etag for t in tags):
+            resp = HttpResponse(status=304)
+        else:
+            resp = HttpResponse(b'{"v": "' + b"x" * 200 + b'"}', content_type="application/json")
+        resp["ETag"] = self.etag
+        resp["Cache-Control"] = "public, max-age=0"
+        return resp
+
+    def _get(self, **headers):
+        request = RequestFactory().get("/api/provinces/79/weather/", **headers)
+        return CompressionMiddleware(self._view)(request)
+
+    def test_compressed_200_then_304_keep_same_validator(self):
+        first = self._get(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertEqual(first["ETag"], "W/" + self.etag)
+
+        second = self._get(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_uncompressed_200_then_304_stay_strong(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.has_header("Content-Encoding"))
+        self.assertEqual(first["ETag"], self.etag)
+
+        second = self._get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], self.etag)
+
+
+@unittest.skipIf(views.np is None, "numpy is not installed")
+class HourlyDayStatsNumpyTests(SimpleTestCase):
+    """
+    Nhánh numpy của _hourly_day_stats phải ra JSON trùng từng byte với nhánh Python thuần.
+    """
+
+    offset = 7 * 3600
+
+    def _hourly(self, hours: int, seed: int = 9) -> dict:
+        rnd = random.Random(seed)
+
+        def col(lo, hi, digits=None):
+            out = []
+            for _ in range(hours):
+                v = rnd.uniform(lo, hi)
+                out.append(None if rnd.random() < 0.05 else (round(v, digits) if digits is not None else v))
+            return out
+
+        start = 1767225600 - self.offset  # 2026-01-01 00:00 giờ địa phương
+        times = [start + i * 3600 for i in range(hours)]
+        times[5] = None  # giờ không có time => bỏ qua (user-012)
+        return {
+            "time": times,
+            # nhiều chữ số lẻ => thứ tự cộng sai 1 bước là lệch bit
+            "relative_humidity_2m": col(0, 100),
+            "cloud_cover": col(0, 100, 1),
+            "wind_speed_10m": col(0, 60, 1),
+            "wind_direction_10m": col(-30, 400),
+        }
+
+    def _stats_args(self, hourly: dict) -> tuple:
+        days = [views._local_day(t, self.offset) for t in hourly["time"]]
+        fields = ("relative_humidity_2m", "cloud_cover", "wind_speed_10m", "wind_direction_10m")
+        return (days, *(hourly[f] for f in fields))
+
+    def test_day_stats_match_pure_python(self):
+        for hours in (views._NUMPY_MIN_DAY_STATS_HOURS, 16 * 24, 16 * 24 + 7):
+            args = self._stats_args(self._hourly(hours, seed=hours))
+            expected = views._hourly_day_stats_py(*args)
+            with mock.patch.object(views, "_hourly_day_stats_py", side_effect=AssertionError("numpy path not taken")):
+                got = views._hourly_day_stats(*args)
+            self.assertEqual(json.dumps(got), json.dumps(expected))
+
+    def test_day_stats_all_values_missing(self):
+        args = self._stats_args(self._hourly(16 * 24))
+        empty = [None] * len(args[0])
+        self.assertEqual(views._hourly_day_stats(args[0], empty, empty, empty, empty), ({}, {}, {}, {}))
+
+    def test_normalize_bundle_matches_without_numpy(self):
+        hourly = self._hourly(16 * 24)
+        days = 16
+        start = hourly["time"][0]
+        raw = {
+            "latitude": 10.75,
+            "longitude": 106.625,
+            "timezone": "Asia/Bangkok",
+            "utc_offset_seconds": self.offset,
+            "current": {"time": start + 12 * 3600, "temperature_2m": 30.2},
+            "hourly": hourly,
+            # daily mean / dominant trống => phải tính bù từ hourly
+            "daily": {
+                "time": [start + d * 86400 for d in range(days)],
+                "temperature_2m_max": [33.1] * days,
+                "relative_humidity_2m_mean": [None] * days,
+                "cloud_cover_mean": [None] * days,
+                "wind_speed_10m_max": [None] * days,
+                "wind_direction_10m_dominant": [None] * days,
+            },
+        }
+        fast = views._normalize_bundle(raw)
+        with mock.patch.object(views, "np", None):
+            slow = views._normalize_bundle(raw)
+        for out in (fast, slow):
+            out.pop("meta", None)
+        self.assertEqual(json.dumps(fast), json.dumps(slow))
+
+
+class CompareWeekSourcesTests(SimpleTestCase):
+    """
+    compare_week từ rollup và từ Open-Meteo (cùng số liệu ngày) phải ra cùng summary / series, chỉ khác "source".
+    """
+
+    def setUp(self):
+        self.this_start, _ = views_compare.week_range(date.today())
+        self.last_start = self.this_start - timedelta(days=7)
+        rnd = random.Random(24)
+        self.days = {}
+        for i in range(14):
+            d = self.last_start + timedelta(days=i)
+            self.days[d] = {
+                "tmax_c": round(rnd.uniform(30, 36), 1),
+                "tmin_c": round(rnd.uniform(22, 27), 1),
+                "tmean_c": round(rnd.uniform(25, 30), 2),
+                "rain_sum_mm": None if i == 3 else round(rnd.uniform(0, 20), 2),
+                "wind_max_kmh": round(rnd.uniform(5, 40), 1),
+                # rollup từ hourly: trung bình nhiều chữ số lẻ
+                "cloud_mean_percent": rnd.uniform(0, 100),
+                "humidity_mean_percent": round(rnd.uniform(50, 95), 2),
+            }
+
+    def _rows(self, owner, owner_id, start, end):
+        return [SimpleNamespace(day=d, **v) for d, v in sorted(self.days.items()) if start <= d <= end]
+
+    def _om_daily(self, code, start, end, fields):
+        days = [d for d in sorted(self.days) if start <= d <= end]
+        daily = {"time": [d.isoformat() for d in days]}
+        for col, var in views_compare.DAILY_COLUMNS.items():
+            if var in fields:
+                daily[var] = [self.days[d][col] for d in days]
+        daily["cloud_cover"] = daily["cloud_cover_mean"]
+        return {"latitude": 10.75, "longitude": 106.625, "daily": daily}
+
+    def _get(self, weeks: dict, settled: date | None = None):
+        week = lambda updated_at: SimpleNamespace(days=7, updated_at=updated_at)
+        sync = mock.MagicMock()
+        sync.objects.filter.return_value.only.return_value.first.return_value = None
+        request = APIRequestFactory().get("/api/compare/79/")
+        force_authenticate(request, user=SimpleNamespace(is_staff=True, is_authenticated=True))
+        with mock.patch.multiple(
+            views_compare,
+            get_region_coord=mock.Mock(return_value=({"id": 79, "kind": "province"}, 10.75, 106.625)),
+            weekly_rollups=mock.Mock(return_value={s: week(t) for s, t in weeks.items()}),
+            daily_rollups=mock.Mock(side_effect=self._rows),
+            HourlyStoreSync=sync,
+            settled_until=mock.Mock(return_value=settled or self.this_start - timedelta(days=1)),
+            om_forecast_daily=mock.Mock(side_effect=self._om_daily),
+            om_archive_daily=mock.Mock(side_effect=self._om_daily),
+        ):
+            resp = views_compare.compare_week(request, "79")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_rollup_and_open_meteo_bodies_match(self):
+        now = timezone.now()
+        rolled = self._get({self.this_start: now, self.last_start: now})
+        fetched = self._get({})
+        self.assertEqual(rolled.pop("source"), "rollup")
+        self.assertEqual(fetched.pop("source"), "open_meteo")
+        self.assertEqual(json.dumps(rolled, sort_keys=True), json.dumps(fetched, sort_keys=True))
+        self.assertEqual(
+            list(rolled["series"]["this_week"]), ["time", *views_compare.SERIES_FIELDS, "cloud_cover"]
+        )
+
+    def test_settled_week_skips_freshness_check(self):
+        now = timezone.now()
+        old = now - timedelta(days=30)
+        # tuần trước đã chốt => rollup cũ vẫn dùng được
+        self.assertEqual(self._get({self.this_start: now, self.last_start: old})["source"], "rollup")
+        # tuần trước còn ngày chưa chốt => rollup cũ bị bỏ
+        late = self.this_start - timedelta(days=3)
+        self.assertEqual(self._get({self.this_start: now, self.last_start: old}, settled=late)["source"], "open_meteo")
+        # tuần này luôn có ngày dự báo => luôn kiểm tra tuổi
+        self.assertEqual(self._get({self.this_start: old, self.last_start: now})["source"], "open_meteo")
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import io
+import math
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .map_snapshot import SNAPSHOT_LAYERS, refresh_seconds
+
+TILE_SIZE = 256
+
+# thang màu (giá trị, (r, g, b, a)) — nội suy tuyến tính giữa các mốc, ngoài 2 đầu giữ màu đầu/cuối
+COLOR_RAMPS = {
+    "temp": [
+        (15, (49, 54, 149, 170)),
+        (20, (69, 117, 180, 170)),
+        (24, (171, 217, 233, 170)),
+        (27, (254, 224, 144, 170)),
+        (30, (253, 174, 97, 170)),
+        (33, (244, 109, 67, 170)),
+        (37, (165, 0, 38, 170)),
+    ],
+    "rain": [
+        (0.0, (158, 202, 225, 0)),
+        (0.2, (158, 202, 225, 120)),
+        (1.0, (66, 146, 198, 160)),
+        (5.0, (8, 81, 156, 190)),
+        (20.0, (63, 0, 125, 210)),
+    ],
+    "humidity": [
+        (30, (255, 255, 204, 150)),
+        (60, (161, 218, 180, 150)),
+        (80, (65, 182, 196, 150)),
+        (100, (34, 94, 168, 150)),
+    ],
+    "cloud": [
+        (0, (255, 255, 255, 0)),
+        (50, (200, 200, 200, 110)),
+        (100, (110, 110, 110, 180)),
+    ],
+}
+TILE_LAYERS = tuple(k for k in COLOR_RAMPS if k in SNAPSHOT_LAYERS)
+
+
+def idw(src_x, src_y, src_v, dst_x, dst_y, power: float = 2.0, chunk: int = 16384) -> np.ndarray:
+    """
+    Inverse distance weighting: mỗi điểm đích = trung bình các điểm nguồn theo trọng số 1 / d^power.
+    Điểm đích trùng điểm nguồn => lấy đúng giá trị nguồn. Tính theo chunk để giới hạn bộ nhớ (n_dst × n_src).
+    """
+    out = np.empty(len(dst_x))
+    for i in range(0, len(dst_x), chunk):
+        dx = dst_x[i : i + chunk, None] - src_x[None, :]
+        dy = dst_y[i : i + chunk, None] - src_y[None, :]
+        d2 = dx * dx + dy * dy
+        exact = d2 == 0
+        with np.errstate(divide="ignore"):
+            w = 1.0 / d2 ** (power / 2)
+        w[exact] = 0.0
+        v = (w @ src_v) / w.sum(axis=1)
+        hit = exact.any(axis=1)
+        v[hit] = src_v[exact[hit].argmax(axis=1)]
+        out[i : i + chunk] = v
+    return out
+
+
+# tên => hàm (src_x, src_y, src_v, dst_x, dst_y) -> dst_v; thêm kriging / RBF ... vào đây
+INTERPOLATORS: Dict[str, Callable[..., np.ndarray]] = {"idw": idw}
+
+
+class Grid(NamedTuple):
+    lat0: float
+    lon0: float
+    step: float
+    values: np.ndarray  # (n_lat, n_lon), hàng 0 = lat0
+
+
+def build_grid(payload: dict, layer: str) -> Grid | None:
+    """
+    Nội suy snapshot (giá trị tại centroid các tỉnh) ra lưới đều TILE_GRID_STEP_DEG độ
+    phủ bbox các centroid + TILE_GRID_PAD_DEG. Không có điểm nào có giá trị => None.
+    """
+    field = SNAPSHOT_LAYERS[layer]["field"]
+    lat = np.array(payload.get("lat") or [], dtype=float)
+    lon = np.array(payload.get("lon") or [], dtype=float)
+    val = np.array((payload.get("current") or {}).get(field) or [], dtype=float)  # None -> nan
+    ok = ~np.isnan(val)
+    if len(val) != len(lat) or not ok.any():
+        return None
+    lat, lon, val = lat[ok], lon[ok], val[ok]
+
+    step = float(getattr(settings, "TILE_GRID_STEP_DEG", 0.05))
+    pad = float(getattr(settings, "TILE_GRID_PAD_DEG", 0.5))
+    lat0, lon0 = lat.min() - pad, lon.min() - pad
+    g_lat = lat0 + step * np.arange(int(math.ceil((lat.max() + pad - lat0) / step)) + 1)
+    g_lon = lon0 + step * np.arange(int(math.ceil((lon.max() + pad - lon0) / step)) + 1)
+
+    # khoảng cách trên mặt phẳng xấp xỉ: kinh độ co theo cos(vĩ độ trung bình)
+    k = math.cos(math.radians(float(lat.mean())))
+    gx, gy = np.meshgrid(g_lon * k, g_lat)
+    interp = INTERPOLATORS[getattr(settings, "TILE_INTERPOLATOR", "idw")]
+    values = interp(lon * k, lat, val, gx.ravel(), gy.ravel()).reshape(gy.shape)
+    return Grid(float(lat0), float(lon0), step, values)
+
+
+def _sample(grid: Grid, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Lấy giá trị lưới tại (lat, lon) bằng nội suy song tuyến; ngoài lưới => nan.
+    lat: (H, 1), lon: (1, W) => (H, W).
+    """
+    n_lat, n_lon = grid.values.shape
+    fi = np.broadcast_to((lat - grid.lat0) / grid.step, (lat.shape[0], lon.shape[1]))
+    fj = np.broadcast_to((lon - grid.lon0) / grid.step, (lat.shape[0], lon.shape[1]))
+    inside = (fi >= 0) & (fi <= n_lat - 1) & (fj >= 0) & (fj <= n_lon - 1)
+
+    i0 = np.clip(np.floor(fi).astype(np.int64), 0, max(n_lat - 2, 0))
+    j0 = np.clip(np.floor(fj).astype(np.int64), 0, max(n_lon - 2, 0))
+    i1 = np.minimum(i0 + 1, n_lat - 1)
+    j1 = np.minimum(j0 + 1, n_lon - 1)
+    ti = np.clip(fi - i0, 0.0, 1.0)
+    tj = np.clip(fj - j0, 0.0, 1.0)
+
+    v = grid.values
+    top = v[i0, j0] * (1 - tj) + v[i0, j1] * tj
+    bottom = v[i1, j0] * (1 - tj) + v[i1, j1] * tj
+    out = top * (1 - ti) + bottom * ti
+    return np.where(inside, out, np.nan)
+
+
+def colorize(values: np.ndarray, layer: str) -> np.ndarray:
+    stops = COLOR_RAMPS[layer]
+    xs = np.array([s[0] for s in stops], dtype=float)
+    missing = np.isnan(values)
+    filled = np.where(missing, xs[0], values)
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    for c in range(4):
+        rgba[..., c] = np.interp(filled, xs, [s[1][c] for s in stops]).round().astype(np.uint8)
+    rgba[missing] = 0
+    return rgba
+
+
+def render_tile(grid: Grid | None, layer: str, z: int, x: int, y: int) -> bytes:
+    """
+    Tile XYZ (Web Mercator, 256×256) dạng PNG RGBA; pixel ngoài lưới trong suốt.
+    """
+    if grid is None:
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    else:
+        world = TILE_SIZE * (2**z)
+        px = (x * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / world
+        py = (y * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / world
+        lon = (px * 360.0 - 180.0)[None, :]
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * py))))[:, None]
+        rgba = colorize(_sample(grid, lat, lon), layer)
+
+    buf = io.BytesIO()
+    Image.fromarray(rgba, "RGBA").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def tile_cache_dir() -> str:
+    return str(getattr(settings, "TILE_CACHE_DIR", os.path.join(settings.BASE_DIR, "tile_cache")))
+
+
+_grids: "OrderedDict[tuple, Grid | None]" = OrderedDict()
+_grids_lock = threading.Lock()
+_GRIDS_MAX = 8
+
+
+def _grid_for(generation: str, layer: str, payload: dict) -> Grid | None:
+    key = (generation, layer)
+    with _grids_lock:
+        if key in _grids:
+            _grids.move_to_end(key)
+            return _grids[key]
+
+    grid = build_grid(payload, layer)
+    with _grids_lock:
+        _grids[key] = grid
+        while len(_grids) > _GRIDS_MAX:
+            _grids.popitem(last=False)
+    return grid
+
+
+def _drop_old_generations(root: str, generation: str) -> None:
+    """
+    Dọn tile của các thế hệ cũ (cùng máy, mọi worker dùng chung thư mục). Các worker có thể đang giữ
+    thế hệ khác nhau (LRU mỗi process refresh lệch nhịp) => không xoá theo kiểu "khác của mình":
+    giữ thế hệ hiện tại + thế hệ ngay trước nó, chỉ xoá thư mục không được ghi tile mới (mtime) quá 2 chu kỳ snapshot.
+    """
+    try:
+        names = [n for n in os.listdir(root) if n.isdigit()]
+    except FileNotFoundError:
+        return
+
+    keep = {generation}
+    older = sorted((n for n in names if int(n) < int(generation)), key=int)
+    if older:
+        keep.add(older[-1])
+
+    cutoff = time.time() - 2 * max(refresh_seconds(), 60)
+    for name in names:
+        if name in keep:
+            continue
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def get_tile(generation: str, payload: dict, layer: str, z: int, x: int, y: int) -> bytes:
+    """
+    Tile của snapshot thế hệ `generation` (fetched_at của snapshot): đọc từ cache đĩa
+    TILE_CACHE_DIR/<generation>/<layer>/<z>/<x>/<y>.png, chưa có thì render + ghi.
+    Thế hệ mới xuất hiện lần đầu => dọn tile của thế hệ cũ không còn dùng (xem _drop_old_generations).
+    Tile ghi ra file tạm rồi os.replace => worker khác không bao giờ đọc phải file ghi dở.
+    """
+    root = tile_cache_dir()
+    gen_dir = os.path.join(root, generation)
+    path = os.path.join(gen_dir, layer, str(z), str(x), f"{y}.png")
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    if not os.path.isdir(gen_dir):
+        _drop_old_generations(root, generation)
+
+    png = render_tile(_grid_for(generation, layer, payload), layer, z, x, y)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+        # mtime của thư mục thế hệ = lần cuối có worker ghi tile => _drop_old_generations không xoá thế hệ còn dùng
+        os.utime(gen_dir)
+    except OSError:
+        # đĩa đầy / read-only => vẫn trả tile, chỉ không cache
+        pass
+    return png
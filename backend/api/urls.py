@@ -4,6 +4,7 @@ from rest_framework.routers import DefaultRouter
 from api.views_admin_layers import AdminMapLayerViewSet
 from api.views_admin_users import AdminUserViewSet
 from api.views_layers_public import map_layers_public
+from api.views_map import map_snapshot, map_tile
 
 from . import views 
 
@@ -14,6 +15,8 @@ router.register(r"admin/users", AdminUserViewSet, basename="admin-users")
 urlpatterns = [
     path("", include(router.urls)),
     path("map/layers/", map_layers_public),
+    path("map/snapshot/", map_snapshot),
+    path("map/tiles/<str:layer>/<int:z>/<int:x>/<int:y>.png", map_tile),
     path("auth/", include("api.auth_urls")),  
     path("provinces/<str:code>/current/", views.province_current),
     path("provinces/<str:code>/weather/", views.province_weather),
@@ -22,6 +25,7 @@ urlpatterns = [
     path("provinces/<str:code>/humidity/", views.province_humidity),
     path("provinces/<str:code>/cloud/", views.province_cloud),
     path("provinces/<str:code>/bundle/", views.province_bundle),
+    path("provinces/<str:code>/layers/", views.province_layers),
     path("province-index/", views.province_index),
     path("places/hcm-districts/", views.hcm_districts),
     path("places/kien-giang/", views.kien_giang_places),
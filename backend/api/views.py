@@ -1,7 +1,14 @@
 from __future__ import annotations
-from datetime import date, datetime, timedelta
-import requests
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+try:
+    import numpy as np
+except ImportError:  # numpy không có => _normalize_bundle chạy nhánh Python thuần
+    np = None
+
+from django.conf import settings
 from django.db import connection
 from django.utils import timezone
 from django.core.cache import cache
@@ -12,32 +19,130 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 
 from api.models import Place
-from .models import ForecastCache  
+from . import hourly_store
+from .http_cache import conditional_response, entry_etag, entry_max_age, fill_locked, make_etag, swr_entry, upstream_error
+from .om_client import OPEN_METEO_FORECAST_BASE as OPEN_METEO_BASE, local_iso, local_iso_many, om_get
+from .regions import get_region_coord, snap_to_grid
+from .wind_rose import ROSE_SECTORS, ROSE_WINDOWS, build_rose, cached_rose, sector_index
+
+COMPASS_DIRS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+
+# sum() của float dùng cộng bù Neumaier từ Python 3.12 — nhánh numpy phải làm giống để ra cùng kết quả
+_SUM_COMPENSATED = sys.version_info >= (3, 12)
+
+HOURLY_FIELDS = (
+    "time",
+    "temperature_c",
+    "feels_like_c",
+    "humidity_percent",
+    "rain_mm",
+    "rain_prob_percent",
+    "cloud_percent",
+    "wind_speed",
+    "wind_direction_deg",
+    "wind_direction_label",
+)
+DAILY_FIELDS = (
+    "date",
+    "tmax_c",
+    "tmin_c",
+    "humidity_mean_percent",
+    "cloud_mean_percent",
+    "wind_speed_max_kmh",
+    "wind_direction_dominant_deg",
+    "wind_direction_dominant_label",
+    "rain_sum_mm",
+    "rain_prob_max_percent",
+)
+
+# ?hours= tối đa = 16 ngày forecast
+BUNDLE_MAX_HOURS = 16 * 24
+
+# Dưới các ngưỡng này overhead của numpy lớn hơn phần tiết kiệm (đo bằng manage.py bench_normalize_bundle):
+# nhãn la bàn (_compass_labels) lợi từ ~5 ngày, thống kê theo ngày (_hourly_day_stats) từ ~9 ngày
+_NUMPY_MIN_HOURS = 120
+_NUMPY_MIN_DAY_STATS_HOURS = 216
 
-OPEN_METEO_BASE = "https://api.open-meteo.com/v1/forecast"
 
 def _om_get(lat: float, lon: float, params: dict):
     base = {
         "latitude": lat,
         "longitude": lon,
         "timezone": "auto",
+        "timeformat": "unixtime",
     }
     base.update(params)
-    resp = requests.get(OPEN_METEO_BASE, params=base, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    return om_get(OPEN_METEO_BASE, base)
 
 
-def _parse_om_time(t_str: str):
+def _parse_om_time(t_str: str, utc_offset_seconds: int | None = None):
+    """
+    Chuỗi giờ ISO của Open-Meteo là giờ địa phương của toạ độ (không kèm offset)
+    => gắn utc_offset_seconds của payload; không có thì dùng TIME_ZONE của Django.
+    """
     dt_naive = datetime.fromisoformat(t_str)
-    if dt_naive.tzinfo is None:
-        return timezone.make_aware(dt_naive, timezone.get_default_timezone())
-    return dt_naive
+    if dt_naive.tzinfo is not None:
+        return dt_naive
+    if utc_offset_seconds is not None:
+        return dt_naive.replace(tzinfo=dt_timezone(timedelta(seconds=int(utc_offset_seconds))))
+    return timezone.make_aware(dt_naive, timezone.get_default_timezone())
+
+
+def _local_day(ts: int | None, utc_offset_seconds: int) -> int | None:
+    """
+    Ngày địa phương của 1 unixtime, dạng số ngày kể từ 1970-01-01 (dùng làm key gom/so sánh theo ngày).
+    ts None (payload upstream / store thiếu giờ) => None, caller bỏ qua phần tử đó.
+    """
+    if ts is None:
+        return None
+    return (int(ts) + utc_offset_seconds) // 86400
+
+
+def _latest_hour_index(om: dict) -> int | None:
+    """
+    Index giờ gần nhất tại/ trước 'now' trong hourly.time (không lấy giờ tương lai).
+    hourly.time tăng dần => binary search. time dạng unixtime so sánh thẳng với now,
+    dạng chuỗi ISO thì chỉ parse ~log2(n) phần tử.
+    Không có giờ nào <= now => index cuối. Không có hourly.time => None.
+    """
+    times = (om.get("hourly") or {}).get("time") or []
+    if not times:
+        return None
+
+    now = timezone.now()
+    offset = om.get("utc_offset_seconds")
+
+    if isinstance(times[0], (int, float)):
+
+        def _key(t):
+            if t is None:
+                raise TypeError("missing hourly time")
+            return datetime.fromtimestamp(int(t), tz=dt_timezone.utc)
+
+    else:
+
+        def _key(t):
+            return _parse_om_time(t, offset)
+
+    try:
+        i = bisect_right(times, now, key=_key) - 1
+    except Exception:
+        # time sai format => quét lùi, bỏ qua phần tử lỗi
+        i = -1
+        for j in range(len(times) - 1, -1, -1):
+            try:
+                if _key(times[j]) <= now:
+                    i = j
+                    break
+            except Exception:
+                continue
+    return i if i >= 0 else len(times) - 1
 
 
-def _latest_hour_value(om: dict, field: str):
+def _latest_hour_value(om: dict, field: str, index: int | None = None):
     """
     Lấy giá trị hourly gần nhất tại/ trước 'now' (không lấy giờ tương lai).
+    index: kết quả _latest_hour_index(om) đã tính sẵn — truyền vào khi lấy nhiều field của cùng payload.
     """
     hourly = om.get("hourly", {}) or {}
     times = hourly.get("time", []) or []
@@ -45,31 +150,22 @@ def _latest_hour_value(om: dict, field: str):
     if not times or not values:
         return None, None
 
-    n = min(len(times), len(values))
-    now = timezone.now()
-
-    for i in range(n - 1, -1, -1):
-        try:
-            dt = _parse_om_time(times[i])
-        except Exception:
-            continue
-        if dt <= now:
-            return times[i], values[i]
-
-    return times[n - 1], values[n - 1]
+    if index is None:
+        index = _latest_hour_index(om)
+    i = min(index, len(times) - 1, len(values) - 1)
+    return times[i], values[i]
 
 
 def _deg_to_compass(deg: float | None) -> str | None:
     if deg is None:
         return None
-    dirs = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-    ix = int((deg % 360) / 22.5 + 0.5) % 16
-    return dirs[ix]
+    return COMPASS_DIRS[sector_index(deg, 16)]
 
 
 def _build_cache_key(lat: float, lon: float, forecast_days: int, tz: str | None) -> str:
+    # v3: payload cache lưu hourly/daily dạng cột, time là unixtime (đổi ra chuỗi lúc trả response)
     tz_part = tz or "auto"
-    return f"lat={lat:.6f}&lon={lon:.6f}&days={forecast_days}&tz={tz_part}"
+    return f"v3&lat={lat:.6f}&lon={lon:.6f}&days={forecast_days}&tz={tz_part}"
 
 
 def _get_province_coord(code: str):
@@ -101,65 +197,169 @@ def _get_province_coord(code: str):
     return province, float(lat), float(lon)
 
 
-def _get_region_coord(code: str):
+def _compass_labels(degs: list) -> list:
     """
-    Resolve (region_dict, lat, lon) theo code:
-    - ưu tiên bảng provinces (Supabase) qua raw SQL
-    - fallback sang bảng places (Django model Place)
-    Trả về dict cùng shape "province" hiện tại để frontend khỏi đổi.
+    Nhãn la bàn cho cả mảng hướng gió (None giữ None), cùng công thức với _deg_to_compass.
+    """
+    if np is None or len(degs) < _NUMPY_MIN_HOURS:
+        return [_deg_to_compass(d) if d is not None else None for d in degs]
+
+    deg = np.array(degs, dtype=float)  # None -> nan
+    ok = ~np.isnan(deg)
+    idx = np.zeros(len(deg), dtype=np.int64)
+    idx[ok] = (np.mod(deg[ok], 360.0) / 22.5 + 0.5).astype(np.int64) % 16
+    labels = np.array(COMPASS_DIRS, dtype=object)[idx]
+    labels[~ok] = None
+    return labels.tolist()
+
+
+def _hourly_day_stats_py(h_days: list, rh: list, cc: list, ws: list, wd: list) -> tuple[dict, dict, dict, dict]:
+    """
+    Nhánh Python thuần của _hourly_day_stats (không có numpy / payload ngắn / giá trị không phải số).
     """
-    with connection.cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, code, name, centroid_lat, centroid_lon
-            FROM provinces
-            WHERE code = %s
-            LIMIT 1
-            """,
-            [code],
-        )
-        row = cur.fetchone()
 
-    if row:
-        id_, code_db, name, lat, lon = row
-        region = {"id": int(id_), "code": str(code_db), "name": str(name), "kind": "province"}
-        if lat is None or lon is None:
-            return region, None, None
-        return region, float(lat), float(lon)
+    def _group_by_date(values: list) -> dict[int, list[float]]:
+        buckets: dict[int, list[float]] = {}
+        for day, v in zip(h_days, values):
+            if day is None or v is None:
+                continue
+            try:
+                buckets.setdefault(day, []).append(float(v))
+            except Exception:
+                continue
+        return buckets
 
-    place = Place.objects.filter(code=code).only("id", "code", "name", "kind", "lat", "lon").first()
-    if place:
-        region = {"id": int(place.id), "code": str(place.code), "name": str(place.name), "kind": str(place.kind)}
-        if place.lat is None or place.lon is None:
-            return region, None, None
-        return region, float(place.lat), float(place.lon)
+    def _dominant_wind_dir_deg(xs_deg: list[float]) -> float:
+        counts = [0] * 16
+        for deg in xs_deg:
+            idx = int(((deg % 360.0) / 22.5) + 0.5) % 16
+            counts[idx] += 1
+        best = max(range(16), key=lambda i: counts[i])
+        return best * 22.5
 
-    raise Http404(f"Region with code={code} not found")
+    return (
+        {day: sum(xs) / len(xs) for day, xs in _group_by_date(rh).items()},
+        {day: sum(xs) / len(xs) for day, xs in _group_by_date(cc).items()},
+        {day: max(xs) for day, xs in _group_by_date(ws).items()},
+        {day: _dominant_wind_dir_deg(xs) for day, xs in _group_by_date(wd).items()},
+    )
 
 
-def _normalize_bundle(raw: dict) -> dict:
+def _seq_sum_columns(m) -> "np.ndarray":
+    """
+    Cộng theo trục cuối, đúng thứ tự trái -> phải như sum() của Python (vector hoá theo cột),
+    để kết quả trùng từng bit với nhánh Python thuần:
+    - Python < 3.12: cộng tuần tự thường
+    - Python >= 3.12: sum() dùng Neumaier (cộng bù sai số) => làm y hệt
+    Ô đệm = 0.0 không làm đổi kết quả ở cả 2 cách.
+    """
+    f = np.zeros(m.shape[:-1])
+    if not _SUM_COMPENSATED:
+        for j in range(m.shape[-1]):
+            f = f + m[..., j]
+        return f
+
+    c = np.zeros(m.shape[:-1])
+    for j in range(m.shape[-1]):
+        x = m[..., j]
+        t = f + x
+        c = c + np.where(np.abs(f) >= np.abs(x), (f - t) + x, (x - t) + f)
+        f = t
+    return np.where((c != 0) & np.isfinite(c), f + c, f)
+
+
+def _hourly_day_stats(h_days: list, rh: list, cc: list, ws: list, wd: list) -> tuple[dict, dict, dict, dict]:
+    """
+    Thống kê theo ngày từ hourly để bù cho daily còn thiếu:
+    (humidity mean, cloud mean, wind speed max, hướng gió chủ đạo) — mỗi cái là {ngày: value},
+    ngày = _local_day của từng giờ (h_days, None = bỏ giờ đó). Ngày không có giá trị nào thì không có key.
+
+    Nhánh numpy: xếp hourly vào ma trận (ngày × thứ tự giờ trong ngày) 1 lần cho cả 4 field,
+    rồi mean/max/histogram theo hàng. Kết quả trùng từng bit với _hourly_day_stats_py (api/tests.py).
+    """
+    if np is None or len(h_days) < _NUMPY_MIN_DAY_STATS_HOURS:
+        return _hourly_day_stats_py(h_days, rh, cc, ws, wd)
+
+    try:
+        vals = np.array([rh, cc, ws, wd], dtype=float)  # None -> nan
+    except (TypeError, ValueError):
+        # giá trị không phải số / mảng lệch độ dài => để nhánh Python thuần tự bỏ qua từng phần tử như trước
+        return _hourly_day_stats_py(h_days, rh, cc, ws, wd)
+    if vals.shape != (4, len(h_days)):
+        return _hourly_day_stats_py(h_days, rh, cc, ws, wd)
+
+    day_ids = np.array(h_days, dtype=float)  # None -> nan; số ngày << 2^53 nên float giữ đúng
+    has_day = ~np.isnan(day_ids)
+    if not has_day.all():
+        vals, day_ids = vals[:, has_day], day_ids[has_day]
+        if not len(day_ids):
+            return {}, {}, {}, {}
+
+    uniq, inv = np.unique(day_ids.astype(np.int64), return_inverse=True)
+    inv = inv.reshape(-1)
+    n_days = len(uniq)
+
+    # vị trí của từng giờ trong ngày của nó, giữ thứ tự gốc
+    order = np.argsort(inv, kind="stable")
+    starts = np.searchsorted(inv[order], np.arange(n_days))
+    pos = np.empty(len(inv), dtype=np.int64)
+    pos[order] = np.arange(len(inv)) - starts[inv[order]]
+    width = int(pos.max()) + 1
+
+    # (field, ngày, giờ trong ngày); nan = giờ không có / giá trị bị bỏ qua
+    m = np.full((4, n_days, width), np.nan)
+    m[:, inv, pos] = vals
+    ok = ~np.isnan(m)
+    counts = ok.sum(axis=2)
+
+    def _by_day(per_day, cnt) -> dict:
+        sel = np.flatnonzero(cnt)
+        return dict(zip(uniq[sel].tolist(), per_day[sel].tolist()))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = _seq_sum_columns(np.where(ok[:2], m[:2], 0.0)) / counts[:2]
+    ws_max = np.where(ok[2], m[2], -np.inf).max(axis=1)
+
+    rows, cols = np.nonzero(ok[3])
+    bins = (np.mod(m[3, rows, cols], 360.0) / 22.5 + 0.5).astype(np.int64) % 16
+    hist = np.bincount(rows * 16 + bins, minlength=n_days * 16).reshape(n_days, 16)
+
+    return (
+        _by_day(means[0], counts[0]),
+        _by_day(means[1], counts[1]),
+        _by_day(ws_max, counts[2]),
+        _by_day(hist.argmax(axis=1) * 22.5, counts[3]),
+    )
+
+
+def _normalize_bundle_columnar(raw: dict) -> dict:
     """
-    Convert Open-Meteo arrays => list objects, and reshape to frontend-friendly schema.
+    Reshape Open-Meteo arrays => frontend-friendly schema, dạng cột (1 mảng / field, chung mảng time/date).
+    Nhãn hướng gió + thống kê theo ngày chạy dạng cột bằng numpy (xem _compass_labels, _hourly_day_stats).
+    raw lấy với timeformat=unixtime: time/date giữ nguyên unixtime, gom theo ngày bằng utc_offset_seconds;
+    _bundle_layout mới đổi ra chuỗi giờ địa phương.
 
     Output schema:
     {
       "location": {...},
       "current": {...},
-      "hourly": [ ... ],
-      "daily": [ ... ],
+      "hourly": {"time": [...], "temperature_c": [...], ...},   # HOURLY_FIELDS
+      "daily": {"date": [...], "tmax_c": [...], ...},           # DAILY_FIELDS
       "meta": {...}
     }
     """
     tz_name = raw.get("timezone")
     lat = raw.get("latitude")
     lon = raw.get("longitude")
+    offset = int(raw.get("utc_offset_seconds") or 0)
 
     current = (raw.get("current") or raw.get("current_weather") or {}).copy()
+    hour_ix = _latest_hour_index(raw)
 
     def _fill_current_if_missing(cur_key: str, hourly_key: str):
-        if current.get(cur_key) is not None:
+        if current.get(cur_key) is not None or hour_ix is None:
             return
-        t, v = _latest_hour_value(raw, hourly_key)
+        t, v = _latest_hour_value(raw, hourly_key, hour_ix)
         if v is not None:
             current[cur_key] = v
             current["time"] = current.get("time") or t
@@ -207,60 +407,15 @@ def _normalize_bundle(raw: dict) -> dict:
     cc = _h("cloud_cover")
     ws = _h("wind_speed_10m")
     wd = _h("wind_direction_10m")
+    wd_labels = _compass_labels(wd)
 
-    hourly_points = []
-    for i in range(len(h_time)):
-        wd_label = _deg_to_compass(wd[i]) if wd[i] is not None else None
-        hourly_points.append(
-            {
-                "time": h_time[i],
-                "temperature_c": t[i],
-                "feels_like_c": at[i],
-                "humidity_percent": rh[i],
-                "rain_mm": pr[i],
-                "rain_prob_percent": pp[i],
-                "cloud_percent": cc[i],
-                "wind_speed": ws[i],
-                "wind_direction_deg": wd[i],
-                "wind_direction_label": wd_label,
-            }
+    hourly_cols = dict(
+        zip(
+            HOURLY_FIELDS,
+            (h_time, t, at, rh, pr, pp, cc, ws, wd, wd_labels),
         )
+    )
 
-    def _hourly_group_by_date(field: str) -> dict[str, list[float]]:
-        buckets: dict[str, list[float]] = {}
-        for p in hourly_points:
-            v = p.get(field)
-            if v is None:
-                continue
-            day = str(p.get("time", ""))[:10]
-            if not day:
-                continue
-            try:
-                buckets.setdefault(day, []).append(float(v))
-            except Exception:
-                continue
-        return buckets
-
-    def _mean(xs: list[float]) -> float | None:
-        return (sum(xs) / len(xs)) if xs else None
-
-    def _max(xs: list[float]) -> float | None:
-        return max(xs) if xs else None
-
-    def _dominant_wind_dir_deg(xs_deg: list[float]) -> float | None:
-        if not xs_deg:
-            return None
-        counts = [0] * 16
-        for deg in xs_deg:
-            try:
-                d = float(deg) % 360.0
-            except Exception:
-                continue
-            idx = int((d / 22.5) + 0.5) % 16
-            counts[idx] += 1
-        best = max(range(16), key=lambda i: counts[i])
-        return best * 22.5
-    
     daily = raw.get("daily") or {}
     d_time = daily.get("time") or []
 
@@ -282,14 +437,13 @@ def _normalize_bundle(raw: dict) -> dict:
     rh_mean_arr = _d("relative_humidity_2m_mean")
     cc_mean_arr = _d("cloud_cover_mean")
 
-    rh_by_day = _hourly_group_by_date("humidity_percent")
-    cc_by_day = _hourly_group_by_date("cloud_percent")
-    ws_by_day = _hourly_group_by_date("wind_speed")
-    wd_by_day = _hourly_group_by_date("wind_direction_deg")
+    rh_mean_by_day, cc_mean_by_day, ws_max_by_day, wd_dom_by_day = _hourly_day_stats(
+        [_local_day(x, offset) for x in h_time], rh, cc, ws, wd
+    )
 
-    daily_points = []
+    rh_mean_col, cc_mean_col, ws_max_col, wd_dom_col = [], [], [], []
     for i in range(len(d_time)):
-        day = d_time[i]
+        day = _local_day(d_time[i], offset)
 
         rh_mean = rh_mean_arr[i]
         cc_mean = cc_mean_arr[i]
@@ -297,43 +451,197 @@ def _normalize_bundle(raw: dict) -> dict:
         wd_dom = wddom[i]
 
         if rh_mean is None:
-            rh_mean = _mean(rh_by_day.get(day, []))
+            rh_mean = rh_mean_by_day.get(day)
         if cc_mean is None:
-            cc_mean = _mean(cc_by_day.get(day, []))
+            cc_mean = cc_mean_by_day.get(day)
         if ws_max is None:
-            ws_max = _max(ws_by_day.get(day, []))
+            ws_max = ws_max_by_day.get(day)
         if wd_dom is None:
-            wd_dom = _dominant_wind_dir_deg(wd_by_day.get(day, []))
-
-        daily_points.append(
-            {
-                "date": day,
-                "tmax_c": tmax[i],
-                "tmin_c": tmin[i],
-                "humidity_mean_percent": rh_mean,
-                "cloud_mean_percent": cc_mean,
-                "wind_speed_max_kmh": ws_max,
-                "wind_direction_dominant_deg": wd_dom,
-                "wind_direction_dominant_label": _deg_to_compass(wd_dom) if wd_dom is not None else None,
-                "rain_sum_mm": prsum[i],
-                "rain_prob_max_percent": ppmax[i],
-            }
+            wd_dom = wd_dom_by_day.get(day)
+
+        rh_mean_col.append(rh_mean)
+        cc_mean_col.append(cc_mean)
+        ws_max_col.append(ws_max)
+        wd_dom_col.append(wd_dom)
+
+    daily_cols = dict(
+        zip(
+            DAILY_FIELDS,
+            (
+                d_time,
+                tmax,
+                tmin,
+                rh_mean_col,
+                cc_mean_col,
+                ws_max_col,
+                wd_dom_col,
+                [_deg_to_compass(x) if x is not None else None for x in wd_dom_col],
+                prsum,
+                ppmax,
+            ),
         )
+    )
 
     return {
-        "location": {"lat": lat, "lon": lon, "timezone": tz_name},
+        "location": {"lat": lat, "lon": lon, "timezone": tz_name, "utc_offset_seconds": offset},
         "current": cur,
-        "hourly": hourly_points,
-        "daily": daily_points,
+        "hourly": hourly_cols,
+        "daily": daily_cols,
         "meta": {"source": "open-meteo", "generated_at": timezone.now().isoformat()},
     }
 
 
-def _open_meteo_fetch(lat: float, lon: float, forecast_days: int = 10, tz: str | None = None) -> dict:
-    params = {
-        "latitude": lat,
-        "longitude": lon,
+def _rows_from_columns(cols: dict, fields: tuple) -> list[dict]:
+    fields = tuple(f for f in fields if f in cols)  # cols có thể đã bị cắt bớt bởi ?fields=
+    return [dict(zip(fields, row)) for row in zip(*(cols[f] for f in fields))]
+
+
+def _parse_local_dt(value: str, end: bool = False) -> datetime:
+    """
+    ?from= / ?to= của bundle: "YYYY-MM-DD" hoặc "YYYY-MM-DDTHH:MM", giờ địa phương của region (không kèm offset).
+    end=True và chỉ có ngày => tính tới hết ngày đó.
+    """
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        raise ValueError("from/to must be local time without UTC offset")
+    if end and "T" not in value:
+        dt += timedelta(days=1, seconds=-1)
+    return dt
+
+
+def _bundle_query(params) -> tuple:
+    """
+    Đọc ?fields= / ?hours= / ?from= / ?to= của bundle => (fields, hours, from_dt, to_dt).
+    Giá trị sai => ValueError (view trả 400).
+    """
+    fields = None
+    raw_fields = params.get("fields")
+    if raw_fields:
+        fields = tuple(dict.fromkeys(f.strip() for f in raw_fields.split(",") if f.strip()))
+        unknown = sorted(set(fields) - set(HOURLY_FIELDS) - set(DAILY_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    hours = None
+    if params.get("hours"):
+        try:
+            hours = int(params["hours"])
+        except ValueError:
+            raise ValueError("hours must be an integer")
+        hours = max(1, min(hours, BUNDLE_MAX_HOURS))
+        if params.get("to"):
+            raise ValueError("Use either hours or to, not both")
+
+    from_dt = _parse_local_dt(params["from"]) if params.get("from") else None
+    to_dt = _parse_local_dt(params["to"], end=True) if params.get("to") else None
+    if from_dt and to_dt and from_dt > to_dt:
+        raise ValueError("from must be before to")
+    return fields, hours, from_dt, to_dt
+
+
+def _bundle_window(payload: dict, hours: int | None, from_dt: datetime | None, to_dt: datetime | None):
+    """
+    (start, end) unixtime, đóng 2 đầu, cho _bundle_project. Không lọc theo thời gian => None.
+    hours không kèm from => tính từ giờ hiện tại (giờ gần nhất <= now).
+    """
+    if hours is None and from_dt is None and to_dt is None:
+        return None
+
+    offset = (payload.get("location") or {}).get("utc_offset_seconds") or 0
+    epoch = datetime(1970, 1, 1)
+    start = int((from_dt - epoch).total_seconds()) - offset if from_dt else float("-inf")
+    end = int((to_dt - epoch).total_seconds()) - offset if to_dt else float("inf")
+
+    if hours is not None:
+        if from_dt is None:
+            h_time = (payload.get("hourly") or {}).get("time") or []
+            i = _latest_hour_index(payload)
+            start = h_time[i] if i is not None else int(timezone.now().timestamp())
+        end = start + (hours - 1) * 3600
+    return start, end
+
+
+def _bundle_project(payload: dict, fields: tuple | None = None, window: tuple | None = None) -> dict:
+    """
+    Cắt payload cache (dạng cột, unixtime) trước khi serialize — không tạo cache entry mới, không sửa payload gốc.
+    - fields: chỉ giữ các field này trong current/hourly/daily (time/date luôn giữ)
+    - window: (start, end) unixtime; hourly giữ giờ trong khoảng, daily giữ các ngày giao với khoảng
+    """
+    if fields is None and window is None:
+        return payload
+
+    current = payload.get("current") or {}
+    hourly = payload.get("hourly") or {}
+    daily = payload.get("daily") or {}
+
+    if window is not None:
+        start, end = window
+        h_time = hourly.get("time") or []
+        lo, hi = bisect_left(h_time, start), bisect_right(h_time, end)
+        hourly = {k: v[lo:hi] for k, v in hourly.items()}
+
+        # daily.date = 00:00 địa phương => ngày [d, d + 1 ngày) giao [start, end]
+        d_time = daily.get("date") or []
+        lo, hi = bisect_right(d_time, start - 86400), bisect_right(d_time, end)
+        daily = {k: v[lo:hi] for k, v in daily.items()}
+
+    if fields is not None:
+        keep = set(fields)
+        current = {k: v for k, v in current.items() if k == "time" or k in keep}
+        hourly = {k: v for k, v in hourly.items() if k == "time" or k in keep}
+        daily = {k: v for k, v in daily.items() if k == "date" or k in keep}
+
+    return {**payload, "current": current, "hourly": hourly, "daily": daily}
+
+
+def _bundle_local_times(payload: dict) -> dict:
+    """
+    unixtime trong payload cache => chuỗi giờ địa phương như Open-Meteo timeformat=iso8601
+    (current/hourly "YYYY-MM-DDTHH:MM", daily "YYYY-MM-DD"). Không sửa payload gốc.
+    """
+    offset = (payload.get("location") or {}).get("utc_offset_seconds") or 0
+    current = dict(payload.get("current") or {})
+    hourly = dict(payload.get("hourly") or {})
+    daily = dict(payload.get("daily") or {})
+
+    current["time"] = local_iso(current.get("time"), offset)
+    hourly["time"] = local_iso_many(hourly.get("time") or [], offset)
+    daily["date"] = local_iso_many(daily.get("date") or [], offset, daily=True)
+    return {**payload, "current": current, "hourly": hourly, "daily": daily}
+
+
+def _bundle_layout(payload: dict, layout: str) -> dict:
+    """
+    Payload cache luôn ở dạng cột, time là unixtime. Đổi time ra chuỗi rồi:
+    layout="rows" (mặc định, shape cũ) => bung hourly/daily thành list object.
+    """
+    payload = _bundle_local_times(payload)
+    if layout == "columnar":
+        meta = dict(payload.get("meta") or {})
+        meta["layout"] = "columnar"
+        return {**payload, "meta": meta}
+
+    return {
+        **payload,
+        "hourly": _rows_from_columns(payload["hourly"], HOURLY_FIELDS),
+        "daily": _rows_from_columns(payload["daily"], DAILY_FIELDS),
+    }
+
+
+def _normalize_bundle(raw: dict) -> dict:
+    """
+    Shape cũ (hourly/daily là list object) — giữ cho code/benchmark cần dạng hàng.
+    """
+    return _bundle_layout(_normalize_bundle_columnar(raw), "rows")
+
+
+def _bundle_params(forecast_days: int = 10, tz: str | None = None) -> dict:
+    """
+    Params Open-Meteo cho bundle (chưa gồm latitude/longitude).
+    """
+    return {
         "timezone": tz or "auto",
+        "timeformat": "unixtime",
         "forecast_days": forecast_days,
         "wind_speed_unit": "kmh",
         "precipitation_unit": "mm",
@@ -374,78 +682,147 @@ def _open_meteo_fetch(lat: float, lon: float, forecast_days: int = 10, tz: str |
         ),
     }
 
-    resp = requests.get(OPEN_METEO_BASE, params=params, timeout=20)
-    resp.raise_for_status()
-    return resp.json()
 
+def _open_meteo_fetch(lat: float, lon: float, forecast_days: int = 10, tz: str | None = None) -> dict:
+    params = {"latitude": lat, "longitude": lon}
+    params.update(_bundle_params(forecast_days, tz))
+    return om_get(OPEN_METEO_BASE, params)
 
-@api_view(["GET"])
-def province_weather(request, code: str):
-    province, lat, lon = _get_region_coord(code)
-    if lat is None or lon is None:
-        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
 
-    om = _om_get(
-        lat,
-        lon,
-        {
-            "current_weather": True,
-            "daily": "temperature_2m_max,temperature_2m_min",
-            "past_days": 7,
-            "forecast_days": 7,
-        },
-    )
+def _store_target(region: dict | None, lat: float, lon: float):
+    """
+    HOURLY_STORE_READ bật => StoreTarget của region để đọc từ weather_forecast_hourly (api/hourly_store.py);
+    tắt / không có region => None (gọi thẳng Open-Meteo).
+    """
+    if region is None or not hourly_store.read_enabled():
+        return None
+    return hourly_store.region_target(region, lat, lon)
 
-    current = om.get("current_weather", {})
-    daily = om.get("daily", {})
 
-    today = date.today().isoformat()
-    past, future = [], []
+def _bundle_fetch(region: dict | None, lat: float, lon: float, forecast_days: int = 10, tz: str | None = None) -> dict:
+    """
+    Raw Open-Meteo cho bundle: từ store (read-through) khi bật HOURLY_STORE_READ và tz mặc định, không thì gọi live.
+    """
+    target = _store_target(region, lat, lon) if tz in (None, "auto") else None
+    if target is not None:
+        return hourly_store.read_through(target, past_days=0, forecast_days=forecast_days)
+    return _open_meteo_fetch(lat, lon, forecast_days=forecast_days, tz=tz)
+
+
+LAYER_PARAMS = {
+    "past_days": 7,
+    "forecast_days": 7,
+    "wind_speed_unit": "kmh",
+    "precipitation_unit": "mm",
+    "current": ",".join(
+        [
+            "temperature_2m",
+            "relative_humidity_2m",
+            "precipitation",
+            "precipitation_probability",
+            "cloud_cover",
+            "wind_speed_10m",
+            "wind_direction_10m",
+        ]
+    ),
+    "hourly": ",".join(
+        [
+            "relative_humidity_2m",
+            "precipitation",
+            "precipitation_probability",
+            "cloud_cover",
+            "wind_speed_10m",
+            "wind_direction_10m",
+        ]
+    ),
+    "daily": ",".join(
+        [
+            "temperature_2m_max",
+            "temperature_2m_min",
+            "precipitation_sum",
+            "precipitation_probability_max",
+        ]
+    ),
+}
 
-    for i, t in enumerate(daily.get("time", [])):
-        item = {"time": t, "tmax": daily["temperature_2m_max"][i], "tmin": daily["temperature_2m_min"][i]}
-        (past if t < today else future).append(item)
+def _layers_super_payload(lat: float, lon: float, region: dict | None = None) -> tuple[dict, float]:
+    """
+    1 lần gọi Open-Meteo (current + hourly + daily, 7 ngày trước/sau) dùng chung cho 5 layer
+    weather/wind/rain/humidity/cloud. Cache 2 tầng (LRU + bảng forecast_cache) theo toạ độ (đã snap lưới),
+    hạn LAYER_CACHE_TTL_SEC, qua swr_entry: hết hạn => trả bản stale + refresh nền; upstream lỗi / breaker mở
+    => bản last-good trong bảng (dùng chung giữa các worker, còn sau restart), không còn bản nào thì raise.
+    HOURLY_STORE_READ bật => lấy từ weather_forecast_hourly của region (read-through) thay cho gọi live.
+    Trả (om, fetched_at) — fetched_at (unix time) dùng cho ETag / max-age.
+    """
+    target = _store_target(region, lat, lon)
+    lat, lon = snap_to_grid(lat, lon)
+    # v4: payload nằm trong forecast_cache (trước: django cache, mỗi worker 1 bản last-good riêng)
+    cache_key = f"layers:v4:lat={lat:.6f}&lon={lon:.6f}"
+    ttl = timedelta(seconds=int(getattr(settings, "LAYER_CACHE_TTL_SEC", 600)))
+
+    def fetch():
+        if target is not None:
+            return hourly_store.read_through(target, past_days=LAYER_PARAMS["past_days"], forecast_days=LAYER_PARAMS["forecast_days"])
+        return _om_get(lat, lon, LAYER_PARAMS)
+
+    def fill():
+        return fill_locked(
+            cache_key, fetch, lat=lat, lon=lon, forecast_days=LAYER_PARAMS["forecast_days"], tz="auto", ttl=ttl
+        )
 
-    return Response(
-        {
-            "province": province,
-            "coord": {"lat": lat, "lon": lon},
-            "current": {"temperature": current.get("temperature"), "time": current.get("time")},
-            "daily_past_7": past[-7:],
-            "daily_future_7": future[:7],
-        }
-    )
+    entry = swr_entry(cache_key, fill)
+    return entry.payload, entry.fetched_at.timestamp()
 
 
-@api_view(["GET"])
-def province_rain(request, code: str):
-    province, lat, lon = _get_region_coord(code)
-    if lat is None or lon is None:
-        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
+def _layer_response(request, layer: str, province: dict, fetched_at: float, build) -> Response:
+    """
+    Response của 1 layer kèm ETag / Cache-Control. Projection phụ thuộc giờ hiện tại
+    (giờ gần nhất, hôm nay/hôm qua) => ETag gồm cả mốc giờ để không 304 nhầm khi sang giờ mới.
+    """
+    now = timezone.now().timestamp()
+    etag = make_etag("layer", layer, province["code"], fetched_at, int(now // 3600))
+    ttl = int(getattr(settings, "LAYER_CACHE_TTL_SEC", 600))
+    return conditional_response(request, etag, fetched_at + ttl - now, build)
 
-    om = _om_get(
-        lat,
-        lon,
-        {
-            "current": "precipitation,precipitation_probability",
-            "hourly": "precipitation,precipitation_probability",
-            "daily": "precipitation_sum,precipitation_probability_max",
-            "forecast_days": 7,
-            "past_days": 1,
-            "precipitation_unit": "mm",
-        },
-    )
 
+def _weather_layer(province: dict, lat: float, lon: float, om: dict) -> dict:
+    current = om.get("current") or {}
+    daily = om.get("daily") or {}
+    offset = int(om.get("utc_offset_seconds") or 0)
+
+    # "hôm nay" theo giờ địa phương của region, không theo giờ server
+    today = _local_day(timezone.now().timestamp(), offset)
+    past, future = [], []
+
+    d_times = daily.get("time", []) or []
+    for i, (t, label) in enumerate(zip(d_times, local_iso_many(d_times, offset, daily=True))):
+        day = _local_day(t, offset)
+        if day is None:
+            continue
+        item = {"time": label, "tmax": daily["temperature_2m_max"][i], "tmin": daily["temperature_2m_min"][i]}
+        (past if day < today else future).append(item)
+
+    return {
+        "province": province,
+        "coord": {"lat": lat, "lon": lon},
+        "current": {"temperature": current.get("temperature_2m"), "time": local_iso(current.get("time"), offset)},
+        "daily_past_7": past[-7:],
+        "daily_future_7": future[:7],
+    }
+
+
+def _rain_layer(province: dict, lat: float, lon: float, om: dict) -> dict:
     cur = om.get("current", {}) or {}
     t = cur.get("time")
     precip = cur.get("precipitation")
     prob = cur.get("precipitation_probability")
 
+    hour_ix = _latest_hour_index(om) if precip is None or prob is None else None
     if precip is None:
-        t2, precip = _latest_hour_value(om, "precipitation")
+        t2, precip = _latest_hour_value(om, "precipitation", hour_ix)
         t = t or t2
     if prob is None:
-        t3, prob = _latest_hour_value(om, "precipitation_probability")
+        t3, prob = _latest_hour_value(om, "precipitation_probability", hour_ix)
         t = t or t3
 
     daily = om.get("daily", {}) or {}
@@ -453,161 +830,296 @@ def province_rain(request, code: str):
     d_sum = daily.get("precipitation_sum", []) or []
     d_pmax = daily.get("precipitation_probability_max", []) or []
 
-    n = min(len(d_times), 7)
+    # 7 ngày bắt đầu từ hôm qua (theo giờ địa phương của region)
+    offset = int(om.get("utc_offset_seconds") or 0)
+    yesterday = _local_day(t if t is not None else timezone.now().timestamp(), offset) - 1
+    start = next((i for i, d in enumerate(d_times) if d is not None and _local_day(d, offset) >= yesterday), len(d_times))
+
     points = []
-    for i in range(n):
+    for i in range(start, min(len(d_times), start + 7)):
         points.append(
             {
-                "date": d_times[i],
+                "date": local_iso(d_times[i], offset, daily=True),
                 "precipitation_sum_mm": d_sum[i] if i < len(d_sum) else None,
                 "precipitation_probability_max": d_pmax[i] if i < len(d_pmax) else None,
             }
         )
 
-    return Response(
-        {
-            "province": province,
-            "coord": {"lat": lat, "lon": lon},
-            "timezone": om.get("timezone"),
-            "current": {"precipitation_mm": precip, "precipitation_probability": prob, "time": t},
-            "daily": {"points": points},
-        }
-    )
+    return {
+        "province": province,
+        "coord": {"lat": lat, "lon": lon},
+        "timezone": om.get("timezone"),
+        "current": {"precipitation_mm": precip, "precipitation_probability": prob, "time": local_iso(t, offset)},
+        "daily": {"points": points},
+    }
 
 
-@api_view(["GET"])
-def province_wind(request, code: str):
-    province, lat, lon = _get_region_coord(code)
-    if lat is None or lon is None:
-        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
+def _wind_rose_query(params) -> tuple:
+    """
+    Đọc ?window= / ?from= / ?to= / ?sectors= của hoa gió => (window, from_dt, to_dt, sectors).
+    window: 24h (mặc định) | 72h | 7d, tính lùi từ giờ hiện tại; from/to (giờ địa phương như bundle)
+    => khoảng tuỳ chọn, thiếu to thì tới giờ hiện tại. Giá trị sai => ValueError (view trả 400).
+    """
+    window = params.get("window") or "24h"
+    if window not in ROSE_WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(ROSE_WINDOWS)}")
 
-    om = _om_get(
-        lat,
-        lon,
-        {
-            "hourly": "wind_speed_10m,wind_direction_10m",
-            "past_days": 1,
-            "forecast_days": 0,
-            "windspeed_unit": "ms",  # giữ như bạn đang dùng
-        },
-    )
+    try:
+        sectors = int(params.get("sectors") or 16)
+    except ValueError:
+        raise ValueError("sectors must be an integer")
+    if sectors not in ROSE_SECTORS:
+        raise ValueError(f"sectors must be one of {', '.join(map(str, ROSE_SECTORS))}")
+
+    from_dt = _parse_local_dt(params["from"]) if params.get("from") else None
+    to_dt = _parse_local_dt(params["to"], end=True) if params.get("to") else None
+    if to_dt is not None and from_dt is None:
+        raise ValueError("to requires from")
+    if params.get("window") and from_dt is not None:
+        raise ValueError("Use either window or from/to, not both")
+    if from_dt and to_dt and from_dt > to_dt:
+        raise ValueError("from must be before to")
+    return window, from_dt, to_dt, sectors
+
+
+def _wind_rose_window(om: dict, window: str = "24h", from_dt: datetime | None = None, to_dt: datetime | None = None):
+    """
+    (start, end) unixtime, đóng 2 đầu. Không có hourly.time => None.
+    Cửa sổ cuộn: N giờ kết thúc ở giờ gần nhất <= now (giờ hiện tại tính là giờ cuối).
+    """
+    times = (om.get("hourly") or {}).get("time") or []
+    i = _latest_hour_index(om)
+    if i is None:
+        return None
+
+    now_ts = times[i]
+    if from_dt is None:
+        return now_ts - (ROSE_WINDOWS[window] - 1) * 3600, now_ts
 
+    offset = int(om.get("utc_offset_seconds") or 0)
+    epoch = datetime(1970, 1, 1)
+    start = int((from_dt - epoch).total_seconds()) - offset
+    end = int((to_dt - epoch).total_seconds()) - offset if to_dt else now_ts
+    return start, end
+
+
+def _wind_layer(province: dict, lat: float, lon: float, om: dict, rose: dict | None = None) -> dict | None:
+    """
+    None => không có dữ liệu gió (view trả 204).
+    rose: kết quả wind_rose.build_rose / cached_rose đã tính sẵn; không truyền => hoa gió 24 giờ, 16 hướng.
+    """
     hourly = om.get("hourly", {}) or {}
     times = hourly.get("time", []) or []
     wspd = hourly.get("wind_speed_10m", []) or []
     wdir = hourly.get("wind_direction_10m", []) or []
 
-    if not times or not wdir:
-        return Response({"detail": "No wind data"}, status=204)
+    i = _latest_hour_index(om)
+    if i is None or not wdir:
+        return None
 
-    speed_kmh = (wspd[-1] * 3.6) if (wspd and wspd[-1] is not None) else None
-    direction_deg = wdir[-1] if wdir else None
-    time_str = times[-1] if times else None
-
-    labels = [
-        "Bắc", "BĐB", "ĐB", "ĐĐB",
-        "Đ", "ĐĐN", "ĐN", "NĐN",
-        "Nam", "NTN", "TN", "TTN",
-        "T", "TTB", "TB", "BTB",
-    ]
-    counts = [0] * 16
-    for deg in wdir[-24:]:
-        if deg is None:
-            continue
-        idx = int(round((deg % 360) / 22.5)) % 16
-        counts[idx] += 1
+    end = min(i + 1, len(times))
+    speed_kmh = wspd[end - 1] if end - 1 < len(wspd) else None
+    direction_deg = wdir[end - 1] if end - 1 < len(wdir) else None
+    time_str = local_iso(times[end - 1], om.get("utc_offset_seconds") or 0)
 
-    rose = [{"dir_label": labels[i], "angle_deg": i * 22.5, "count": counts[i]} for i in range(16)]
+    if rose is None:
+        rose = build_rose(om, *_wind_rose_window(om))
 
-    return Response(
-        {
+    return {
+        "province": province,
+        "coord": {"lat": lat, "lon": lon},
+        "current": {"wind_speed_kmh": speed_kmh, "wind_direction_deg": direction_deg, "time": time_str},
+        "rose_period_hours": rose["window"]["hours"],
+        "rose_window": rose["window"],
+        "speed_classes_kmh": rose["speed_classes_kmh"],
+        "rose": rose["rose"],
+    }
+
+
+def _humidity_layer(province: dict, lat: float, lon: float, om: dict) -> dict:
+    cur = om.get("current") or {}
+    t = local_iso(cur.get("time"), om.get("utc_offset_seconds") or 0)
+    v = cur.get("relative_humidity_2m")
+
+    return {
+        "province": province,
+        "coord": {"lat": lat, "lon": lon},
+        "current": {"time": t, "humidity_percent": v},
+    }
+
+
+def _cloud_layer(province: dict, lat: float, lon: float, om: dict) -> dict:
+    cur = om.get("current", {}) or {}
+    t = cur.get("time")
+    cloud = cur.get("cloud_cover")
+
+    if cloud is None:
+        t2, cloud = _latest_hour_value(om, "cloud_cover")
+        t = t or t2
+
+    return {
+        "province": province,
+        "coord": {"lat": lat, "lon": lon},
+        "timezone": om.get("timezone"),
+        "current": {
+            "time": local_iso(t, om.get("utc_offset_seconds") or 0),
+            "cloud_cover_percent": cloud,
+            "visibility_m": None,
+        },
+    }
+
+
+# tên layer (như WeatherLayerKey ở frontend) => projection từ super-payload
+LAYER_BUILDERS = {
+    "temp": _weather_layer,
+    "wind": _wind_layer,
+    "rain": _rain_layer,
+    "humidity": _humidity_layer,
+    "cloud": _cloud_layer,
+}
+
+
+@api_view(["GET"])
+def province_layers(request, code: str):
+    """
+    Nhiều layer của 1 region trong 1 response: ?layers=temp,wind,rain,humidity,cloud (mặc định: tất cả).
+    Resolve region 1 lần, tối đa 1 lần gọi upstream (dùng chung super-payload với các endpoint layer lẻ).
+    {
+      "province": {...}, "coord": {...},
+      "layers": {"temp": {...}, "wind": {...} | null, ...}   # shape giống /weather/, /wind/, ...; wind null = không có dữ liệu
+    }
+    """
+    raw = request.query_params.get("layers")
+    names = list(dict.fromkeys(x.strip() for x in raw.split(",") if x.strip())) if raw else list(LAYER_BUILDERS)
+    unknown = [x for x in names if x not in LAYER_BUILDERS]
+    if unknown or not names:
+        return Response(
+            {"detail": f"layers must be a comma-separated subset of {', '.join(LAYER_BUILDERS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    province, lat, lon = get_region_coord(code)
+    if lat is None or lon is None:
+        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
+
+    try:
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+
+    def build():
+        return {
             "province": province,
             "coord": {"lat": lat, "lon": lon},
-            "current": {"wind_speed_kmh": speed_kmh, "wind_direction_deg": direction_deg, "time": time_str},
-            "rose_period_hours": 24,
-            "rose": rose,
+            "layers": {name: LAYER_BUILDERS[name](province, lat, lon, om) for name in names},
         }
-    )
+
+    return _layer_response(request, "layers:" + ",".join(names), province, fetched_at, build)
 
 
 @api_view(["GET"])
-def province_humidity(request, code: str):
-    province, lat, lon = _get_region_coord(code)
+def province_weather(request, code: str):
+    province, lat, lon = get_region_coord(code)
     if lat is None or lon is None:
         return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
 
-    om = _om_get(
-        lat,
-        lon,
-        {
-            "current": "relative_humidity_2m",
-            "hourly": "relative_humidity_2m",
-            "past_days": 1,
-            "forecast_days": 1,
-        },
-    )
+    try:
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+    return _layer_response(request, "weather", province, fetched_at, lambda: _weather_layer(province, lat, lon, om))
 
-    cur = om.get("current") or {}
-    t = cur.get("time")
-    v = cur.get("relative_humidity_2m")
 
-    return Response(
-        {
-            "province": province,
-            "coord": {"lat": lat, "lon": lon},
-            "current": {"time": t, "humidity_percent": v},
-        }
-    )
+@api_view(["GET"])
+def province_rain(request, code: str):
+    province, lat, lon = get_region_coord(code)
+    if lat is None or lon is None:
+        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
+
+    try:
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+    return _layer_response(request, "rain", province, fetched_at, lambda: _rain_layer(province, lat, lon, om))
 
 
 @api_view(["GET"])
-def province_cloud(request, code: str):
-    province, lat, lon = _get_region_coord(code)
+def province_wind(request, code: str):
+    """
+    Gió hiện tại + hoa gió (sector × lớp tốc độ).
+    ?window=24h|72h|7d (mặc định 24h) hoặc ?from=&to= (giờ địa phương, trong 7 ngày trước/sau của super-payload),
+    ?sectors=4|8|16 (mặc định 16). Mỗi hướng trong "rose" có "count" (tổng) và "by_speed" theo "speed_classes_kmh".
+    """
+    try:
+        window, from_dt, to_dt, sectors = _wind_rose_query(request.query_params)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    province, lat, lon = get_region_coord(code)
     if lat is None or lon is None:
         return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
 
-    om = _om_get(
-        lat,
-        lon,
-        {
-            "current": "cloud_cover",
-            "hourly": "cloud_cover",
-            "past_days": 1,
-            "forecast_days": 1,
-        },
-    )
+    try:
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+    span = _wind_rose_window(om, window, from_dt, to_dt)
+    if span is None:
+        return Response({"detail": "No wind data"}, status=204)
 
-    cur = om.get("current", {}) or {}
-    t = cur.get("time")
-    cloud = cur.get("cloud_cover")
+    # cùng điều kiện None của _wind_layer, kiểm tra trước để rose chỉ được tính khi không 304
+    if _latest_hour_index(om) is None or not (om.get("hourly") or {}).get("wind_direction_10m"):
+        return Response({"detail": "No wind data"}, status=204)
 
-    if cloud is None:
-        t2, cloud = _latest_hour_value(om, "cloud_cover")
-        t = t or t2
+    def build():
+        rose = cached_rose(*snap_to_grid(lat, lon), fetched_at, om, *span, sectors=sectors)
+        return _wind_layer(province, lat, lon, om, rose)
 
-    return Response(
-        {
-            "province": province,
-            "coord": {"lat": lat, "lon": lon},
-            "timezone": om.get("timezone"),
-            "current": {"time": t, "cloud_cover_percent": cloud, "visibility_m": None},
-        }
-    )
+    return _layer_response(request, f"wind:{span[0]}-{span[1]}:{sectors}", province, fetched_at, build)
 
 
 @api_view(["GET"])
-def province_current(request, code: str):
-    province, lat, lon = _get_region_coord(code)
+def province_humidity(request, code: str):
+    province, lat, lon = get_region_coord(code)
     if lat is None or lon is None:
-        return Response({"detail": f"Region {code} missing centroid_lat/centroid_lon"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
 
     try:
-        resp = requests.get(
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+    return _layer_response(request, "humidity", province, fetched_at, lambda: _humidity_layer(province, lat, lon, om))
+
+
+@api_view(["GET"])
+def province_cloud(request, code: str):
+    province, lat, lon = get_region_coord(code)
+    if lat is None or lon is None:
+        return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=400)
+
+    try:
+        om, fetched_at = _layers_super_payload(lat, lon, province)
+    except Exception as e:
+        return upstream_error(e)
+    return _layer_response(request, "cloud", province, fetched_at, lambda: _cloud_layer(province, lat, lon, om))
+
+
+def _current_fetch(lat: float, lon: float, region: dict | None = None) -> dict:
+    """
+    Current conditions từ Open-Meteo, chưa gồm "region" (gắn theo từng request).
+    HOURLY_STORE_READ bật => giờ gần nhất trong weather_forecast_hourly của region (read-through).
+    """
+    target = _store_target(region, lat, lon)
+    if target is not None:
+        om = hourly_store.read_through(target, past_days=0, forecast_days=1)
+    else:
+        om = om_get(
             OPEN_METEO_BASE,
-            params={
+            {
                 "latitude": lat,
                 "longitude": lon,
                 "timezone": "auto",
+                "timeformat": "unixtime",
                 "windspeed_unit": "kmh",
                 "precipitation_unit": "mm",
                 "current": ",".join(
@@ -621,33 +1133,54 @@ def province_current(request, code: str):
                     ]
                 ),
             },
-            timeout=15,
         )
-        resp.raise_for_status()
-        om = resp.json()
-    except Exception as e:
-        return Response({"detail": f"Open-Meteo error: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
 
     curw = om.get("current") or {}
 
-    return Response(
-        {
-            "region": {"code": province["code"], "name": province["name"]},
-            "time": curw.get("time"),
-            "temperature_c": curw.get("temperature_2m"),
-            "feels_like_c": None,
-            "wind_kmh": curw.get("wind_speed_10m"),
-            "wind_dir_deg": curw.get("wind_direction_10m"),
-            "humidity_percent": curw.get("relative_humidity_2m"),
-            "cloud_percent": curw.get("cloud_cover"),
-            "precipitation_mm": curw.get("precipitation"),
-            "meta": {
-                "source": "open-meteo",
-                "timezone": om.get("timezone"),
-                "lat": lat,
-                "lon": lon,
-            },
-        }
+    return {
+        "time": local_iso(curw.get("time"), om.get("utc_offset_seconds") or 0),
+        "temperature_c": curw.get("temperature_2m"),
+        "feels_like_c": None,
+        "wind_kmh": curw.get("wind_speed_10m"),
+        "wind_dir_deg": curw.get("wind_direction_10m"),
+        "humidity_percent": curw.get("relative_humidity_2m"),
+        "cloud_percent": curw.get("cloud_cover"),
+        "precipitation_mm": curw.get("precipitation"),
+        "meta": {
+            "source": "open-meteo" if target is None else "hourly_store",
+            "timezone": om.get("timezone"),
+            "lat": lat,
+            "lon": lon,
+        },
+    }
+
+
+@api_view(["GET"])
+def province_current(request, code: str):
+    province, lat, lon = get_region_coord(code)
+    if lat is None or lon is None:
+        return Response({"detail": f"Region {code} missing centroid_lat/centroid_lon"}, status=status.HTTP_400_BAD_REQUEST)
+
+    qlat, qlon = snap_to_grid(lat, lon)
+    cache_key = f"current:lat={qlat:.6f}&lon={qlon:.6f}"
+    ttl = timedelta(seconds=int(getattr(settings, "CURRENT_CACHE_TTL_SEC", 300)))
+
+    def fill():
+        return fill_locked(
+            cache_key, lambda: _current_fetch(qlat, qlon, province), lat=qlat, lon=qlon, forecast_days=0, tz="auto", ttl=ttl
+        )
+
+    try:
+        entry = swr_entry(cache_key, fill)
+    except Exception as e:
+        return upstream_error(e)
+
+    region = {"code": province["code"], "name": province["name"]}
+    return conditional_response(
+        request,
+        entry_etag(entry, cache_key, province["code"]),
+        entry_max_age(entry),
+        lambda: {"region": region, **entry.payload},
     )
 
 
@@ -655,8 +1188,21 @@ def province_current(request, code: str):
 def province_bundle(request, code: str):
     """
     Trả bundle current + hourly + daily để frontend vẽ HourlySection.
+    ?layout=rows (mặc định): hourly/daily là list object | ?layout=columnar: mỗi field 1 mảng.
+    ?fields=temperature_c,rain_mm: chỉ trả các field này (HOURLY_FIELDS / DAILY_FIELDS, time/date luôn có).
+    ?hours=N: N giờ kể từ giờ hiện tại (hoặc từ ?from=) | ?from=&to=: khoảng giờ địa phương
+    ("YYYY-MM-DD" hoặc "YYYY-MM-DDTHH:MM"); daily giữ các ngày giao với khoảng đó.
     """
-    province, lat, lon = _get_region_coord(code)
+    layout = request.query_params.get("layout", "rows")
+    if layout not in ("rows", "columnar"):
+        return Response({"detail": "layout must be 'rows' or 'columnar'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fields, hours, from_dt, to_dt = _bundle_query(request.query_params)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    province, lat, lon = get_region_coord(code)
     if lat is None or lon is None:
         return Response({"detail": "Missing centroid_lat/centroid_lon"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -664,39 +1210,34 @@ def province_bundle(request, code: str):
     forecast_days = max(1, min(forecast_days, 16))
 
     tz = request.query_params.get("tz")
-    cache_key = _build_cache_key(lat, lon, forecast_days, tz or "auto")
-
-    try:
-        fc = ForecastCache.objects.filter(key=cache_key).first()
-        if fc:
-            payload = getattr(fc, "payload", None) or getattr(fc, "data", None)
-            expires_at = getattr(fc, "expires_at", None)
-            if payload and (expires_at is None or expires_at > timezone.now()):
-                return Response(payload)
-    except Exception:
-        fc = None
+    qlat, qlon = snap_to_grid(lat, lon)
+    cache_key = _build_cache_key(qlat, qlon, forecast_days, tz or "auto")
+
+    def fill():
+        return fill_locked(
+            cache_key,
+            lambda: _normalize_bundle_columnar(_bundle_fetch(province, qlat, qlon, forecast_days=forecast_days, tz=tz)),
+            lat=qlat,
+            lon=qlon,
+            forecast_days=forecast_days,
+            tz=tz or "auto",
+        )
 
     try:
-        raw = _open_meteo_fetch(lat, lon, forecast_days=forecast_days, tz=tz)
-        payload = _normalize_bundle(raw)
-        payload["region"] = {"code": province["code"], "name": province["name"]}
+        entry = swr_entry(cache_key, fill)
     except Exception as e:
-        return Response({"detail": f"Open-Meteo error: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
+        return upstream_error(e)
 
-    try:
-        if fc is None:
-            fc = ForecastCache(key=cache_key)
-        if hasattr(fc, "payload"):
-            fc.payload = payload
-        elif hasattr(fc, "data"):
-            fc.data = payload
-        if hasattr(fc, "expires_at"):
-            fc.expires_at = timezone.now() + timedelta(minutes=10)
-        fc.save()
-    except Exception:
-        pass
+    def build():
+        payload = _bundle_project(entry.payload, fields, _bundle_window(entry.payload, hours, from_dt, to_dt))
+        payload = _bundle_layout(payload, layout)
+        payload["region"] = {"code": province["code"], "name": province["name"]}
+        return payload
 
-    return Response(payload)
+    # ?hours= không kèm from tính từ giờ hiện tại => ETag đổi theo giờ
+    hour_mark = int(timezone.now().timestamp() // 3600) if hours is not None and from_dt is None else ""
+    etag = entry_etag(entry, cache_key, province["code"], sorted(request.query_params.items()), hour_mark)
+    return conditional_response(request, etag, entry_max_age(entry), build)
 
 
 @api_view(["GET"])
@@ -709,41 +1250,39 @@ def province_index(request):
       ]
     }
     """
-    cache_key = "meteo:province_index:v2"
+    # v3: value = (generated_at, payload)
+    cache_key = "meteo:province_index:v3"
+    ttl = 60 * 60 * 24 * 7
     cached = cache.get(cache_key)
-    if cached is not None:
-        resp = Response(cached)
-        resp["Cache-Control"] = "public, max-age=604800"
-        return resp
-
-    items = []
-    with connection.cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, code, name, centroid_lat, centroid_lon
-            FROM provinces
-            WHERE code IS NOT NULL AND name IS NOT NULL
-            ORDER BY name ASC;
-            """
-        )
-        for id_, code, name, lat, lon in cur.fetchall():
-            if lat is None or lon is None:
-                continue
-            items.append(
-                {
-                    "id": int(id_),
-                    "code": str(code),
-                    "name": str(name),
-                    "centroid": {"lat": float(lat), "lon": float(lon)},
-                }
+    if cached is None:
+        items = []
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, code, name, centroid_lat, centroid_lon
+                FROM provinces
+                WHERE code IS NOT NULL AND name IS NOT NULL
+                ORDER BY name ASC;
+                """
             )
-
-    payload = {"items": items}
-    cache.set(cache_key, payload, 60 * 60 * 24 * 7)
-
-    resp = Response(payload)
-    resp["Cache-Control"] = "public, max-age=604800"
-    return resp
+            for id_, code, name, lat, lon in cur.fetchall():
+                if lat is None or lon is None:
+                    continue
+                items.append(
+                    {
+                        "id": int(id_),
+                        "code": str(code),
+                        "name": str(name),
+                        "centroid": {"lat": float(lat), "lon": float(lon)},
+                    }
+                )
+
+        cached = (timezone.now().timestamp(), {"items": items})
+        cache.set(cache_key, cached, ttl)
+
+    generated_at, payload = cached
+    etag = make_etag("province_index", generated_at)
+    return conditional_response(request, etag, generated_at + ttl - timezone.now().timestamp(), lambda: payload)
 
 
 @api_view(["GET"])
@@ -1,3 +1,4 @@
+import math
 from datetime import date, timedelta
 import requests
 from rest_framework.decorators import api_view, permission_classes
@@ -5,13 +6,128 @@ from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 
+from django.conf import settings
+from django.http import Http404
+from django.utils import timezone
+
+from api.archive_cache import settled_until
+from api.circuit_breaker import CircuitOpenError
+from api.hourly_store import region_target
+from api.models import HourlyStoreSync
 from api.open_meteo import om_forecast_daily, om_archive_daily  # bạn tự implement gọi API
+from api.regions import get_region_coord
+from api.rollups import DAILY_COLUMNS, daily_rollups, weekly_rollups
 
 def week_range(d: date):
     start = d - timedelta(days=d.weekday())
     end = start + timedelta(days=6)
     return start, end
 
+
+# biến daily trả FE trong series (kèm "time" + alias "cloud_cover"), giống nhau ở cả 2 nguồn rollup / Open-Meteo
+SERIES_FIELDS = (
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "wind_speed_10m_max",
+    "cloud_cover_mean",
+)
+
+
+def _week_series(daily: dict) -> dict:
+    """
+    Block daily (payload Open-Meteo hoặc dựng từ rollup ngày) => series trả FE: time + SERIES_FIELDS + cloud_cover,
+    giá trị làm tròn 2 chữ số như rollup (api/rollups.py). 2 nguồn cùng đi qua đây => cùng key, cùng làm tròn.
+    """
+    times = list(daily.get("time") or [])
+    out = {"time": times}
+    for var in SERIES_FIELDS:
+        arr = daily.get(var)
+        if arr is None and var == "cloud_cover_mean":
+            arr = daily.get("cloud_cover")
+        arr = arr if isinstance(arr, list) else []
+        out[var] = [round(arr[i], 2) if i < len(arr) and arr[i] is not None else None for i in range(len(times))]
+    out["cloud_cover"] = out["cloud_cover_mean"]
+    return out
+
+
+def _week_summary(series: dict) -> dict:
+    def avg(arr):
+        xs = [x for x in arr if x is not None]
+        return round(math.fsum(xs) / len(xs), 2) if xs else None
+
+    return {
+        "tmax_avg": avg(series["temperature_2m_max"]),
+        "tmin_avg": avg(series["temperature_2m_min"]),
+        "rain_sum": round(math.fsum(x or 0 for x in series["precipitation_sum"]), 2),
+        "wind_max_avg": avg(series["wind_speed_10m_max"]),
+        "cloud_avg": avg(series["cloud_cover_mean"]),
+    }
+
+
+def _rollup_weeks(code: str, this_start: date, last_start: date):
+    """
+    Summary + series của 2 tuần từ bảng rollup (api/rollups.py): 2 lần quét index thay vì 2 lời gọi Open-Meteo.
+    Thiếu rollup hoặc tuần chưa đủ 7 ngày => None (gọi API như cũ).
+    Tuần đã chốt hết (ngày cuối <= archive_cache.settled_until) không đổi nữa => luôn coi là mới. Tuần còn ngày
+    chưa chốt / ngày dự báo: rollup tuần hoặc store của target cũ hơn HOURLY_STORE_MAX_AGE_SEC => None.
+    """
+    try:
+        region, lat, lon = get_region_coord(code)
+    except Http404:
+        return None
+    target = region_target(region, lat, lon)
+
+    weeks = weekly_rollups(target.owner, target.id, [this_start, last_start])
+    if any(getattr(weeks.get(s), "days", 0) < 7 for s in (this_start, last_start)):
+        return None
+
+    settled = settled_until()
+    live = [s for s in (this_start, last_start) if s + timedelta(days=6) > settled]
+    if live:
+        cutoff = timezone.now() - timedelta(seconds=int(getattr(settings, "HOURLY_STORE_MAX_AGE_SEC", 3600)))
+        if any(weeks[s].updated_at < cutoff for s in live):
+            return None
+        sync = HourlyStoreSync.objects.filter(owner=target.owner, owner_id=target.id).only("synced_at").first()
+        if sync is not None and sync.synced_at < cutoff:
+            return None
+
+    def series(start):
+        rows = daily_rollups(target.owner, target.id, start, start + timedelta(days=6))
+        daily = {"time": [r.day.isoformat() for r in rows]}
+        for col, var in DAILY_COLUMNS.items():
+            daily[var] = [getattr(r, col) for r in rows]
+        return _week_series(daily)
+
+    series_this, series_last = series(this_start), series(last_start)
+    return _week_summary(series_this), _week_summary(series_last), series_this, series_last
+
+
+def _compare_body(code, this_start, this_end, last_start, last_end, s_this, s_last, series_this, series_last, source):
+    def diff(a, b):
+        if a is None or b is None:
+            return None
+        return round(a - b, 2)
+
+    return {
+        "province_code": code,
+        "source": source,
+        "ranges": {
+            "this_week": {"start": this_start.isoformat(), "end": this_end.isoformat()},
+            "last_week": {"start": last_start.isoformat(), "end": last_end.isoformat()},
+        },
+        "summary": {
+            "this_week": s_this,
+            "last_week": s_last,
+            "delta": {k: diff(s_this.get(k), s_last.get(k)) for k in s_this.keys()},
+        },
+        "series": {
+            "this_week": series_this,
+            "last_week": series_last,
+        },
+    }
+
+
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
 def compare_week(request, province_code: str):
@@ -24,32 +140,6 @@ def compare_week(request, province_code: str):
     last_start = this_start - timedelta(days=7)
     last_end = this_end - timedelta(days=7)
 
-    def avg(arr):
-        if not isinstance(arr, list):
-            return None
-        xs = [x for x in arr if x is not None]
-        return (sum(xs) / len(xs)) if xs else None
-
-    def sum0(arr):
-        if not isinstance(arr, list):
-            return 0
-        return sum((x or 0) for x in arr)
-
-    def summarize(payload):
-        d = (payload or {}).get("daily") or {}
-        return {
-            "tmax_avg": avg(d.get("temperature_2m_max", [])),
-            "tmin_avg": avg(d.get("temperature_2m_min", [])),
-            "rain_sum": sum0(d.get("precipitation_sum", [])),
-            "wind_max_avg": avg(d.get("wind_speed_10m_max", [])),
-            "cloud_avg": avg(d.get("cloud_cover_mean", d.get("cloud_cover", []))),  # ✅ fallback
-        }
-
-    def diff(a, b):
-        if a is None or b is None:
-            return None
-        return a - b
-
     daily_fields_primary = [
         "temperature_2m_max",
         "temperature_2m_min",
@@ -66,6 +156,13 @@ def compare_week(request, province_code: str):
     ]
 
     try:
+        rolled = _rollup_weeks(code, this_start, last_start)
+        if rolled is not None:
+            s_this, s_last, series_this, series_last = rolled
+            return Response(
+                _compare_body(code, this_start, this_end, last_start, last_end, s_this, s_last, series_this, series_last, "rollup")
+            )
+
         try:
             this_week = om_forecast_daily(code, this_start, this_end, daily_fields_primary)
             last_week = om_archive_daily(code, last_start, last_end, daily_fields_primary)
@@ -83,31 +180,32 @@ def compare_week(request, province_code: str):
             else:
                 raise
 
-        s_this = summarize(this_week)
-        s_last = summarize(last_week)
+        series_this = _week_series((this_week or {}).get("daily") or {})
+        series_last = _week_series((last_week or {}).get("daily") or {})
 
         return Response(
-            {
-                "province_code": code,
-                "ranges": {
-                    "this_week": {"start": this_start.isoformat(), "end": this_end.isoformat()},
-                    "last_week": {"start": last_start.isoformat(), "end": last_end.isoformat()},
-                },
-                "summary": {
-                    "this_week": s_this,
-                    "last_week": s_last,
-                    "delta": {k: diff(s_this.get(k), s_last.get(k)) for k in s_this.keys()},
-                },
-                "series": {
-                    "this_week": (this_week or {}).get("daily", {}) or {},
-                    "last_week": (last_week or {}).get("daily", {}) or {},
-                },
-            }
+            _compare_body(
+                code,
+                this_start,
+                this_end,
+                last_start,
+                last_end,
+                _week_summary(series_this),
+                _week_summary(series_last),
+                series_this,
+                series_last,
+                "open_meteo",
+            )
         )
 
     except ValueError as e:
         return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    except CircuitOpenError as e:
+        resp = Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        resp["Retry-After"] = str(int(e.retry_after) + 1)
+        return resp
+
     except requests.HTTPError as e:
         resp = getattr(e, "response", None)
         upstream = None
@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api.map_snapshot import SNAPSHOT_LAYERS, ensure_scheduler, refresh_snapshot, snapshot_key, snapshot_layer
+from api.models import Place
+from api.tiles import TILE_LAYERS, get_tile
+from api.http_cache import conditional_response, entry_etag, entry_max_age, etag_matches, swr_entry, upstream_error
+
+
+@api_view(["GET"])
+def map_snapshot(request):
+    """
+    Current conditions của mọi tỉnh (bảng provinces) trong 1 payload gọn để tô màu bản đồ:
+    ?layer=temp|rain|humidity|cloud|wind (mặc định temp)
+    ?kind=hcm_district,...: thêm các Place thuộc kind đó
+    {
+      "layer": "temp", "unit": "°C", "time": "...",
+      "codes": ["01", ...], "values": [25.1, ...],      # wind có thêm "direction_deg"
+      "meta": {...}
+    }
+    """
+    layer = request.query_params.get("layer", "temp")
+    if layer not in SNAPSHOT_LAYERS:
+        return Response(
+            {"detail": f"layer must be one of {', '.join(SNAPSHOT_LAYERS)}"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    raw_kinds = request.query_params.get("kind") or ""
+    place_kinds = tuple(sorted({k.strip() for k in raw_kinds.split(",") if k.strip()}))
+    if place_kinds:
+        known = set(Place.objects.filter(kind__in=place_kinds).values_list("kind", flat=True).distinct())
+        unknown = [k for k in place_kinds if k not in known]
+        if unknown:
+            return Response({"detail": f"Unknown place kind: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    ensure_scheduler(place_kinds)
+    cache_key = snapshot_key(place_kinds)
+    try:
+        entry = swr_entry(cache_key, lambda: refresh_snapshot(place_kinds))
+    except Exception as e:
+        return upstream_error(e)
+
+    return conditional_response(
+        request,
+        entry_etag(entry, cache_key, layer),
+        entry_max_age(entry),
+        lambda: snapshot_layer(entry.payload, layer),
+    )
+
+
+@require_GET
+def map_tile(request, layer: str, z: int, x: int, y: int):
+    """
+    Tile heatmap XYZ (PNG 256×256) nội suy từ snapshot toàn quốc: /api/map/tiles/<layer>/<z>/<x>/<y>.png
+    layer: temp | rain | humidity | cloud. Tile cache trên đĩa theo thế hệ snapshot.
+    View Django thường (không qua content negotiation của DRF): client tile gửi Accept: image/png.
+    """
+    if layer not in TILE_LAYERS:
+        return JsonResponse({"detail": f"layer must be one of {', '.join(TILE_LAYERS)}"}, status=status.HTTP_404_NOT_FOUND)
+    if z > int(getattr(settings, "TILE_MAX_ZOOM", 12)) or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return JsonResponse({"detail": "Tile out of range"}, status=status.HTTP_404_NOT_FOUND)
+
+    ensure_scheduler()
+    cache_key = snapshot_key()
+    try:
+        entry = swr_entry(cache_key, lambda: refresh_snapshot())
+    except Exception as e:
+        return upstream_error(e, JsonResponse)
+
+    generation = str(int(entry.fetched_at.timestamp() * 1000))
+    etag = quote_etag(f"{generation}-{layer}-{z}-{x}-{y}")
+    max_age = max(0, int(entry_max_age(entry)))
+    if etag_matches(request, etag):
+        resp = HttpResponse(status=304)
+    else:
+        resp = HttpResponse(get_tile(generation, entry.payload, layer, z, x, y), content_type="image/png")
+    resp["ETag"] = etag
+    resp["Cache-Control"] = f"public, max-age={max_age}"
+    return resp
@@ -0,0 +1,16 @@
+import os
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from api.om_client import breaker_states
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def upstream_breakers(request):
+    """
+    Trạng thái circuit breaker Open-Meteo của worker đang trả lời request (pid).
+    """
+    return Response({"pid": os.getpid(), "breakers": breaker_states()})
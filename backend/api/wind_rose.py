@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # numpy không có => đếm bằng vòng lặp Python
+    np = None
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .om_client import local_iso
+
+# cửa sổ cuộn tính lùi từ giờ hiện tại: tên => số giờ
+ROSE_WINDOWS = {"24h": 24, "72h": 72, "7d": 168}
+ROSE_SECTORS = (4, 8, 16)
+
+# nhãn 16 hướng (tiếng Việt) — 8 / 4 hướng lấy cách quãng trong danh sách này
+WIND_ROSE_LABELS = [
+    "Bắc", "BĐB", "ĐB", "ĐĐB",
+    "Đ", "ĐĐN", "ĐN", "NĐN",
+    "Nam", "NTN", "TN", "TTN",
+    "T", "TTB", "TB", "BTB",
+]
+
+# mép các lớp tốc độ (km/h): (5, 10) => [0, 5), [5, 10), [10, +inf)
+DEFAULT_SPEED_EDGES_KMH = (5, 10, 20, 30, 40)
+
+# Dưới ngưỡng này vòng lặp Python nhanh hơn overhead của numpy
+_NUMPY_MIN_SAMPLES = 48
+
+
+def speed_edges() -> tuple:
+    return tuple(float(x) for x in getattr(settings, "WIND_ROSE_SPEED_EDGES_KMH", DEFAULT_SPEED_EDGES_KMH))
+
+
+def sector_index(deg: float, sectors: int = 16) -> int:
+    """
+    Sector chứa hướng deg, sector 0 căn giữa hướng Bắc. Cùng công thức với views._deg_to_compass
+    (+0.5 rồi cắt, không dùng round() — round() làm tròn kiểu banker ở biên x.5).
+    """
+    return int((deg % 360) / (360 / sectors) + 0.5) % sectors
+
+
+def rose_matrix(speeds: list, dirs: list, sectors: int = 16, edges: tuple = DEFAULT_SPEED_EDGES_KMH) -> list[list[int]]:
+    """
+    Ma trận đếm sector × lớp tốc độ (sectors hàng, len(edges) + 1 cột). Giờ thiếu tốc độ hoặc hướng => bỏ qua.
+    """
+    n_cls = len(edges) + 1
+    n = min(len(speeds), len(dirs))
+
+    if np is None or n < _NUMPY_MIN_SAMPLES:
+        counts = [[0] * n_cls for _ in range(sectors)]
+        for s, d in zip(speeds[:n], dirs[:n]):
+            if s is None or d is None:
+                continue
+            counts[sector_index(d, sectors)][bisect_right(edges, s)] += 1
+        return counts
+
+    s = np.array(speeds[:n], dtype=float)  # None -> nan
+    d = np.array(dirs[:n], dtype=float)
+    ok = ~(np.isnan(s) | np.isnan(d))
+    sec = (np.mod(d[ok], 360.0) / (360.0 / sectors) + 0.5).astype(np.int64) % sectors
+    cls = np.searchsorted(np.asarray(edges, dtype=float), s[ok], side="right")
+    flat = np.bincount(sec * n_cls + cls, minlength=sectors * n_cls)
+    return flat.reshape(sectors, n_cls).tolist()
+
+
+def build_rose(om: dict, start: int, end: int, sectors: int = 16, edges: tuple | None = None) -> dict:
+    """
+    Hoa gió từ hourly (unixtime) của payload Open-Meteo, giờ trong [start, end] (đóng 2 đầu):
+    {
+      "window": {"from", "to", "hours"},                # giờ địa phương; hours = số giờ có dữ liệu
+      "speed_classes_kmh": [{"min": 0, "max": 5}, ..., {"min": 40, "max": null}],
+      "rose": [{"dir_label", "angle_deg", "count", "by_speed": [...]}, ...]
+    }
+    """
+    edges = speed_edges() if edges is None else edges
+    hourly = om.get("hourly") or {}
+    times = hourly.get("time") or []
+    lo, hi = bisect_left(times, start), bisect_right(times, end)
+    matrix = rose_matrix(
+        (hourly.get("wind_speed_10m") or [])[lo:hi], (hourly.get("wind_direction_10m") or [])[lo:hi], sectors, edges
+    )
+
+    offset = int(om.get("utc_offset_seconds") or 0)
+    bounds = (0.0,) + tuple(edges)
+    step = 16 // sectors
+    return {
+        "window": {
+            "from": local_iso(times[lo], offset) if lo < hi else None,
+            "to": local_iso(times[hi - 1], offset) if lo < hi else None,
+            "hours": hi - lo,
+        },
+        "speed_classes_kmh": [
+            {"min": bounds[k], "max": bounds[k + 1] if k + 1 < len(bounds) else None} for k in range(len(bounds))
+        ],
+        "rose": [
+            {
+                "dir_label": WIND_ROSE_LABELS[k * step],
+                "angle_deg": k * 360 / sectors,
+                "count": sum(row),
+                "by_speed": row,
+            }
+            for k, row in enumerate(matrix)
+        ],
+    }
+
+
+def cached_rose(
+    lat: float, lon: float, fetched_at: float, om: dict, start: int, end: int, sectors: int = 16
+) -> dict:
+    """
+    build_rose cache theo (toạ độ, lần fetch super-payload, cửa sổ, số sector, lớp tốc độ) trong LAYER_CACHE_TTL_SEC:
+    rose 7 ngày của region đang nóng chỉ tính 1 lần mỗi giờ / mỗi lần payload refresh.
+    Kết quả dùng chung giữa các request — không sửa dict trả về.
+    """
+    edges = speed_edges()
+    key = (
+        f"meteo:windrose:v1:lat={lat:.6f}&lon={lon:.6f}&at={fetched_at}"
+        f"&start={start}&end={end}&sectors={sectors}&edges={','.join(map(str, edges))}"
+    )
+    rose = cache.get(key)
+    if rose is None:
+        rose = build_rose(om, start, end, sectors, edges)
+        cache.set(key, rose, int(getattr(settings, "LAYER_CACHE_TTL_SEC", 600)))
+    return rose
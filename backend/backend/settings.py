@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -87,9 +88,94 @@ REST_FRAMEWORK = {
   "DEFAULT_PERMISSION_CLASSES": (
       "rest_framework.permissions.AllowAny",
     ),
-    
+    # orjson (api/renderers.py); thiếu orjson thì tự fallback về JSONRenderer/JSONParser của DRF
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
+# Open-Meteo upstream client (api/om_client.py)
+OPEN_METEO_CONNECT_TIMEOUT = float(os.environ.get("OPEN_METEO_CONNECT_TIMEOUT", "5"))
+OPEN_METEO_READ_TIMEOUT = float(os.environ.get("OPEN_METEO_READ_TIMEOUT", "15"))
+# Số lần retry lỗi kết nối (read timeout không retry, 429/5xx retry 1 lần) => 1 request trên đường
+# xử lý request chờ tối đa ~ connect + read = 20s khi upstream treo (xem om_client._build_session)
+OPEN_METEO_RETRIES = int(os.environ.get("OPEN_METEO_RETRIES", "2"))
+OPEN_METEO_BACKOFF = float(os.environ.get("OPEN_METEO_BACKOFF", "0.3"))
+OPEN_METEO_POOL_MAXSIZE = int(os.environ.get("OPEN_METEO_POOL_MAXSIZE", "10"))
+OPEN_METEO_BATCH_SIZE = int(os.environ.get("OPEN_METEO_BATCH_SIZE", "50"))
+# > 0: snap toạ độ về lưới model (độ) trước khi cache/fetch, vd 0.1 ~ ô 11km. 0 = tắt
+OPEN_METEO_GRID_SNAP_DEG = float(os.environ.get("OPEN_METEO_GRID_SNAP_DEG", "0"))
+# Circuit breaker theo host (api/circuit_breaker.py)
+OPEN_METEO_BREAKER_WINDOW = int(os.environ.get("OPEN_METEO_BREAKER_WINDOW", "20"))
+OPEN_METEO_BREAKER_MIN_CALLS = int(os.environ.get("OPEN_METEO_BREAKER_MIN_CALLS", "5"))
+OPEN_METEO_BREAKER_ERROR_RATE = float(os.environ.get("OPEN_METEO_BREAKER_ERROR_RATE", "0.5"))
+OPEN_METEO_BREAKER_SLOW_SEC = float(os.environ.get("OPEN_METEO_BREAKER_SLOW_SEC", "8"))
+OPEN_METEO_BREAKER_OPEN_SEC = float(os.environ.get("OPEN_METEO_BREAKER_OPEN_SEC", "30"))
+# TTL của super-payload dùng chung cho 5 layer weather/wind/rain/humidity/cloud (cache 2 tầng forecast_cache,
+# bản last-good giữ theo FORECAST_LAST_GOOD_SEC)
+LAYER_CACHE_TTL_SEC = int(os.environ.get("LAYER_CACHE_TTL_SEC", "600"))
+# Cache bundle 2 tầng: LRU trong process + bảng forecast_cache (api/forecast_cache.py)
+FORECAST_CACHE_TTL_SEC = int(os.environ.get("FORECAST_CACHE_TTL_SEC", "600"))
+FORECAST_LRU_MAXSIZE = int(os.environ.get("FORECAST_LRU_MAXSIZE", "256"))
+CURRENT_CACHE_TTL_SEC = int(os.environ.get("CURRENT_CACHE_TTL_SEC", "300"))
+# Stale-while-revalidate: entry hết hạn chưa quá FORECAST_MAX_STALE_SEC vẫn được trả ngay, refresh chạy nền
+FORECAST_MAX_STALE_SEC = int(os.environ.get("FORECAST_MAX_STALE_SEC", "3600"))
+FORECAST_REFRESH_WORKERS = int(os.environ.get("FORECAST_REFRESH_WORKERS", "2"))
+# Giữ row quá hạn bao lâu để làm fallback khi Open-Meteo sập / breaker mở
+FORECAST_LAST_GOOD_SEC = int(os.environ.get("FORECAST_LAST_GOOD_SEC", "86400"))
+# Thời gian tối đa chờ advisory lock (transaction ngắn quanh phần ghi cache / store) của worker khác (api/singleflight.py)
+FORECAST_LOCK_WAIT_SEC = float(os.environ.get("FORECAST_LOCK_WAIT_SEC", "20"))
+
+# Số row / câu upsert (1 transaction) khi ingest vào weather_forecast_hourly (api/hourly_store.py)
+HOURLY_STORE_CHUNK_ROWS = int(os.environ.get("HOURLY_STORE_CHUNK_ROWS", "5000"))
+# Đọc /provinces/<code>/* từ weather_forecast_hourly (fetch live + ghi vào store khi thiếu / cũ hơn MAX_AGE)
+HOURLY_STORE_READ = os.environ.get("HOURLY_STORE_READ", "False") == "True"
+HOURLY_STORE_MAX_AGE_SEC = int(os.environ.get("HOURLY_STORE_MAX_AGE_SEC", "3600"))
+# Khoảng ngày ghi cho mỗi tỉnh / Place (ingest + write-through)
+HOURLY_STORE_PAST_DAYS = int(os.environ.get("HOURLY_STORE_PAST_DAYS", "7"))
+HOURLY_STORE_FORECAST_DAYS = int(os.environ.get("HOURLY_STORE_FORECAST_DAYS", "16"))
+# Partition theo tháng của weather_forecast_hourly (api/hourly_partitions.py, manage.py rollover_hourly_partitions)
+HOURLY_PARTITION_MONTHS_AHEAD = int(os.environ.get("HOURLY_PARTITION_MONTHS_AHEAD", "3"))
+HOURLY_RETENTION_MONTHS = int(os.environ.get("HOURLY_RETENTION_MONTHS", "12"))
+HOURLY_ARCHIVE_SCHEMA = os.environ.get("HOURLY_ARCHIVE_SCHEMA", "archive")
+
+# Rollup ngày / tuần ISO theo tỉnh / Place (api/rollups.py, manage.py refresh_rollups)
+ROLLUP_ON_INGEST = os.environ.get("ROLLUP_ON_INGEST", "True") == "True"
+# Archive API trễ vài ngày: chỉ ngày cũ hơn hôm nay - LAG mới coi là đã chốt (rollup archive, archive_cache vĩnh viễn)
+OPEN_METEO_ARCHIVE_LAG_DAYS = int(os.environ.get("OPEN_METEO_ARCHIVE_LAG_DAYS", "5"))
+
+# Mép các lớp tốc độ (km/h) của hoa gió (api/wind_rose.py): 5,10 => [0,5), [5,10), [10,+inf)
+WIND_ROSE_SPEED_EDGES_KMH = tuple(
+    float(x) for x in os.environ.get("WIND_ROSE_SPEED_EDGES_KMH", "5,10,20,30,40").split(",") if x.strip()
+)
+
+# Snapshot current conditions toàn quốc cho bản đồ (api/map_snapshot.py)
+MAP_SNAPSHOT_REFRESH_SEC = int(os.environ.get("MAP_SNAPSHOT_REFRESH_SEC", "600"))
+# Thread refresh nền trong mỗi process web (chỉ nên bật khi chạy 1 process); nhiều worker => manage.py refresh_map_snapshot
+MAP_SNAPSHOT_SCHEDULER = os.environ.get("MAP_SNAPSHOT_SCHEDULER", "False") == "True"
+
+# Tile heatmap nội suy từ snapshot (api/tiles.py)
+TILE_INTERPOLATOR = os.environ.get("TILE_INTERPOLATOR", "idw")
+TILE_GRID_STEP_DEG = float(os.environ.get("TILE_GRID_STEP_DEG", "0.05"))
+TILE_GRID_PAD_DEG = float(os.environ.get("TILE_GRID_PAD_DEG", "0.5"))
+TILE_MAX_ZOOM = int(os.environ.get("TILE_MAX_ZOOM", "12"))
+TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR", os.path.join(BASE_DIR, "tile_cache"))
+
+# Nén gzip/brotli response JSON lớn (api/middleware.py)
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_PATH_PREFIXES = (
+    "/api/provinces/",
+    "/api/province-index/",
+    "/api/map/snapshot/",
+    "/api/admin/reports/compare-week/",
+)
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
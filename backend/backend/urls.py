@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from api.views_analytics import track_region, top_provinces
 from api.views_compare import compare_week
+from api.views_monitoring import upstream_breakers
 from api.views_reports import admin_export_popup_pdf
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -15,4 +16,5 @@ urlpatterns = [
     path("api/admin/analytics/top-provinces/", top_provinces),
     path("api/admin/reports/popup/<str:province_code>/pdf/", admin_export_popup_pdf),
     path("api/admin/reports/compare-week/<str:province_code>/", compare_week),
+    path("api/admin/upstream/breakers/", upstream_breakers),
 ]